@@ -0,0 +1,31 @@
+"""Add line detection snapshot to scripts
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-11-20 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "scripts", sa.Column("detection_line_hashes", sa.JSON(), nullable=True)
+    )
+    op.add_column(
+        "scripts", sa.Column("detection_context_size", sa.Integer(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("scripts", "detection_context_size")
+    op.drop_column("scripts", "detection_line_hashes")
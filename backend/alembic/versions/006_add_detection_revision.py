@@ -0,0 +1,30 @@
+"""Add line detection revision to scripts
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-11-24 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "scripts",
+        sa.Column(
+            "detection_revision", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("scripts", "detection_revision")
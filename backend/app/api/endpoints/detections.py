@@ -1,5 +1,5 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...db.base import get_db
@@ -7,6 +7,7 @@ from ...services.detection_service import DetectionService
 from ...services.ml_client import ml_client
 from ...schemas.detection import (
     LineDetectionResponse,
+    LineDetectionRunResponse,
     UserCorrectionCreate,
     UserCorrectionResponse,
     LineDetectionStatsResponse,
@@ -16,17 +17,25 @@ from ...schemas.detection import (
 router = APIRouter()
 
 
-@router.post("/{script_id}/detections", response_model=List[LineDetectionResponse])
+@router.post("/{script_id}/detections", response_model=LineDetectionRunResponse)
 async def detect_lines(
     script_id: int,
     context_size: int = 3,
+    incremental: bool = True,
     db: AsyncSession = Depends(get_db),
 ):
-    """Detect problematic lines in script."""
+    """Detect problematic lines in script.
+
+    By default only lines changed since the previous detection run are
+    re-scanned; pass ``incremental=false`` to force a full re-scan. Returns
+    counts and the script's detection revision; fetch the rows with ``GET``.
+    """
     service = DetectionService(db, ml_client)
     try:
-        detections = await service.detect_and_store_lines(script_id, context_size)
-        return detections
+        summary = await service.detect_and_store_lines(
+            script_id, context_size, incremental
+        )
+        return summary
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -40,12 +49,21 @@ async def detect_lines(
 async def get_detections(
     script_id: int,
     include_false_positives: bool = False,
+    expand: bool = False,
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get all detections for a script."""
+    """Get detections for a script, ordered by line.
+
+    Pass ``offset`` and ``limit`` to page through long scripts. Rows on lines
+    changed since the last detection run are marked ``stale``.
+    """
     service = DetectionService(db, ml_client)
     try:
-        detections = await service.get_detections(script_id, include_false_positives)
+        detections = await service.get_detections(
+            script_id, include_false_positives, expand, offset, limit
+        )
         return detections
     except Exception as e:
         raise HTTPException(
@@ -130,6 +148,7 @@ async def get_corrections(
 async def get_script_with_detections(
     script_id: int,
     include_false_positives: bool = False,
+    expand: bool = False,
     db: AsyncSession = Depends(get_db),
 ):
     """Get script with all detections and stats."""
@@ -148,7 +167,9 @@ async def get_script_with_detections(
                 detail=f"Script {script_id} not found",
             )
 
-        detections = await service.get_detections(script_id, include_false_positives)
+        detections = await service.get_detections(
+            script_id, include_false_positives, expand
+        )
         stats = await service.get_detection_stats(script_id)
         corrections = await service.get_corrections(script_id)
 
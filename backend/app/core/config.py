@@ -20,6 +20,13 @@ class Settings(BaseSettings):
     ml_service_max_retries: int = 3
     ml_service_retry_delay: float = 2.0
 
+    # incremental line detection: extra lines re-scanned around each change,
+    # and the share of changed lines above which a full re-scan is cheaper
+    detection_incremental_margin: int = 3
+    detection_full_rescan_ratio: float = 0.5
+    # rows per INSERT when storing streamed detections
+    detection_insert_batch_size: int = 500
+
     cors_origins: list[str] = ["http://localhost:3000", "http://localhost:5173"]
 
     max_upload_size_mb: int = 10
@@ -26,6 +26,15 @@ class Script(Base):  # type: ignore[misc, valid-type]
     model_version: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     total_scenes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     current_version: Mapped[int] = mapped_column(Integer, default=1)
+    # per-line hashes of the content the stored line detections were computed
+    # on, used to re-detect only what changed on the next run
+    detection_line_hashes: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)
+    detection_context_size: Mapped[Optional[int]] = mapped_column(
+        Integer, nullable=True
+    )
+    # bumped by every detection run so clients paging through detections
+    # can tell when the rows changed underneath them
+    detection_revision: Mapped[int] = mapped_column(Integer, default=0)
     created_at: Mapped[Optional[datetime]] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
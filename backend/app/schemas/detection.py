@@ -28,11 +28,22 @@ class LineDetectionResponse(LineDetectionBase):
     is_false_positive: bool
     user_corrected: bool
     created_at: datetime
+    # the script changed on these lines since detection ran
+    stale: bool = False
 
     class Config:
         from_attributes = True
 
 
+class LineDetectionRunResponse(BaseModel):
+    script_id: int
+    detection_revision: int
+    incremental: bool
+    detected: int
+    kept: int
+    total_detections: int
+
+
 class UserCorrectionBase(BaseModel):
     correction_type: str
     line_start: Optional[int] = None
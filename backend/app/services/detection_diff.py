@@ -0,0 +1,100 @@
+"""Plan incremental line detection from a line diff between two versions."""
+
+import hashlib
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+
+LINES_PER_PAGE = 55
+
+
+def line_hashes(content: str) -> list[str]:
+    """Short per-line digests; enough to diff versions without storing text."""
+    return [
+        hashlib.blake2b(line.encode("utf-8"), digest_size=8).hexdigest()
+        for line in content.split("\n")
+    ]
+
+
+def page_for_line(line_number: int) -> int:
+    return (line_number - 1) // LINES_PER_PAGE + 1
+
+
+@dataclass
+class DetectionPlan:
+    # 1-based old line number -> new line number, for lines outside dirty ranges
+    line_map: dict[int, int] = field(default_factory=dict)
+    # 1-based inclusive line ranges of the new content that must be re-scanned
+    dirty_ranges: list[tuple[int, int]] = field(default_factory=list)
+    total_lines: int = 0
+
+    @property
+    def dirty_line_count(self) -> int:
+        return sum(end - start + 1 for start, end in self.dirty_ranges)
+
+    def is_dirty(self, line_number: int) -> bool:
+        return any(start <= line_number <= end for start, end in self.dirty_ranges)
+
+
+def plan_incremental_detection(
+    old_hashes: list[str], new_hashes: list[str], margin: int
+) -> DetectionPlan:
+    """Diff two versions and decide what can be kept and what must be re-scanned.
+
+    Every inserted, deleted or replaced block becomes a dirty range of the new
+    content, widened by ``margin`` lines on both sides so that context lines
+    and speaker cues next to the change are refreshed too.
+    """
+    total = len(new_hashes)
+    plan = DetectionPlan(total_lines=total)
+    ranges: list[tuple[int, int]] = []
+
+    matcher = SequenceMatcher(None, old_hashes, new_hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                plan.line_map[i1 + offset + 1] = j1 + offset + 1
+            continue
+        # a pure deletion has an empty new range; re-scan around the seam
+        start = j1 + 1 - margin
+        end = max(j2, j1 + 1) + margin
+        ranges.append((max(1, start), min(total, end)))
+
+    for start, end in sorted(ranges):
+        if start > end:
+            continue
+        if plan.dirty_ranges and start <= plan.dirty_ranges[-1][1] + 1:
+            last_start, last_end = plan.dirty_ranges[-1]
+            plan.dirty_ranges[-1] = (last_start, max(last_end, end))
+        else:
+            plan.dirty_ranges.append((start, end))
+
+    return plan
+
+
+def speaker_block_start(lines: list[str], line_number: int) -> int:
+    """First line of the block holding ``line_number``: just after a blank line.
+
+    The ML service carries a speaker from a character cue down to the next
+    blank line (or scene heading or transition), so detection that starts at
+    a block start names the same speakers as a full scan.
+    """
+    while line_number > 1 and lines[line_number - 2].strip():
+        line_number -= 1
+    return line_number
+
+
+def widen_to_speaker_blocks(plan: DetectionPlan, lines: list[str]) -> None:
+    """Extend every dirty range of ``plan`` down to the end of its block.
+
+    An edited cue changes the speaker of every line below it up to the next
+    blank line, so rows kept below a change in the same block are re-scanned.
+    """
+    widened: list[tuple[int, int]] = []
+    for start, end in plan.dirty_ranges:
+        while end < len(lines) and lines[end].strip():
+            end += 1
+        if widened and start <= widened[-1][1] + 1:
+            widened[-1] = (widened[-1][0], max(widened[-1][1], end))
+        else:
+            widened.append((start, end))
+    plan.dirty_ranges = widened
@@ -1,82 +1,392 @@
-from typing import List
-from sqlalchemy import select
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.script import Script, LineDetection, UserCorrection
 from ..schemas.detection import (
     LineDetectionResponse,
+    LineDetectionRunResponse,
     UserCorrectionCreate,
     UserCorrectionResponse,
     LineDetectionStatsResponse,
     ParentsGuideCategoryStats,
 )
+from ..core.config import settings
+from .detection_diff import (
+    DetectionPlan,
+    line_hashes,
+    page_for_line,
+    plan_incremental_detection,
+    speaker_block_start,
+    widen_to_speaker_blocks,
+)
 from .ml_client import MLServiceClient
 
 
+def expand_detection(
+    detection: LineDetectionResponse, lines: List[str], context_size: int
+) -> LineDetectionResponse:
+    """Rebuild context strings and match texts of a compact detection.
+
+    Mirrors what the ML service returns in non-compact mode: stripped context
+    lines around the hit and ``{text, start, end, pattern}`` per match, except
+    that ``pattern`` is the stored ``category:index`` reference into the ML
+    service's ``CATEGORY_PATTERNS`` rather than the regex text. Rows stored
+    before the compact format already carry both and are returned as is.
+    ``lines`` must be the content the detection was made on (see
+    ``relocate_detections``).
+    """
+    patterns = detection.matched_patterns or {}
+    if "spans" not in patterns:
+        return detection
+
+    idx = detection.line_start - 1
+    raw_line = lines[idx] if 0 <= idx < len(lines) else ""
+    before = [line.strip() for line in lines[max(0, idx - context_size) : idx]]
+    after = [line.strip() for line in lines[idx + 1 : idx + 1 + context_size]]
+
+    return detection.model_copy(
+        update={
+            "context_before": "\n".join(before) if before else None,
+            "context_after": "\n".join(after) if after else None,
+            "matched_patterns": {
+                "count": patterns.get("count", len(patterns["spans"])),
+                "matches": [
+                    {
+                        "text": raw_line[start:end],
+                        "start": start,
+                        "end": end,
+                        "pattern": pattern,
+                    }
+                    for start, end, pattern in patterns["spans"]
+                ],
+            },
+        }
+    )
+
+
+def relocate_detections(
+    detections: List[LineDetectionResponse], plan: DetectionPlan
+) -> List[LineDetectionResponse]:
+    """Detections of an older version of the content, moved to current lines.
+
+    ``plan`` diffs the line hashes of the detection run against the current
+    content. Rows whose lines and context are unchanged get their new line
+    numbers; the others are returned as they were, marked ``stale``, until
+    detection runs again.
+    """
+    relocated = []
+    for detection in detections:
+        start = plan.line_map.get(detection.line_start)
+        end = plan.line_map.get(detection.line_end)
+        if start is None or end is None or plan.is_dirty(start) or plan.is_dirty(end):
+            relocated.append(detection.model_copy(update={"stale": True}))
+        elif start != detection.line_start or end != detection.line_end:
+            relocated.append(
+                detection.model_copy(
+                    update={
+                        "line_start": start,
+                        "line_end": end,
+                        "page_number": page_for_line(start),
+                    }
+                )
+            )
+        else:
+            relocated.append(detection)
+    return relocated
+
+
+async def _aiter(items: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for item in items:
+        yield item
+
+
 class DetectionService:
     def __init__(self, db: AsyncSession, ml_client: MLServiceClient):
         self.db = db
         self.ml_client = ml_client
 
     async def detect_and_store_lines(
-        self, script_id: int, context_size: int = 3
-    ) -> List[LineDetectionResponse]:
-        """Detect problematic lines in script and store them."""
+        self,
+        script_id: int,
+        context_size: int = 3,
+        incremental: bool = True,
+    ) -> LineDetectionRunResponse:
+        """Detect problematic lines in script and store them.
+
+        When the script was detected before with the same context size, only the
+        line ranges that changed since then are sent to the ML service; the
+        remaining detections are kept (with their ids, flags and corrections)
+        and shifted to their new line numbers. A full scan is streamed from the
+        ML service and inserted in batches as it arrives.
+
+        Returns a summary of the run rather than the rows, so memory does not
+        grow with the number of detections; read them with ``get_detections``,
+        a page at a time for long scripts. Detections are stored compactly
+        (line refs and match spans).
+        """
         result = await self.db.execute(select(Script).where(Script.id == script_id))
         script = result.scalar_one_or_none()
 
         if not script:
             raise ValueError(f"Script {script_id} not found")
 
-        await self.db.execute(
-            select(LineDetection).where(LineDetection.script_id == script_id)
-        )
-        existing = await self.db.execute(
-            select(LineDetection).where(LineDetection.script_id == script_id)
+        new_hashes = line_hashes(script.content)
+
+        plan = None
+        if (
+            incremental
+            and script.detection_line_hashes is not None
+            and script.detection_context_size == context_size
+        ):
+            plan = plan_incremental_detection(
+                script.detection_line_hashes,
+                new_hashes,
+                margin=max(settings.detection_incremental_margin, context_size),
+            )
+            widen_to_speaker_blocks(plan, script.content.split("\n"))
+            if plan.dirty_line_count > settings.detection_full_rescan_ratio * max(
+                plan.total_lines, 1
+            ):
+                plan = None
+
+        if plan is None:
+            # user verdicts on re-detected lines survive when the same text
+            # is found again
+            verdicts = await self.db.execute(
+                select(
+                    LineDetection.category,
+                    LineDetection.detected_text,
+                    LineDetection.is_false_positive,
+                ).where(
+                    LineDetection.script_id == script_id,
+                    LineDetection.user_corrected,
+                )
+            )
+            corrected = {(c, text): fp for c, text, fp in verdicts}
+            await self._delete_all_detections(script_id)
+            kept = 0
+            detected = await self._insert_detections(
+                script_id,
+                self.ml_client.stream_detections(
+                    script.content, str(script_id), context_size, compact=True
+                ),
+                corrected,
+            )
+        else:
+            existing = await self.db.execute(
+                select(LineDetection).where(LineDetection.script_id == script_id)
+            )
+            kept_rows, stale = self._shift_detections(list(existing.scalars()), plan)
+            kept = len(kept_rows)
+            corrected = {
+                (d.category, d.detected_text): d.is_false_positive
+                for d in stale
+                if d.user_corrected
+            }
+            for detection in stale:
+                await self.db.delete(detection)
+            await self.db.flush()
+            items = await self._detect_ranges(script, plan, context_size)
+            detected = await self._insert_detections(
+                script_id, _aiter(items), corrected
+            )
+
+        script.detection_line_hashes = new_hashes
+        script.detection_context_size = context_size
+        script.detection_revision = (script.detection_revision or 0) + 1
+        await self.db.commit()
+
+        return LineDetectionRunResponse(
+            script_id=script_id,
+            detection_revision=script.detection_revision,
+            incremental=plan is not None,
+            detected=detected,
+            kept=kept,
+            total_detections=kept + detected,
         )
-        for detection in existing.scalars():
-            await self.db.delete(detection)
 
-        ml_result = await self.ml_client.detect_lines(
-            script.content, str(script_id), context_size
+    async def _delete_all_detections(self, script_id: int) -> None:
+        # bulk deletes bypass the session; drop loaded rows so they are not
+        # mistaken for the freshly inserted ones
+        for obj in list(self.db):
+            if isinstance(obj, (LineDetection, UserCorrection)) and (
+                obj.script_id == script_id
+            ):
+                self.db.expunge(obj)
+        detection_ids = select(LineDetection.id).where(
+            LineDetection.script_id == script_id
+        )
+        await self.db.execute(
+            delete(UserCorrection).where(UserCorrection.detection_id.in_(detection_ids))
+        )
+        await self.db.execute(
+            delete(LineDetection).where(LineDetection.script_id == script_id)
         )
 
-        detections = []
-        for item in ml_result.get("detections", []):
-            detection = LineDetection(
-                script_id=script_id,
-                line_start=item["line_start"],
-                line_end=item["line_end"],
-                detected_text=item["detected_text"],
-                context_before=item.get("context_before"),
-                context_after=item.get("context_after"),
-                category=item["category"],
-                severity=item["severity"],
-                parents_guide_severity=item.get("parents_guide_severity"),
-                character_name=item.get("character_name"),
-                page_number=item.get("page_number"),
-                matched_patterns=item.get("matched_patterns"),
+    async def _insert_detections(
+        self,
+        script_id: int,
+        items: AsyncIterator[Dict[str, Any]],
+        corrected: Dict[Tuple[str, str], bool],
+    ) -> int:
+        """Insert detections in bounded batches without keeping ORM objects."""
+        batch_size = settings.detection_insert_batch_size
+        batch: List[Dict[str, Any]] = []
+        inserted = 0
+        async for item in items:
+            row = {
+                "script_id": script_id,
+                "line_start": item["line_start"],
+                "line_end": item["line_end"],
+                "detected_text": item["detected_text"],
+                "context_before": item.get("context_before"),
+                "context_after": item.get("context_after"),
+                "category": item["category"],
+                "severity": item["severity"],
+                "parents_guide_severity": item.get("parents_guide_severity"),
+                "character_name": item.get("character_name"),
+                "page_number": item.get("page_number"),
+                "matched_patterns": item.get("matched_patterns"),
+                "is_false_positive": False,
+                "user_corrected": False,
+            }
+            previous = corrected.get((row["category"], row["detected_text"]))
+            if previous is not None:
+                row["is_false_positive"] = previous
+                row["user_corrected"] = True
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await self.db.execute(insert(LineDetection), batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            await self.db.execute(insert(LineDetection), batch)
+            inserted += len(batch)
+        return inserted
+
+    @staticmethod
+    def _shift_detections(
+        existing: List[LineDetection], plan: DetectionPlan
+    ) -> Tuple[List[LineDetection], List[LineDetection]]:
+        """Split stored detections into kept (renumbered in place) and stale."""
+        kept, stale = [], []
+        for detection in existing:
+            start = plan.line_map.get(detection.line_start)
+            end = plan.line_map.get(detection.line_end)
+            if (
+                start is None
+                or end is None
+                or plan.is_dirty(start)
+                or plan.is_dirty(end)
+            ):
+                stale.append(detection)
+                continue
+            if start != detection.line_start:
+                detection.line_start = start
+                detection.line_end = end
+                detection.page_number = page_for_line(start)
+            kept.append(detection)
+        return kept, stale
+
+    async def _detect_ranges(
+        self, script: Script, plan: DetectionPlan, context_size: int
+    ) -> List[Dict[str, Any]]:
+        """Run line detection on each dirty range, with enough surrounding lines
+        for context and speaker cues, keeping only hits inside the range.
+
+        Chunks start no later than the first line of the range's speaker
+        block, so lines far below their character cue keep their speaker.
+        """
+        lines = script.content.split("\n")
+        items: List[Dict[str, Any]] = []
+        for start, end in plan.dirty_ranges:
+            chunk_start = max(
+                1, min(start - context_size, speaker_block_start(lines, start))
             )
-            self.db.add(detection)
-            detections.append(detection)
-
-        await self.db.commit()
-
-        return [LineDetectionResponse.model_validate(d) for d in detections]
+            chunk_end = min(len(lines), end + context_size)
+            ml_result = await self.ml_client.detect_lines(
+                "\n".join(lines[chunk_start - 1 : chunk_end]),
+                str(script.id),
+                context_size,
+                line_offset=chunk_start - 1,
+                compact=True,
+            )
+            items.extend(
+                item
+                for item in ml_result.get("detections", [])
+                if start <= item["line_start"] <= end
+            )
+        return items
 
     async def get_detections(
-        self, script_id: int, include_false_positives: bool = False
+        self,
+        script_id: int,
+        include_false_positives: bool = False,
+        expand: bool = False,
+        offset: int = 0,
+        limit: Optional[int] = None,
     ) -> List[LineDetectionResponse]:
-        """Get all detections for a script."""
-        query = select(LineDetection).where(LineDetection.script_id == script_id)
+        """Get detections for a script, ordered by line, optionally one page
+        (``offset``/``limit``) at a time.
+
+        If the script content was replaced since detection ran (a new upload
+        or a restored version), rows are moved to their current line numbers,
+        or marked ``stale`` where their lines changed. With ``expand`` the
+        context lines and match texts of current rows are rebuilt from the
+        stored script content.
+        """
+        query = (
+            select(LineDetection)
+            .where(LineDetection.script_id == script_id)
+            .order_by(
+                LineDetection.line_start, LineDetection.line_end, LineDetection.id
+            )
+        )
 
         if not include_false_positives:
             query = query.where(~LineDetection.is_false_positive)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
 
         result = await self.db.execute(query)
         detections = result.scalars().all()
+        responses = [LineDetectionResponse.model_validate(d) for d in detections]
 
-        return [LineDetectionResponse.model_validate(d) for d in detections]
+        if not responses:
+            return responses
+        script_result = await self.db.execute(
+            select(
+                Script.content,
+                Script.detection_line_hashes,
+                Script.detection_context_size,
+            ).where(Script.id == script_id)
+        )
+        script = script_result.one_or_none()
+        if script is None:
+            return responses
+        content, detected_hashes, context_size = script
+        context_size = context_size or 3
+
+        if detected_hashes is not None:
+            current_hashes = line_hashes(content)
+            if current_hashes != detected_hashes:
+                plan = plan_incremental_detection(
+                    detected_hashes, current_hashes, margin=context_size
+                )
+                widen_to_speaker_blocks(plan, content.split("\n"))
+                responses = relocate_detections(responses, plan)
+
+        if expand:
+            lines = content.split("\n")
+            responses = [
+                r if r.stale else expand_detection(r, lines, context_size)
+                for r in responses
+            ]
+
+        return responses
 
     async def get_detection_stats(self, script_id: int) -> LineDetectionStatsResponse:
         """Get statistics for script detections."""
@@ -1,5 +1,7 @@
 import asyncio
-from typing import Any, cast
+import json
+import time
+from typing import Any, AsyncIterator, cast
 
 import httpx
 from loguru import logger
@@ -7,6 +9,8 @@ from loguru import logger
 from ..core.config import settings
 from ..core.exceptions import MLServiceError, MLServiceTimeoutError
 
+DEADLINE_HEADER = "X-Request-Deadline"
+
 
 class MLServiceClient:
     def __init__(self) -> None:
@@ -15,6 +19,11 @@ class MLServiceClient:
         self.max_retries: int = settings.ml_service_max_retries
         self.retry_delay: float = settings.ml_service_retry_delay
 
+    def _deadline_headers(self) -> dict[str, str]:
+        # absolute deadline for this attempt, so the ML service can stop
+        # working on requests we have already given up on
+        return {DEADLINE_HEADER: f"{time.time() + self.timeout:.3f}"}
+
     async def rate_script(
         self, text: str, script_id: str | None = None
     ) -> dict[str, Any]:
@@ -25,6 +34,7 @@ class MLServiceClient:
                 async with httpx.AsyncClient(timeout=self.timeout) as client:
                     response = await client.post(
                         f"{self.base_url}/rate_script",
+                        headers=self._deadline_headers(),
                         json={"text": text, "script_id": script_id},
                     )
                     response.raise_for_status()
@@ -66,6 +76,7 @@ class MLServiceClient:
                 async with httpx.AsyncClient(timeout=self.timeout) as client:
                     response = await client.post(
                         f"{self.base_url}/what_if",
+                        headers=self._deadline_headers(),
                         json={
                             "script_text": script_text,
                             "modification_request": modification_request,
@@ -101,7 +112,12 @@ class MLServiceClient:
         raise MLServiceError("No attempts made")
 
     async def detect_lines(
-        self, text: str, script_id: str | None = None, context_size: int = 3
+        self,
+        text: str,
+        script_id: str | None = None,
+        context_size: int = 3,
+        line_offset: int = 0,
+        compact: bool = False,
     ) -> dict[str, Any]:
         last_error: Exception | None = None
 
@@ -110,10 +126,13 @@ class MLServiceClient:
                 async with httpx.AsyncClient(timeout=self.timeout) as client:
                     response = await client.post(
                         f"{self.base_url}/detect_lines",
+                        headers=self._deadline_headers(),
                         json={
                             "text": text,
                             "script_id": script_id,
                             "context_size": context_size,
+                            "line_offset": line_offset,
+                            "compact": compact,
                         },
                     )
                     response.raise_for_status()
@@ -145,6 +164,56 @@ class MLServiceClient:
             raise MLServiceError(f"Connection failed: {str(last_error)}")
         raise MLServiceError("No attempts made")
 
+    async def stream_detections(
+        self,
+        text: str,
+        script_id: str | None = None,
+        context_size: int = 3,
+        compact: bool = False,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Yield detections from ``/detect_lines/stream`` as they arrive.
+
+        Not retried: a stream that fails part way has already been consumed.
+        A stream that ends without its summary line is treated as an error.
+        """
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                async with client.stream(
+                    "POST",
+                    f"{self.base_url}/detect_lines/stream",
+                    headers=self._deadline_headers(),
+                    json={
+                        "text": text,
+                        "script_id": script_id,
+                        "context_size": context_size,
+                        "compact": compact,
+                    },
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        record = json.loads(line)
+                        if "detection" in record:
+                            yield record["detection"]
+                        elif "summary" in record:
+                            return
+                        elif "error" in record:
+                            raise MLServiceError(record["error"])
+            raise MLServiceError("Detection stream ended without summary")
+
+        except httpx.TimeoutException:
+            logger.warning("ML service timeout while streaming detections")
+            raise MLServiceTimeoutError()
+
+        except httpx.HTTPStatusError as e:
+            logger.error(f"ML service HTTP error: {e.response.status_code}")
+            raise MLServiceError(f"HTTP {e.response.status_code}")
+
+        except httpx.RequestError as e:
+            logger.warning(f"ML service connection error while streaming: {e}")
+            raise MLServiceError(f"Connection failed: {str(e)}")
+
     async def health_check(self) -> dict[str, Any]:
         try:
             async with httpx.AsyncClient(timeout=5.0) as client:
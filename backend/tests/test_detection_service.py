@@ -0,0 +1,323 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.script import Script
+from app.services.detection_diff import line_hashes, plan_incremental_detection
+from app.services.detection_service import DetectionService, expand_detection
+
+
+def fake_detect(text, script_id=None, context_size=3, line_offset=0, compact=False):
+    """Flag every line mentioning 'kill', numbering lines like the ML service."""
+    detections = []
+    for idx, line in enumerate(text.split("\n")):
+        if "kill" in line:
+            line_num = idx + 1 + line_offset
+            start = line.index("kill")
+            detections.append(
+                {
+                    "line_start": line_num,
+                    "line_end": line_num,
+                    "detected_text": line.strip(),
+                    "category": "violence",
+                    "severity": 0.5,
+                    "page_number": (line_num - 1) // 55 + 1,
+                    "matched_patterns": {
+                        "count": 1,
+                        "spans": [[start, start + 4, "violence:0"]],
+                    },
+                }
+            )
+    return {"detections": detections}
+
+
+def make_script(n_lines: int) -> str:
+    # blank lines between blocks, as in a screenplay
+    return "\n".join(
+        (
+            f"He will kill them {i}"
+            if i % 20 == 0
+            else "" if i % 10 == 5 else f"Quiet line {i}"
+        )
+        for i in range(n_lines)
+    )
+
+
+async def fake_stream(text, script_id=None, context_size=3, compact=False):
+    for detection in fake_detect(text, script_id, context_size, compact=compact)[
+        "detections"
+    ]:
+        yield detection
+
+
+@pytest.fixture
+def ml_client():
+    client = AsyncMock()
+    client.detect_lines.side_effect = fake_detect
+    client.stream_detections = MagicMock(side_effect=fake_stream)
+    return client
+
+
+def test_plan_maps_unchanged_lines_and_marks_edits():
+    old = line_hashes("a\nb\nc\nd\ne\nf\ng")
+    new = line_hashes("a\nb\nX\nd\ne\nf\ng")
+
+    plan = plan_incremental_detection(old, new, margin=1)
+
+    assert plan.dirty_ranges == [(2, 4)]
+    assert plan.line_map[7] == 7
+    assert 3 not in plan.line_map
+
+
+def test_plan_pure_deletion_rescans_seam():
+    old = line_hashes("a\nb\nc\nd\ne\nf")
+    new = line_hashes("a\nb\ne\nf")
+
+    plan = plan_incremental_detection(old, new, margin=0)
+
+    assert plan.dirty_ranges == [(3, 3)]
+    assert plan.line_map[5] == 3
+
+
+@pytest.mark.asyncio
+async def test_incremental_detection_keeps_untouched_rows(
+    test_session: AsyncSession, ml_client
+):
+    script = Script(title="Long", content=make_script(400))
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+
+    summary = await service.detect_and_store_lines(script.id)
+    assert (summary.incremental, summary.total_detections) == (False, 20)
+    first = await service.get_detections(script.id)
+    last = first[-1]
+    await service.mark_false_positive(last.id, True)
+
+    script.content = "INT. NEW OPENING - DAY\nHe will kill again\n" + script.content
+    await test_session.commit()
+    ml_client.detect_lines.reset_mock()
+
+    summary = await service.detect_and_store_lines(script.id)
+    second = await service.get_detections(script.id, include_false_positives=True)
+
+    assert (summary.incremental, summary.detection_revision) == (True, 2)
+    assert (summary.kept, summary.detected) == (19, 2)
+    assert len(second) == 21
+    assert ml_client.detect_lines.await_count == 1
+    sent_text = ml_client.detect_lines.await_args.args[0]
+    assert len(sent_text.split("\n")) < 20
+
+    shifted = next(d for d in second if d.id == last.id)
+    assert shifted.line_start == last.line_start + 2
+    assert shifted.is_false_positive
+
+    await service.detect_and_store_lines(script.id, incremental=False)
+    rescanned = await service.get_detections(script.id, include_false_positives=True)
+    assert [d.line_start for d in rescanned] == [d.line_start for d in second]
+    assert next(
+        d for d in rescanned if d.line_start == shifted.line_start
+    ).is_false_positive
+
+
+def fake_detect_speakers(
+    text, script_id=None, context_size=3, line_offset=0, compact=False
+):
+    """Like fake_detect, naming the speaker as the ML service does: from an
+    all-caps cue down to the next blank line."""
+    detections = fake_detect(text, script_id, context_size, line_offset, compact)[
+        "detections"
+    ]
+    speakers = []
+    speaker = None
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if not stripped:
+            speaker = None
+        elif stripped.isupper():
+            speaker = stripped
+        speakers.append(speaker)
+    for detection in detections:
+        detection["character_name"] = speakers[
+            detection["line_start"] - 1 - line_offset
+        ]
+    return {"detections": detections}
+
+
+async def fake_stream_speakers(text, script_id=None, context_size=3, compact=False):
+    for detection in fake_detect_speakers(text, script_id, context_size)["detections"]:
+        yield detection
+
+
+@pytest.mark.asyncio
+async def test_incremental_detection_keeps_speakers_of_long_dialogue_blocks(
+    test_session: AsyncSession, ml_client
+):
+    ml_client.detect_lines.side_effect = fake_detect_speakers
+    ml_client.stream_detections.side_effect = fake_stream_speakers
+    block = ["JOHN"] + [f"Line {i} of the speech." for i in range(12)]
+    block[8] = "And then I kill them all."
+    filler = [f"Quiet line {i}" if i % 5 else "" for i in range(60)]
+    script = Script(title="Speech", content="\n".join(filler + [""] + block + [""]))
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+
+    async def speakers():
+        rows = await service.get_detections(script.id)
+        return [(d.line_start, d.character_name) for d in rows]
+
+    await service.detect_and_store_lines(script.id, context_size=1)
+    assert await speakers() == [(70, "JOHN")]
+
+    # an edit a few lines below the cue, more than the margin away from it
+    lines = script.content.split("\n")
+    lines[70] = "Line 9 of the speech, revised."
+    script.content = "\n".join(lines)
+    await test_session.commit()
+    await service.detect_and_store_lines(script.id, context_size=1)
+    incremental = await speakers()
+    await service.detect_and_store_lines(script.id, incremental=False, context_size=1)
+    assert incremental == await speakers() == [(70, "JOHN")]
+
+    # renaming the cue refreshes the kept row further down its block
+    lines[61] = "JACK"
+    script.content = "\n".join(lines)
+    await test_session.commit()
+    ml_client.stream_detections.reset_mock()
+    await service.detect_and_store_lines(script.id, context_size=1)
+    ml_client.stream_detections.assert_not_called()
+    assert await speakers() == [(70, "JACK")]
+
+
+@pytest.mark.asyncio
+async def test_context_size_change_forces_full_scan(
+    test_session: AsyncSession, ml_client
+):
+    script = Script(title="Short", content=make_script(60))
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+
+    await service.detect_and_store_lines(script.id, context_size=3)
+    ml_client.stream_detections.reset_mock()
+    await service.detect_and_store_lines(script.id, context_size=5)
+
+    assert ml_client.stream_detections.call_args.args[0] == script.content
+    ml_client.detect_lines.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_detections_stored_compact_and_expanded_on_read(
+    test_session: AsyncSession, ml_client
+):
+    content = "INT. ROOM - DAY\nJOHN\n  I will kill you.  \nHe leaves."
+    script = Script(title="Compact", content=content)
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+
+    await service.detect_and_store_lines(script.id, context_size=1)
+    stored = await service.get_detections(script.id)
+    assert ml_client.stream_detections.call_args.kwargs["compact"] is True
+    assert stored[0].context_before is None
+    assert "matches" not in stored[0].matched_patterns
+
+    expanded = await service.get_detections(script.id, expand=True)
+
+    detection = expanded[0]
+    assert detection.context_before == "JOHN"
+    assert detection.context_after == "He leaves."
+    assert detection.matched_patterns == {
+        "count": 1,
+        "matches": [{"text": "kill", "start": 9, "end": 13, "pattern": "violence:0"}],
+    }
+
+
+@pytest.mark.asyncio
+async def test_replaced_content_relocates_or_marks_rows_stale(
+    test_session: AsyncSession, ml_client
+):
+    script = Script(title="Replaced", content=make_script(100))
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+    await service.detect_and_store_lines(script.id, context_size=1)
+
+    # a new upload replaces the content without detecting again
+    lines = script.content.split("\n")
+    lines[40] = "He will not kill them now"
+    script.content = "INT. NEW OPENING - DAY\n" + "\n".join(lines)
+    await test_session.commit()
+
+    detections = await service.get_detections(script.id, expand=True)
+
+    by_text = {d.detected_text: d for d in detections}
+    moved = by_text["He will kill them 60"]
+    assert (moved.line_start, moved.stale) == (62, False)
+    assert moved.context_before == "Quiet line 59"
+    assert moved.matched_patterns["matches"][0]["text"] == "kill"
+    changed = by_text["He will kill them 40"]
+    assert changed.stale and changed.line_start == 41
+    assert "spans" in changed.matched_patterns
+    # the first hit's context gained the new heading
+    assert {d.detected_text for d in detections if d.stale} == {
+        "He will kill them 0",
+        "He will kill them 40",
+    }
+
+
+def test_expand_detection_leaves_legacy_rows_untouched():
+    legacy = {
+        "count": 1,
+        "matches": [{"text": "kill", "start": 0, "end": 4, "pattern": "kill"}],
+    }
+    detection = MagicMock(matched_patterns=legacy)
+
+    assert expand_detection(detection, ["kill"], 3) is detection
+
+
+@pytest.mark.asyncio
+async def test_full_scan_inserts_streamed_rows_in_batches(
+    test_session: AsyncSession, ml_client, monkeypatch
+):
+    monkeypatch.setattr(settings, "detection_insert_batch_size", 7)
+    script = Script(title="Batched", content=make_script(1000))
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+
+    executed = []
+    original_execute = test_session.execute
+
+    async def counting_execute(statement, *args, **kwargs):
+        if args and isinstance(args[0], list):
+            executed.append(len(args[0]))
+        return await original_execute(statement, *args, **kwargs)
+
+    monkeypatch.setattr(test_session, "execute", counting_execute)
+    summary = await service.detect_and_store_lines(script.id)
+
+    assert summary.detected == summary.total_detections == 50
+    assert executed == [7] * 7 + [1]
+
+
+@pytest.mark.asyncio
+async def test_detections_are_paged_in_line_order(
+    test_session: AsyncSession, ml_client
+):
+    script = Script(title="Paged", content=make_script(200))
+    test_session.add(script)
+    await test_session.commit()
+    service = DetectionService(test_session, ml_client)
+    await service.detect_and_store_lines(script.id)
+
+    everything = await service.get_detections(script.id)
+    pages = [
+        await service.get_detections(script.id, offset=offset, limit=3)
+        for offset in range(0, len(everything), 3)
+    ]
+
+    assert [d.id for page in pages for d in page] == [d.id for d in everything]
+    assert all(len(page) <= 3 for page in pages)
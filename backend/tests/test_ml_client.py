@@ -1,3 +1,4 @@
+import time
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
@@ -98,6 +99,29 @@ async def test_rate_script_connection_error_with_retry(ml_client):
         assert "Connection failed" in str(exc_info.value.detail)
 
 
+@pytest.mark.asyncio
+async def test_rate_script_sends_deadline_header(ml_client):
+    ml_client.timeout = 30
+    mock_response = MagicMock()
+    mock_response.json.return_value = {"predicted_rating": "6+"}
+    mock_response.raise_for_status = MagicMock()
+
+    with patch("app.services.ml_client.httpx.AsyncClient") as mock_client_class:
+        mock_client = AsyncMock()
+        mock_client.__aenter__.return_value = mock_client
+        mock_client.__aexit__.return_value = AsyncMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+        mock_client_class.return_value = mock_client
+
+        before = time.time()
+        await ml_client.rate_script("Test script", "script_1")
+
+        headers = mock_client.post.call_args.kwargs["headers"]
+        deadline = float(headers["X-Request-Deadline"])
+        # the header is rounded to the millisecond
+        assert before + 29 <= deadline <= time.time() + 30.001
+
+
 @pytest.mark.asyncio
 async def test_health_check_success(ml_client):
     mock_response = MagicMock()
@@ -136,3 +160,36 @@ async def test_health_check_failure(ml_client):
         with pytest.raises(MLServiceError) as exc_info:
             await ml_client.health_check()
         assert "Health check failed" in str(exc_info.value.detail)
+
+
+def _streaming_client(body: str):
+    real_client = httpx.AsyncClient
+
+    def handler(request):
+        return httpx.Response(200, text=body)
+
+    return lambda **kwargs: real_client(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+async def test_stream_detections_yields_until_summary(ml_client):
+    body = (
+        '{"detection": {"line_start": 3, "category": "violence"}}\n'
+        '{"detection": {"line_start": 9, "category": "drugs"}}\n'
+        '{"summary": {"total_detections": 2}}\n'
+    )
+
+    with patch("app.services.ml_client.httpx.AsyncClient", _streaming_client(body)):
+        items = [item async for item in ml_client.stream_detections("Test script")]
+
+    assert [item["line_start"] for item in items] == [3, 9]
+
+
+@pytest.mark.asyncio
+async def test_stream_detections_truncated_stream_fails(ml_client):
+    body = '{"detection": {"line_start": 3, "category": "violence"}}\n'
+
+    with patch("app.services.ml_client.httpx.AsyncClient", _streaming_client(body)):
+        with pytest.raises(MLServiceError):
+            async for _ in ml_client.stream_detections("Test script"):
+                pass
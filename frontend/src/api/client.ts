@@ -97,6 +97,14 @@ export interface SceneInfo {
   summary: string | null
 }
 
+export interface ScenePatch {
+  op: 'replace' | 'delete' | 'insert'
+  scene_id: number | null
+  start: number
+  end: number
+  text: string
+}
+
 export interface AdvancedWhatIfResponse {
   original_rating: string
   modified_rating: string
@@ -111,6 +119,9 @@ export interface AdvancedWhatIfResponse {
   scene_analysis: SceneInfo[]
   explanation: string
   modified_script: string | null
+  changed_scene_ids: number[]
+  scene_patches: ScenePatch[]
+  unified_diff: string | null
   rating_changed: boolean
 }
 
@@ -122,6 +133,8 @@ export interface SmartSuggestion {
   confidence: number
   affected_scenes: number[]
   reasoning: string
+  predicted_rating?: string | null
+  score_deltas?: Record<string, number>
 }
 
 export interface SmartSuggestionsResponse {
@@ -135,6 +148,7 @@ export interface LineMatch {
   text: string
   start: number
   end: number
+  // "category:index" reference to the ML service's pattern for compact rows
   pattern: string
 }
 
@@ -157,6 +171,16 @@ export interface LineDetection {
   is_false_positive?: boolean
   user_corrected?: boolean
   created_at?: string
+  stale?: boolean
+}
+
+export interface LineDetectionRun {
+  script_id: number
+  detection_revision: number
+  incremental: boolean
+  detected: number
+  kept: number
+  total_detections: number
 }
 
 export interface ParentsGuideCategoryStats {
@@ -274,13 +298,13 @@ export const scriptsApi = {
     return data
   },
 
-  detectLines: async (scriptId: number, contextSize: number = 3): Promise<LineDetection[]> => {
+  detectLines: async (scriptId: number, contextSize: number = 3): Promise<LineDetectionRun> => {
     const { data } = await apiClient.post(`/scripts/${scriptId}/detections?context_size=${contextSize}`)
     return data
   },
 
   getDetections: async (scriptId: number, includeFalsePositives: boolean = false): Promise<LineDetection[]> => {
-    const { data } = await apiClient.get(`/scripts/${scriptId}/detections?include_false_positives=${includeFalsePositives}`)
+    const { data } = await apiClient.get(`/scripts/${scriptId}/detections?include_false_positives=${includeFalsePositives}&expand=true`)
     return data
   },
 
@@ -290,7 +314,7 @@ export const scriptsApi = {
   },
 
   getScriptWithDetections: async (scriptId: number, includeFalsePositives: boolean = false): Promise<ScriptWithDetections> => {
-    const { data } = await apiClient.get(`/scripts/${scriptId}/detections/full?include_false_positives=${includeFalsePositives}`)
+    const { data } = await apiClient.get(`/scripts/${scriptId}/detections/full?include_false_positives=${includeFalsePositives}&expand=true`)
     return data
   },
 
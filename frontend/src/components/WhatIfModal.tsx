@@ -208,6 +208,11 @@ export default function WhatIfModal({ scriptText, currentRating, currentScores,
                               <span className="text-xs text-gray-500 dark:text-gray-400">
                                 Confidence: {Math.round(suggestion.confidence * 100)}%
                               </span>
+                              {suggestion.predicted_rating && (
+                                <span className="text-xs text-gray-500 dark:text-gray-400">
+                                  → {suggestion.predicted_rating}
+                                </span>
+                              )}
                             </div>
                             <div className="text-xs text-gray-600 dark:text-gray-400 italic">{suggestion.reasoning}</div>
                             {suggestion.affected_scenes.length > 0 && (
@@ -0,0 +1,106 @@
+"""Cooperative cancellation for long-running analyses.
+
+Request handlers bind a :class:`CancellationToken` to the current context and
+the pipelines call :func:`checkpoint` between scenes. When the caller's
+deadline passes or the client disconnects, the next checkpoint raises and the
+remaining work is abandoned instead of being computed for nobody.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+class AnalysisCancelled(Exception):
+    """Base class for analyses aborted before completion."""
+
+    reason = "cancelled"
+    status_code = 499
+
+
+class DeadlineExceeded(AnalysisCancelled):
+    """The caller's deadline passed while the analysis was running."""
+
+    reason = "deadline_exceeded"
+    status_code = 504
+
+
+class ClientDisconnected(AnalysisCancelled):
+    """The client went away while the analysis was running."""
+
+    reason = "client_disconnected"
+    status_code = 499
+
+
+class CancellationToken:
+    """Deadline plus cancel flag shared between the request and its worker."""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.time())
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise ClientDisconnected("Client disconnected before analysis finished")
+        if self.expired:
+            raise DeadlineExceeded("Request deadline exceeded")
+
+
+_current_token: ContextVar[Optional[CancellationToken]] = ContextVar(
+    "cancellation_token", default=None
+)
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _current_token.get()
+
+
+@contextmanager
+def bind_token(token: Optional[CancellationToken]) -> Iterator[None]:
+    """Make ``token`` visible to :func:`checkpoint` for the enclosed block."""
+    reset = _current_token.set(token)
+    try:
+        yield
+    finally:
+        _current_token.reset(reset)
+
+
+def checkpoint() -> None:
+    """Abort the current analysis if its request was cancelled or timed out.
+
+    A no-op when no token is bound, so library and CLI callers are unaffected.
+    """
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def parse_deadline_header(value: Optional[str]) -> Optional[float]:
+    """Parse an absolute deadline given as unix epoch seconds."""
+    if not value:
+        return None
+    try:
+        deadline = float(value)
+    except ValueError:
+        return None
+    return deadline if deadline > 0 else None
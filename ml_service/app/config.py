@@ -18,6 +18,53 @@ class Settings(BaseSettings):
     json_logs: bool = False
     enable_metrics: bool = True
 
+    # how often a running analysis checks whether its client is still there
+    disconnect_poll_interval: float = 0.5
+
+    # /debug/profile is only served when enabled and a token is configured
+    enable_profiling: bool = False
+    profiling_token: str = ""
+    profiling_max_seconds: float = 30.0
+    # per-pattern call/match/time counters for every scan (adds overhead)
+    pattern_profiling: bool = False
+
+    # per-scene scores kept by scene text hash, so what-if re-analyses only
+    # rescore scenes a modification changed (0 disables)
+    scene_score_cache_size: int = 4096
+    # threads evaluating the variants of one /what_if_batch call
+    what_if_batch_workers: int = 4
+    # spaCy entity extraction for /what_if_advanced: scenes per nlp.pipe
+    # batch, worker processes (1 runs in process), characters of a scene that
+    # are read, and per-scene entities kept by scene text hash (0 disables)
+    entity_batch_size: int = 64
+    entity_n_process: int = 1
+    entity_max_scene_chars: int = 20000
+    entity_cache_size: int = 4096
+    # pipeline results kept by script text hash, so /rating_advisor can
+    # advise on a script /rate_script already analyzed (0 disables); the
+    # oldest are evicted past either cap
+    analysis_cache_size: int = 64
+    analysis_cache_max_bytes: int = 128 * 1024 * 1024
+
+    # shared LLM gateway (what-if rewrites, rating advisor): concurrent
+    # calls, token-bucket pacing (calls per second, 0 disables) and burst,
+    # per-call deadline, and responses cached by provider, model and prompt
+    # hash for a TTL. Base URLs can point at a local stub server.
+    llm_max_concurrency: int = 8
+    llm_rate_per_second: float = 5.0
+    llm_rate_burst: int = 10
+    llm_timeout_seconds: float = 60.0
+    llm_cache_ttl_seconds: float = 3600.0
+    llm_cache_size: int = 1024
+    llm_openai_base_url: str = "https://api.openai.com/v1"
+    llm_anthropic_base_url: str = "https://api.anthropic.com/v1"
+
+    # /sessions keep a parsed, scored script between what-if calls; idle
+    # sessions expire, and the oldest are evicted past either cap
+    session_ttl_seconds: float = 1800.0
+    session_max_count: int = 256
+    session_max_bytes: int = 256 * 1024 * 1024
+
     class Config:
         env_file = ".env"
         env_prefix = "ML_"
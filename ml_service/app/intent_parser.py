@@ -0,0 +1,88 @@
+"""Compiled parser for what-if modification requests.
+
+All intent patterns are folded into one regex: each pattern sits in its own
+optional lookahead from the start of the request, so a single ``match`` call
+finds the leftmost match of every pattern, exactly as a ``re.search`` per
+pattern would, and reports it through a named group. Example phrases for
+similarity checks are embedded and normalized once, when the parser is built;
+classifying a phrase then costs one encoder call and a dot product.
+"""
+
+import re
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+class IntentParser:
+    def __init__(
+        self,
+        patterns: Mapping[str, Sequence[str]],
+        examples: Mapping[str, Sequence[str]],
+        embedder: Any,
+        flags: int = re.I | re.U,
+    ):
+        self.embedder = embedder
+        # (group name, intent, pattern, number of its own groups)
+        self._entries: List[Tuple[str, str, str, int]] = []
+        lookaheads = []
+        for intent, intent_patterns in patterns.items():
+            for pattern in intent_patterns:
+                name = f"_p{len(self._entries)}"
+                groups = re.compile(pattern, flags).groups
+                self._entries.append((name, intent, pattern, groups))
+                lookaheads.append(f"(?=(?:[\\s\\S]*?(?P<{name}>{pattern}))?)")
+        self.regex = re.compile("".join(lookaheads), flags)
+
+        self._examples: Dict[str, np.ndarray] = {}
+        for name, phrases in examples.items():
+            vectors = np.asarray(
+                embedder.encode(list(phrases), convert_to_numpy=True), dtype=float
+            )
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._examples[name] = vectors / np.where(norms == 0, 1, norms)
+
+    def matches(self, request: str) -> List[Dict[str, Any]]:
+        """Leftmost match of every pattern that occurs in ``request``.
+
+        ``groups`` are the pattern's own capture groups, numbered from 1 as
+        in the pattern; ``last_group`` is the last of them that took part.
+        """
+        match = self.regex.match(request)
+        found: List[Dict[str, Any]] = []
+        if match is None:
+            return found
+        for name, intent, pattern, group_count in self._entries:
+            if match.group(name) is None:
+                continue
+            first = match.re.groupindex[name] + 1
+            groups = [match.group(first + i) for i in range(group_count)]
+            last_group = max(
+                (i + 1 for i, g in enumerate(groups) if g is not None), default=None
+            )
+            found.append(
+                {
+                    "intent": intent,
+                    "pattern": pattern,
+                    "text": match.group(name),
+                    "span": match.span(name),
+                    "groups": groups,
+                    "last_group": last_group,
+                }
+            )
+        return found
+
+    def similarities(self, phrase: str) -> Dict[str, float]:
+        """Best cosine similarity of ``phrase`` to each set of examples."""
+        if not self._examples:
+            return {}
+        vector = np.asarray(
+            self.embedder.encode([phrase], convert_to_numpy=True)[0], dtype=float
+        )
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        return {
+            name: float((examples @ vector).max())
+            for name, examples in self._examples.items()
+        }
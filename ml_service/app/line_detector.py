@@ -4,9 +4,15 @@ Provides detailed line-by-line analysis with context.
 """
 
 import re
-from typing import List, Dict, Any
+import time
+from typing import Any, Dict, Iterator, List
 from loguru import logger
 
+from .metrics import record_scan_degraded
+from .profiling import active_pattern_profilers
+from .regex_guard import LINE_SCAN_BUDGET, ScanBudget, compile_guarded
+from .script_index import BLANK, get_script_index
+
 
 CATEGORY_PATTERNS = {
     "violence": [
@@ -268,40 +274,85 @@ def get_parents_guide_severity(severity: float, category: str) -> str:
         return "NONE"
 
 
+def pattern_id(category: str, index: int) -> str:
+    """Short reference to ``CATEGORY_PATTERNS[category][index]``."""
+    return f"{category}:{index}"
+
+
 class LineDetector:
     def __init__(self):
         self.compiled_patterns = {}
         for category, patterns in CATEGORY_PATTERNS.items():
+            # unbounded ".*" gaps are made linear-time; matches still report
+            # the source pattern from CATEGORY_PATTERNS
             self.compiled_patterns[category] = [
-                re.compile(pattern, re.IGNORECASE) for pattern in patterns
+                (pattern, compile_guarded(pattern, re.IGNORECASE))
+                for pattern in patterns
             ]
         logger.info(
             f"LineDetector initialized with {len(CATEGORY_PATTERNS)} categories"
         )
 
-    def detect_lines(self, text: str, context_size: int = 3) -> List[Dict[str, Any]]:
+    def detect_lines(
+        self,
+        text: str,
+        context_size: int = 3,
+        line_offset: int = 0,
+        compact: bool = False,
+    ) -> List[Dict[str, Any]]:
         """
         Detect problematic lines in script with context.
 
+        Collects ``iter_detections``; see there for the arguments.
+        """
+        return list(self.iter_detections(text, context_size, line_offset, compact))
+
+    def iter_detections(
+        self,
+        text: str,
+        context_size: int = 3,
+        line_offset: int = 0,
+        compact: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yield problematic lines in script order, one detection at a time.
+
         Args:
             text: Script content
             context_size: Number of lines before/after to include as context
-
-        Returns:
-            List of detections with line numbers, text, context, category, and matches
+            line_offset: Number of script lines preceding ``text`` when it is an
+                excerpt; line and page numbers are reported for the full script
+            compact: Omit context strings and report matches as
+                ``[start, end, pattern_id]`` spans; callers that keep the script
+                text rebuild both on read
+
+        Yields:
+            Detections with line numbers, text, context, category, and matches
         """
-        lines = text.split("\n")
-        detections = []
+        index = get_script_index(text)
+        lines = index.lines
+        detected = 0
+        profilers = active_pattern_profilers()
+        degraded_lines = 0
 
         for line_idx, line in enumerate(lines):
-            line_num = line_idx + 1
+            if index.types[line_idx] == BLANK:
+                continue
+            line_num = line_idx + 1 + line_offset
+            budget = ScanBudget(LINE_SCAN_BUDGET)
 
             for category, patterns in self.compiled_patterns.items():
-                matches = []
+                matches: List[Dict[str, Any]] = []
                 matched_texts = set()
 
-                for pattern in patterns:
+                for pattern_idx, (source, pattern) in enumerate(patterns):
+                    if budget.check():
+                        break
+                    pattern_started = time.perf_counter() if profilers else 0.0
+                    matches_before = len(matches)
+                    found = 0
                     for match in pattern.finditer(line):
+                        found += 1
                         matched_text = match.group(0)
                         if matched_text.lower() not in matched_texts:
                             matched_texts.add(matched_text.lower())
@@ -310,36 +361,50 @@ class LineDetector:
                                     "text": matched_text,
                                     "start": match.start(),
                                     "end": match.end(),
-                                    "pattern": pattern.pattern,
+                                    "pattern": (
+                                        pattern_id(category, pattern_idx)
+                                        if compact
+                                        else source
+                                    ),
                                 }
                             )
+                    if profilers:
+                        # repeated matches of the same text count as suppressed
+                        duplicates = found - (len(matches) - matches_before)
+                        for profiler in profilers:
+                            profiler.record(
+                                f"line_detector.{category}",
+                                source,
+                                time.perf_counter() - pattern_started,
+                                matches=found,
+                                suppressed=duplicates,
+                            )
 
                 if matches:
-                    context_before = self._get_context_lines(
-                        lines, line_idx, -context_size, 0
-                    )
-                    context_after = self._get_context_lines(
-                        lines, line_idx, 1, context_size + 1
-                    )
+                    if compact:
+                        context_before = context_after = []
+                    else:
+                        context_before = self._get_context_lines(
+                            index.stripped, line_idx, -context_size, 0
+                        )
+                        context_after = self._get_context_lines(
+                            index.stripped, line_idx, 1, context_size + 1
+                        )
 
                     severity = self._calculate_severity(category, len(matches), line)
                     parents_guide_severity = get_parents_guide_severity(
                         severity, category
                     )
 
-                    previous_line = lines[line_idx - 1] if line_idx > 0 else ""
-                    character_name = extract_character_name(line, previous_line)
-
-                    if not character_name and line_idx > 0:
-                        character_name = extract_character_name(lines[line_idx - 1])
-
+                    character_name = index.speaker_at(line_idx)
                     page_number = (line_num - 1) // 55 + 1
 
-                    detections.append(
+                    detected += 1
+                    yield (
                         {
                             "line_start": line_num,
                             "line_end": line_num,
-                            "detected_text": line.strip(),
+                            "detected_text": index.stripped[line_idx],
                             "context_before": (
                                 "\n".join(context_before) if context_before else None
                             ),
@@ -351,15 +416,30 @@ class LineDetector:
                             "parents_guide_severity": parents_guide_severity,
                             "character_name": character_name,
                             "page_number": page_number,
-                            "matched_patterns": {
-                                "count": len(matches),
-                                "matches": matches,
-                            },
+                            "matched_patterns": (
+                                {
+                                    "count": len(matches),
+                                    "spans": [
+                                        [m["start"], m["end"], m["pattern"]]
+                                        for m in matches
+                                    ],
+                                }
+                                if compact
+                                else {"count": len(matches), "matches": matches}
+                            ),
                         }
                     )
 
-        logger.info(f"Detected {len(detections)} problematic lines in script")
-        return detections
+            if budget.exhausted:
+                degraded_lines += 1
+                record_scan_degraded("line")
+
+        if degraded_lines:
+            logger.warning(
+                f"Pattern scan budget exhausted on {degraded_lines} lines, "
+                "detections for them may be incomplete"
+            )
+        logger.info(f"Detected {detected} problematic lines in script")
 
     def get_statistics(self, detections: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Calculate statistics from detections."""
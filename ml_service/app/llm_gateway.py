@@ -0,0 +1,377 @@
+"""Shared gateway for every LLM call the service makes.
+
+What-if scene rewrites and rating advisor recommendations both go through
+one gateway. It owns an event loop thread and an ``httpx.AsyncClient`` and
+talks to the providers' HTTP APIs directly, so a stub server on localhost can
+stand in for them (see the ``llm_*_base_url`` settings). Calls run
+concurrently up to ``max_concurrency`` and are paced by a token bucket. Each
+call has a deadline that covers its time queued for a slot. Identical calls
+(same prompt, settings and API key) in flight at the same time share one
+upstream request; each caller still waits only until its own deadline, and
+the request is dropped once no caller waits for it. Successful responses are
+cached by (provider, model, call hash) for ``cache_ttl`` seconds.
+
+Blocking callers (the analyzers, which run in the threadpool) submit a batch
+and wait for it, checking the request's cancellation token as they do.
+Coroutines can await ``acomplete``.
+"""
+
+import asyncio
+import concurrent.futures
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import httpx
+from loguru import logger
+
+from .cancellation import AnalysisCancelled, checkpoint
+from .config import settings
+from .metrics import record_cache_lookup
+
+DEFAULT_MODELS = {
+    "openai": "gpt-4o-mini",
+    "anthropic": "claude-3-5-haiku-20241022",
+}
+API_KEY_VARS = {
+    "openai": "OPENAI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+}
+ANTHROPIC_VERSION = "2023-06-01"
+
+# how often a blocked caller checks whether its request was cancelled
+WAIT_POLL_SECONDS = 0.1
+
+CallKey = Tuple[str, str, str]
+
+
+class LLMGatewayError(Exception):
+    """An LLM call failed: unknown provider, no API key or a bad reply."""
+
+
+class LLMTimeoutError(LLMGatewayError):
+    """An LLM call ran past its deadline."""
+
+
+class LLMCall:
+    def __init__(
+        self,
+        provider: str,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+        api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.provider = provider.lower()
+        self.prompt = prompt
+        self.model = model or DEFAULT_MODELS.get(self.provider, "")
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def key(self) -> CallKey:
+        """Cache and coalescing key; sampling settings and the API key count
+        as prompt, so a reply is never shared across credentials."""
+        payload = json.dumps(
+            [self.prompt, self.temperature, self.max_tokens, self.api_key]
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return self.provider, self.model, digest
+
+
+def build_request(
+    call: LLMCall, base_url: str, api_key: str
+) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+    """URL, headers and JSON body of ``call`` for its provider's API."""
+    messages = [{"role": "user", "content": call.prompt}]
+    base_url = base_url.rstrip("/")
+    if call.provider == "openai":
+        return (
+            f"{base_url}/chat/completions",
+            {"Authorization": f"Bearer {api_key}"},
+            {
+                "model": call.model,
+                "messages": messages,
+                "temperature": call.temperature,
+                "max_tokens": call.max_tokens,
+            },
+        )
+    if call.provider == "anthropic":
+        return (
+            f"{base_url}/messages",
+            {"x-api-key": api_key, "anthropic-version": ANTHROPIC_VERSION},
+            {
+                "model": call.model,
+                "messages": messages,
+                "temperature": call.temperature,
+                "max_tokens": call.max_tokens,
+            },
+        )
+    raise LLMGatewayError(f"Unknown LLM provider: {call.provider}")
+
+
+def parse_response(provider: str, body: Dict[str, Any]) -> str:
+    try:
+        if provider == "openai":
+            return str(body["choices"][0]["message"]["content"])
+        return str(body["content"][0]["text"])
+    except (KeyError, IndexError, TypeError) as e:
+        raise LLMGatewayError(f"Unexpected {provider} response: {e!r}") from e
+
+
+class TokenBucket:
+    """Allows ``rate`` calls a second on average, ``burst`` at once."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # waiters queue on the lock, so tokens go out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache_ttl: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        base_urls: Optional[Dict[str, str]] = None,
+    ):
+        def pick(value, default):
+            return default if value is None else value
+
+        self.max_concurrency = max(
+            1, pick(max_concurrency, settings.llm_max_concurrency)
+        )
+        self.rate_per_second = pick(rate_per_second, settings.llm_rate_per_second)
+        self.burst = pick(burst, settings.llm_rate_burst)
+        self.timeout = pick(timeout, settings.llm_timeout_seconds)
+        self.cache_ttl = pick(cache_ttl, settings.llm_cache_ttl_seconds)
+        self.cache_size = pick(cache_size, settings.llm_cache_size)
+        self.base_urls = {
+            "openai": settings.llm_openai_base_url,
+            "anthropic": settings.llm_anthropic_base_url,
+            **(base_urls or {}),
+        }
+        # upstream requests made, calls served from the cache, and calls that
+        # joined an identical request already in flight
+        self.stats = {"upstream": 0, "cache_hits": 0, "coalesced": 0}
+
+        self._cache: "OrderedDict[CallKey, Tuple[float, str]]" = OrderedDict()
+        self._in_flight: Dict[CallKey, asyncio.Task] = {}
+        # callers waiting on each in-flight request
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._start_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket = TokenBucket(self.rate_per_second, self.burst)
+
+    def submit(self, call: LLMCall) -> "concurrent.futures.Future[str]":
+        """Schedule ``call`` on the gateway loop."""
+        return asyncio.run_coroutine_threadsafe(self._complete(call), self._get_loop())
+
+    def complete_many(self, calls: Sequence[LLMCall]) -> List[str | Exception]:
+        """Run ``calls`` concurrently; each result is a text or the exception.
+
+        Blocks until all are done. If the surrounding request is cancelled,
+        the calls still waiting are dropped and ``AnalysisCancelled`` raised.
+        """
+        futures = [self.submit(call) for call in calls]
+        pending = set(futures)
+        try:
+            while pending:
+                _, pending = concurrent.futures.wait(pending, timeout=WAIT_POLL_SECONDS)
+                checkpoint()
+        except AnalysisCancelled:
+            for future in futures:
+                future.cancel()
+            raise
+        results: List[str | Exception] = []
+        for future in futures:
+            if future.cancelled():
+                results.append(LLMGatewayError("LLM call was cancelled"))
+                continue
+            error = future.exception()
+            if error is None:
+                results.append(future.result())
+            elif isinstance(error, Exception):
+                results.append(error)
+            else:
+                raise error
+        return results
+
+    def complete(self, call: LLMCall) -> str:
+        (result,) = self.complete_many([call])
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def acomplete(self, call: LLMCall) -> str:
+        return await asyncio.wrap_future(self.submit(call))
+
+    def close(self):
+        """Stop the loop thread and the HTTP client; later calls start anew."""
+        with self._start_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or thread is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        self._client = None
+        self._semaphore = None
+        self._in_flight.clear()
+        self._waiters.clear()
+        self._bucket = TokenBucket(self.rate_per_second, self.burst)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="llm-gateway", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    async def _complete(self, call: LLMCall) -> str:
+        key = call.key()
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(call, key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.stats["coalesced"] += 1
+
+        timeout = self.timeout if call.timeout is None else call.timeout
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # a caller giving up must not cancel the request for the others
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(
+                f"{call.provider} call did not finish within {timeout}s"
+            )
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                # nobody is left to take the reply
+                if self._in_flight.get(key) is task:
+                    del self._in_flight[key]
+                task.cancel()
+
+    def _finish(self, key: CallKey, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # every waiter may be gone; mark a failure as seen
+            task.exception()
+
+    async def _fetch(self, call: LLMCall, key: CallKey) -> str:
+        text = await self._request(call)
+        self._store(key, text)
+        return text
+
+    async def _request(self, call: LLMCall) -> str:
+        base_url = self.base_urls.get(call.provider)
+        if base_url is None:
+            raise LLMGatewayError(f"Unknown LLM provider: {call.provider}")
+        api_key = call.api_key or os.getenv(API_KEY_VARS.get(call.provider, ""), "")
+        if not api_key:
+            raise LLMGatewayError(f"No API key configured for {call.provider}")
+        url, headers, payload = build_request(call, base_url, api_key)
+
+        await self._bucket.acquire()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            self.stats["upstream"] += 1
+            response = await self._get_client().post(url, headers=headers, json=payload)
+        if response.status_code >= 400:
+            raise LLMGatewayError(
+                f"{call.provider} returned {response.status_code}: "
+                f"{response.text[:200]}"
+            )
+        return parse_response(call.provider, response.json())
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+            )
+        return self._client
+
+    def _cached(self, key: CallKey) -> Optional[str]:
+        if self.cache_size <= 0 or self.cache_ttl <= 0:
+            return None
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            del self._cache[key]
+            entry = None
+        record_cache_lookup("llm_responses", entry is not None)
+        if entry is None:
+            return None
+        self._cache.move_to_end(key)
+        self.stats["cache_hits"] += 1
+        return entry[1]
+
+    def _store(self, key: CallKey, text: str):
+        if self.cache_size <= 0 or self.cache_ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + self.cache_ttl, text)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        logger.debug(f"Cached {key[0]}/{key[1]} response ({len(self._cache)} held)")
+
+
+_gateway = LLMGateway()
+
+
+def get_llm_gateway() -> LLMGateway:
+    return _gateway
@@ -1,5 +1,14 @@
-from fastapi import FastAPI, HTTPException, Response
+import asyncio
+import hmac
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Set
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from loguru import logger
 
 from .schemas import (
@@ -8,14 +17,32 @@ from .schemas import (
     HealthResponse,
     WhatIfRequest,
     WhatIfResponse,
+    WhatIfBatchRequest,
+    WhatIfBatchResponse,
     StructuredWhatIfRequest,
     AdvancedWhatIfResponse,
     RatingAdvisorRequest,
     RatingAdvisorResponse,
     SmartSuggestionsRequest,
     SmartSuggestionsResponse,
+    RatingOptimizationRequest,
+    RatingOptimizationResponse,
+    SensitivityRequest,
+    SensitivityResponse,
+    SessionOpenRequest,
+    SessionUpdateRequest,
+    SessionResponse,
+    SessionWhatIfRequest,
+    SessionWhatIfBatchRequest,
+    SessionSuggestionsRequest,
+    SessionAdvisorRequest,
+    SessionSensitivityRequest,
     LineDetectionRequest,
     LineDetectionResponse,
+    PatternTimingSchema,
+    IntentExplanationResponse,
+    ProfileRequest,
+    ProfileResponse,
 )
 from .pipeline import get_pipeline
 from .what_if import get_what_if_analyzer
@@ -23,15 +50,47 @@ from .what_if_advanced import get_advanced_analyzer
 from .what_if_advanced.schemas import (
     StructuredWhatIfRequest as InternalStructuredRequest,
 )
-from .rating_advisor import RatingAdvisor
+from .rating_advisor import AnalysisNotCached, RatingAdvisor
+from .rating_optimizer import optimize_rating
+from .sensitivity import scene_sensitivity
 from .rating_advisor.schemas import RatingAdvisorRequest as InternalAdvisorRequest
 from .line_detector import LineDetector
+from .sessions import (
+    ScriptSession,
+    SessionConflict,
+    SessionTooLarge,
+    get_session_store,
+)
 from .config import settings
-from .metrics import get_metrics, track_inference_time
+from .cancellation import (
+    DEADLINE_HEADER,
+    AnalysisCancelled,
+    CancellationToken,
+    bind_token,
+    parse_deadline_header,
+)
+from .profiling import (
+    PatternProfilerCollector,
+    enable_pattern_profiling,
+    profile_session,
+    workload_pattern_profiler,
+)
+from .metrics import (
+    registry,
+    get_metrics_for,
+    record_cancellation,
+    record_stage_time,
+    stage_span,
+    track_inference_time,
+)
 from .structured_logger import setup_structured_logging
 
 setup_structured_logging(json_logs=settings.json_logs)
 
+if settings.pattern_profiling:
+    registry.register(PatternProfilerCollector(enable_pattern_profiling()))
+    logger.warning("Pattern profiling enabled: keyword scans are instrumented")
+
 app = FastAPI(
     title="Movie Script Rating Service",
     description="ML service for analyzing movie scripts and predicting age ratings",
@@ -47,6 +106,47 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(AnalysisCancelled)
+async def analysis_cancelled_handler(request: Request, exc: AnalysisCancelled):
+    endpoint = request.url.path.strip("/") or "root"
+    record_cancellation(endpoint, exc.reason)
+    logger.warning(f"Analysis aborted on {request.url.path}: {exc.reason}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "reason": exc.reason},
+    )
+
+
+async def run_cancellable(
+    http_request: Request, func: Callable[..., Any], *args: Any, **kwargs: Any
+) -> Any:
+    """Run blocking analysis work in the threadpool, aborting it cooperatively.
+
+    The deadline comes from the caller's ``X-Request-Deadline`` header. While
+    the worker runs we poll for a client disconnect; either condition is
+    observed by the pipelines at their next ``checkpoint()``.
+    """
+    token = CancellationToken(
+        deadline=parse_deadline_header(http_request.headers.get(DEADLINE_HEADER))
+    )
+    token.check()
+
+    submitted = time.perf_counter()
+
+    def work() -> Any:
+        record_stage_time("queue_wait", time.perf_counter() - submitted)
+        with bind_token(token):
+            return func(*args, **kwargs)
+
+    task = asyncio.ensure_future(run_in_threadpool(work))
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+        if done:
+            return task.result()
+        if not token.cancelled and await http_request.is_disconnected():
+            token.cancel()
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health():
     try:
@@ -63,41 +163,76 @@ async def health():
 
 @app.post("/rate_script", response_model=ScriptRatingResponse)
 @track_inference_time("rate_script")
-async def rate_script(request: ScriptRequest):
+async def rate_script(request: ScriptRequest, http_request: Request):
     try:
         pipeline = get_pipeline()
-        result = pipeline.analyze_script(request.text, request.script_id)
-        return ScriptRatingResponse(**result)
+        result = await run_cancellable(
+            http_request, pipeline.analyze_script, request.text, request.script_id
+        )
+        # encoded here, so the span covers the JSON FastAPI would otherwise
+        # produce after the handler returns
+        with stage_span("serialization", script_id=request.script_id):
+            body = ScriptRatingResponse(**result).model_dump_json()
+        return Response(content=body, media_type="application/json")
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error processing script: {e}")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
 @app.get("/metrics")
-async def metrics():
-    """Prometheus metrics endpoint"""
+async def metrics(request: Request):
+    """Prometheus metrics endpoint (OpenMetrics with exemplars on request)"""
     if not settings.enable_metrics:
         raise HTTPException(status_code=404, detail="Metrics disabled")
-    return Response(content=get_metrics(), media_type="text/plain")
+    content, media_type = get_metrics_for(request.headers.get("accept"))
+    return Response(content=content, media_type=media_type)
 
 
 @app.post("/what_if", response_model=WhatIfResponse)
 @track_inference_time("what_if")
-async def what_if_simulation(request: WhatIfRequest):
+async def what_if_simulation(request: WhatIfRequest, http_request: Request):
     try:
         analyzer = get_what_if_analyzer()
-        result = analyzer.simulate_what_if(
-            request.script_text, request.modification_request
+        result = await run_cancellable(
+            http_request,
+            analyzer.simulate_what_if,
+            request.script_text,
+            request.modification_request,
         )
         return WhatIfResponse(**result)
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error processing what-if request: {e}")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+@app.post("/what_if_batch", response_model=WhatIfBatchResponse)
+@track_inference_time("what_if_batch")
+async def what_if_batch(request: WhatIfBatchRequest, http_request: Request):
+    try:
+        analyzer = get_what_if_analyzer()
+        result = await run_cancellable(
+            http_request,
+            analyzer.simulate_what_if_batch,
+            request.script_text,
+            request.modification_requests,
+        )
+        return WhatIfBatchResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing what-if batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
 @app.post("/what_if_advanced", response_model=AdvancedWhatIfResponse)
 @track_inference_time("what_if_advanced")
-async def what_if_advanced_simulation(request: StructuredWhatIfRequest):
+async def what_if_advanced_simulation(
+    request: StructuredWhatIfRequest, http_request: Request
+):
     try:
         use_llm = request.use_llm
         llm_provider = request.llm_provider
@@ -109,9 +244,13 @@ async def what_if_advanced_simulation(request: StructuredWhatIfRequest):
 
         internal_request = InternalStructuredRequest(**request.model_dump())
 
-        result = analyzer.analyze_structured(internal_request)
+        result = await run_cancellable(
+            http_request, analyzer.analyze_structured, internal_request
+        )
 
         return AdvancedWhatIfResponse(**result.model_dump())
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error processing advanced what-if request: {e}")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
@@ -119,12 +258,20 @@ async def what_if_advanced_simulation(request: StructuredWhatIfRequest):
 
 @app.post("/rating_advisor", response_model=RatingAdvisorResponse)
 @track_inference_time("rating_advisor")
-async def rating_advisor(request: RatingAdvisorRequest):
+async def rating_advisor(request: RatingAdvisorRequest, http_request: Request):
+    if not (request.script_text or request.script_hash or request.scenes is not None):
+        raise HTTPException(
+            status_code=422, detail="Send script_text, script_hash or scenes"
+        )
     try:
         advisor = RatingAdvisor(use_llm=True)
         internal_request = InternalAdvisorRequest(**request.model_dump())
-        result = advisor.analyze(internal_request)
+        result = await run_cancellable(http_request, advisor.analyze, internal_request)
         return RatingAdvisorResponse(**result.model_dump())
+    except AnalysisCancelled:
+        raise
+    except AnalysisNotCached as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing rating advisor request: {e}")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
@@ -132,27 +279,292 @@ async def rating_advisor(request: RatingAdvisorRequest):
 
 @app.post("/what_if_suggestions", response_model=SmartSuggestionsResponse)
 @track_inference_time("what_if_suggestions")
-async def what_if_suggestions(request: SmartSuggestionsRequest):
+async def what_if_suggestions(request: SmartSuggestionsRequest, http_request: Request):
     try:
         analyzer = get_what_if_analyzer()
-        result = analyzer.generate_smart_suggestions(
+        result = await run_cancellable(
+            http_request,
+            analyzer.generate_smart_suggestions,
             script_text=request.script_text,
             current_scores=request.current_scores,
             language=request.language,
             max_suggestions=request.max_suggestions,
+            current_rating=request.current_rating,
+            scene_scores=request.scene_scores,
         )
         return SmartSuggestionsResponse(**result)
+    except AnalysisCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error generating smart suggestions: {e}")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+@app.post("/optimize_rating", response_model=RatingOptimizationResponse)
+@track_inference_time("optimize_rating")
+async def optimize_rating_endpoint(
+    request: RatingOptimizationRequest, http_request: Request
+):
+    try:
+        result = await run_cancellable(
+            http_request,
+            optimize_rating,
+            request.script_text,
+            request.target_rating,
+            max_edits=request.max_edits,
+            beam_width=request.beam_width,
+            max_plans=request.max_plans,
+            allow_removal=request.allow_removal,
+        )
+        return RatingOptimizationResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error optimizing rating: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+@app.post("/scene_sensitivity", response_model=SensitivityResponse)
+@track_inference_time("scene_sensitivity")
+async def scene_sensitivity_endpoint(
+    request: SensitivityRequest, http_request: Request
+):
+    try:
+        result = await run_cancellable(
+            http_request,
+            scene_sensitivity,
+            request.script_text,
+            scene_scores=request.scene_scores,
+            max_scenes=request.max_scenes,
+        )
+        return SensitivityResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing scene sensitivity: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+def _get_session(session_id: str) -> ScriptSession:
+    session = get_session_store().get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+def _session_response(session: ScriptSession) -> SessionResponse:
+    state = get_session_store().snapshot(session)
+    return SessionResponse(
+        session_id=state.session_id,
+        revision=state.revision,
+        rating=state.analysis["rating"],
+        scores=state.analysis["scores"],
+        total_scenes=state.analysis["total_scenes"],
+        expires_in=get_session_store().expires_in(state),
+    )
+
+
+@app.post("/sessions", response_model=SessionResponse)
+@track_inference_time("sessions")
+async def open_session(request: SessionOpenRequest, http_request: Request):
+    try:
+        analysis = await run_cancellable(
+            http_request,
+            get_what_if_analyzer()._analyze_script,
+            request.script_text,
+        )
+        session = get_session_store().add(request.script_text, analysis)
+    except AnalysisCancelled:
+        raise
+    except SessionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error opening session: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+    return _session_response(session)
+
+
+@app.get("/sessions/{session_id}", response_model=SessionResponse)
+async def get_session(session_id: str):
+    return _session_response(_get_session(session_id))
+
+
+@app.put("/sessions/{session_id}", response_model=SessionResponse)
+@track_inference_time("sessions")
+async def update_session(
+    session_id: str, request: SessionUpdateRequest, http_request: Request
+):
+    session = _get_session(session_id)
+    revision = session.revision
+    try:
+        analysis = await run_cancellable(
+            http_request,
+            get_what_if_analyzer()._analyze_script,
+            request.script_text,
+        )
+        get_session_store().update(session, request.script_text, analysis, revision)
+    except AnalysisCancelled:
+        raise
+    except SessionConflict:
+        raise HTTPException(status_code=409, detail="Session changed concurrently")
+    except SessionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error updating session: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+    return _session_response(session)
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+async def close_session(session_id: str):
+    if not get_session_store().remove(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return Response(status_code=204)
+
+
+@app.post("/sessions/{session_id}/what_if", response_model=WhatIfResponse)
+@track_inference_time("what_if")
+async def session_what_if(
+    session_id: str, request: SessionWhatIfRequest, http_request: Request
+):
+    session = _get_session(session_id)
+    state = get_session_store().snapshot(session)
+    try:
+        result, modified_text, modified_result = await run_cancellable(
+            http_request,
+            get_what_if_analyzer().simulate_modification,
+            state.script_text,
+            request.modification_request,
+            state.analysis,
+        )
+        if request.apply:
+            get_session_store().update(
+                session, modified_text, modified_result, state.revision
+            )
+        return WhatIfResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except SessionConflict:
+        raise HTTPException(status_code=409, detail="Session changed concurrently")
+    except SessionTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing session what-if request: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+@app.post("/sessions/{session_id}/what_if_batch", response_model=WhatIfBatchResponse)
+@track_inference_time("what_if_batch")
+async def session_what_if_batch(
+    session_id: str, request: SessionWhatIfBatchRequest, http_request: Request
+):
+    state = get_session_store().snapshot(_get_session(session_id))
+    try:
+        result = await run_cancellable(
+            http_request,
+            get_what_if_analyzer().simulate_what_if_batch,
+            state.script_text,
+            request.modification_requests,
+            state.analysis,
+        )
+        return WhatIfBatchResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing session what-if batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+@app.post(
+    "/sessions/{session_id}/scene_sensitivity", response_model=SensitivityResponse
+)
+@track_inference_time("scene_sensitivity")
+async def session_scene_sensitivity(
+    session_id: str, request: SessionSensitivityRequest, http_request: Request
+):
+    state = get_session_store().snapshot(_get_session(session_id))
+    try:
+        result = await run_cancellable(
+            http_request,
+            scene_sensitivity,
+            state.script_text,
+            scene_scores=state.analysis["scene_scores"],
+            max_scenes=request.max_scenes,
+        )
+        return SensitivityResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error computing session scene sensitivity: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+@app.post(
+    "/sessions/{session_id}/what_if_suggestions",
+    response_model=SmartSuggestionsResponse,
+)
+@track_inference_time("what_if_suggestions")
+async def session_what_if_suggestions(
+    session_id: str, request: SessionSuggestionsRequest, http_request: Request
+):
+    state = get_session_store().snapshot(_get_session(session_id))
+    try:
+        result = await run_cancellable(
+            http_request,
+            get_what_if_analyzer().generate_smart_suggestions,
+            script_text=state.script_text,
+            language=request.language,
+            max_suggestions=request.max_suggestions,
+            analysis=state.analysis,
+        )
+        return SmartSuggestionsResponse(**result)
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating session suggestions: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
+@app.post("/sessions/{session_id}/rating_advisor", response_model=RatingAdvisorResponse)
+@track_inference_time("rating_advisor")
+async def session_rating_advisor(
+    session_id: str, request: SessionAdvisorRequest, http_request: Request
+):
+    session = _get_session(session_id)
+    state = get_session_store().snapshot(session)
+
+    def advise():
+        advisor = RatingAdvisor(use_llm=True)
+        analysis = state.advisor_analysis
+        if analysis is None:
+            analysis = advisor.pipeline.analyze_script(state.script_text)
+            get_session_store().set_advisor_analysis(session, analysis, state.revision)
+        internal_request = InternalAdvisorRequest(
+            script_text=state.script_text, **request.model_dump()
+        )
+        return advisor.analyze(internal_request, analysis)
+
+    try:
+        result = await run_cancellable(http_request, advise)
+        return RatingAdvisorResponse(**result.model_dump())
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing session rating advisor request: {e}")
+        raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
+
+
 @app.post("/detect_lines", response_model=LineDetectionResponse)
 @track_inference_time("detect_lines")
 async def detect_lines(request: LineDetectionRequest):
     try:
         detector = LineDetector()
-        detections = detector.detect_lines(request.text, request.context_size)
+        detections = detector.detect_lines(
+            request.text,
+            request.context_size,
+            request.line_offset,
+            compact=request.compact,
+        )
         stats = detector.get_statistics(detections)
         total_lines = len(request.text.split("\n"))
 
@@ -172,6 +584,191 @@ async def detect_lines(request: LineDetectionRequest):
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 
+@app.post("/detect_lines/stream")
+async def detect_lines_stream(request: LineDetectionRequest, http_request: Request):
+    """Stream detections as NDJSON while the script is being scanned.
+
+    Each line is ``{"detection": {...}}``; the last line is ``{"summary": {...}}``
+    with the same statistics as ``/detect_lines``, or ``{"error": ...}`` if the
+    scan failed part way. Nothing is accumulated, so memory stays flat however
+    many detections a script has; the scan stops when the client goes away.
+    """
+    token = CancellationToken(
+        deadline=parse_deadline_header(http_request.headers.get(DEADLINE_HEADER))
+    )
+    token.check()
+    detector = LineDetector()
+
+    def ndjson() -> Iterator[str]:
+        by_category: Dict[str, int] = {}
+        total_matches: Dict[str, int] = {}
+        total = 0
+        try:
+            for detection in detector.iter_detections(
+                request.text,
+                request.context_size,
+                request.line_offset,
+                compact=request.compact,
+            ):
+                token.check()
+                category = detection["category"]
+                by_category[category] = by_category.get(category, 0) + 1
+                total_matches[category] = (
+                    total_matches.get(category, 0)
+                    + detection["matched_patterns"]["count"]
+                )
+                total += 1
+                yield json.dumps({"detection": detection}, ensure_ascii=False) + "\n"
+        except AnalysisCancelled as e:
+            record_cancellation("detect_lines/stream", e.reason)
+            yield json.dumps({"error": str(e), "reason": e.reason}) + "\n"
+            return
+        except Exception as e:
+            logger.error(f"Error streaming line detections: {e}")
+            yield json.dumps({"error": f"Processing error: {str(e)}"}) + "\n"
+            return
+
+        summary = {
+            "total_detections": total,
+            "by_category": by_category,
+            "total_matches": total_matches,
+            "total_lines": request.text.count("\n") + 1,
+        }
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def _profile_rate_script(payload: Dict[str, Any]) -> None:
+    request = ScriptRequest(**payload)
+    get_pipeline().analyze_script(request.text, request.script_id)
+
+
+def _profile_what_if(payload: Dict[str, Any]) -> None:
+    request = WhatIfRequest(**payload)
+    get_what_if_analyzer().simulate_what_if(
+        request.script_text, request.modification_request
+    )
+
+
+def _profile_detect_lines(payload: Dict[str, Any]) -> None:
+    request = LineDetectionRequest(**payload)
+    LineDetector().detect_lines(request.text, request.context_size)
+
+
+PROFILE_TARGETS: Dict[str, Callable[[Dict[str, Any]], None]] = {
+    "rate_script": _profile_rate_script,
+    "what_if": _profile_what_if,
+    "detect_lines": _profile_detect_lines,
+}
+
+_profile_lock = asyncio.Lock()
+
+
+def _check_profiling_access(admin_token: str | None):
+    # unknown to callers unless explicitly switched on
+    if not settings.enable_profiling or not settings.profiling_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(admin_token or "", settings.profiling_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.post("/debug/profile", response_model=ProfileResponse)
+async def debug_profile(
+    request: ProfileRequest,
+    format: str = "json",
+    x_admin_token: str | None = Header(default=None),
+):
+    """Profile one request or a window of live traffic.
+
+    Returns collapsed stacks for flamegraph tools (``format=collapsed`` returns
+    them as plain text) and per-pattern timings from the keyword scanner.
+    """
+    _check_profiling_access(x_admin_token)
+
+    if request.mode == "request" and request.endpoint not in PROFILE_TARGETS:
+        raise HTTPException(status_code=422, detail="endpoint is required")
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    async with _profile_lock:
+        interval = request.interval_ms / 1000
+        budget = min(request.duration_seconds, settings.profiling_max_seconds)
+        error = None
+
+        if request.mode == "sample":
+            with profile_session(interval=interval) as profiler:
+                await asyncio.sleep(budget)
+        else:
+            target = PROFILE_TARGETS[request.endpoint]  # type: ignore[index]
+            thread_ids: Set[int] = set()
+            # the profiled run is bounded like any other request
+            token = CancellationToken(
+                deadline=time.time() + settings.profiling_max_seconds
+            )
+
+            def work() -> None:
+                thread_ids.add(threading.get_ident())
+                with bind_token(token):
+                    target(request.payload)
+
+            with profile_session(interval=interval, thread_ids=thread_ids) as profiler:
+                try:
+                    await run_in_threadpool(work)
+                except AnalysisCancelled as e:
+                    error = e.reason
+                except ValueError as e:
+                    raise HTTPException(status_code=422, detail=str(e))
+
+    logger.info(
+        f"Profile finished: mode={request.mode}, endpoint={request.endpoint}, "
+        f"samples={profiler.samples}"
+    )
+
+    if format == "collapsed":
+        return Response(content=profiler.collapsed(), media_type="text/plain")
+
+    return ProfileResponse(
+        mode=request.mode,
+        endpoint=request.endpoint,
+        duration_seconds=round(profiler.duration, 3),
+        samples=profiler.samples,
+        collapsed_stacks=profiler.collapsed(),
+        pattern_timings=[
+            PatternTimingSchema(**timing)
+            for timing in profiler.pattern_timings.report()
+        ],
+        error=error,
+    )
+
+
+@app.get("/debug/patterns", response_model=list[PatternTimingSchema])
+async def debug_patterns(
+    limit: int | None = None,
+    reset: bool = False,
+    x_admin_token: str | None = Header(default=None),
+):
+    """Per-pattern statistics collected since startup in pattern profiling mode"""
+    _check_profiling_access(x_admin_token)
+    profiler = workload_pattern_profiler()
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Pattern profiling disabled")
+    report = profiler.report(limit)
+    if reset:
+        profiler.reset()
+    return report
+
+
+@app.get("/debug/intents", response_model=IntentExplanationResponse)
+async def debug_intents(
+    request: str,
+    x_admin_token: str | None = Header(default=None),
+):
+    """How a what-if request was parsed: matched patterns and similarities"""
+    _check_profiling_access(x_admin_token)
+    return get_what_if_analyzer().explain_modification_request(request)
+
+
 @app.get("/")
 async def root():
     return {
@@ -181,10 +778,15 @@ async def root():
             "health": "/health",
             "rate_script": "/rate_script",
             "what_if": "/what_if",
+            "what_if_batch": "/what_if_batch",
             "what_if_advanced": "/what_if_advanced",
             "what_if_suggestions": "/what_if_suggestions",
             "rating_advisor": "/rating_advisor",
+            "optimize_rating": "/optimize_rating",
+            "scene_sensitivity": "/scene_sensitivity",
+            "sessions": "/sessions",
             "detect_lines": "/detect_lines",
+            "detect_lines_stream": "/detect_lines/stream",
             "metrics": "/metrics",
             "docs": "/docs",
         },
@@ -1,13 +1,21 @@
 from prometheus_client import (
+    CONTENT_TYPE_LATEST,
     Counter,
     Histogram,
     Gauge,
     CollectorRegistry,
     generate_latest,
 )
+from prometheus_client.openmetrics.exposition import (
+    CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE,
+    generate_latest as generate_openmetrics,
+)
 import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
-from typing import Callable, Dict
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
 registry = CollectorRegistry()
 
@@ -118,6 +126,144 @@ rating_errors_total = Counter(
     registry=registry,
 )
 
+ml_cancelled_requests_total = Counter(
+    "ml_cancelled_requests_total",
+    "Requests abandoned before completion (client disconnect or deadline)",
+    ["endpoint", "reason"],
+    registry=registry,
+)
+
+ml_pipeline_stage_seconds = Histogram(
+    "ml_pipeline_stage_seconds",
+    "Time spent in each pipeline stage per script",
+    ["stage"],
+    registry=registry,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+ml_embedding_batch_size = Histogram(
+    "ml_embedding_batch_size",
+    "Number of texts per embedding model call",
+    registry=registry,
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+ml_cache_requests_total = Counter(
+    "ml_cache_requests_total",
+    "Lookups in in-process caches",
+    ["cache", "result"],
+    registry=registry,
+)
+
+ml_active_sessions = Gauge(
+    "ml_active_sessions",
+    "Number of open what-if sessions",
+    registry=registry,
+)
+
+ml_session_evictions_total = Counter(
+    "ml_session_evictions_total",
+    "What-if sessions dropped before being closed by the client",
+    ["reason"],
+    registry=registry,
+)
+
+ml_regex_scan_degraded_total = Counter(
+    "ml_regex_scan_degraded_total",
+    "Scenes or lines whose pattern scan hit its time budget and was cut short",
+    ["scanner"],
+    registry=registry,
+)
+
+# stages that together make up per-scene feature extraction
+FEATURE_STAGES: Tuple[str, ...] = (
+    "keyword_scan",
+    "false_positive_filter",
+    "embedding",
+    "context_scoring",
+)
+
+
+class StageSpans:
+    """Accumulates stage durations for one script.
+
+    Per-scene stages run hundreds of times per script; summing them here and
+    observing once per stage keeps the histograms meaningful per request.
+    """
+
+    def __init__(self, script_id: Optional[str] = None):
+        self.script_id = script_id
+        self.totals: Dict[str, float] = defaultdict(float)
+
+    def add(self, stage: str, seconds: float):
+        self.totals[stage] += seconds
+
+    def flush(self):
+        exemplar = {"script_id": str(self.script_id)} if self.script_id else None
+        for stage, seconds in self.totals.items():
+            ml_pipeline_stage_seconds.labels(stage=stage).observe(
+                seconds, exemplar=exemplar
+            )
+
+
+_active_spans: ContextVar[Optional[StageSpans]] = ContextVar(
+    "stage_spans", default=None
+)
+
+
+def record_stage_time(stage: str, seconds: float, script_id: Optional[str] = None):
+    """Attribute ``seconds`` to ``stage`` for the script being analysed.
+
+    Outside :func:`track_script` the duration is observed immediately.
+    """
+    spans = _active_spans.get()
+    if spans is not None:
+        spans.add(stage, seconds)
+        return
+    exemplar = {"script_id": str(script_id)} if script_id else None
+    ml_pipeline_stage_seconds.labels(stage=stage).observe(seconds, exemplar=exemplar)
+
+
+@contextmanager
+def stage_span(stage: str, script_id: Optional[str] = None) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage_time(stage, time.perf_counter() - start, script_id)
+
+
+@contextmanager
+def track_script(script_id: Optional[str] = None) -> Iterator[StageSpans]:
+    """Collect stage spans for one script and export them when done."""
+    spans = StageSpans(script_id)
+    token = _active_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _active_spans.reset(token)
+        spans.flush()
+
+
+def record_scan_degraded(scanner: str):
+    ml_regex_scan_degraded_total.labels(scanner=scanner).inc()
+
+
+def record_embedding_batch(size: int):
+    ml_embedding_batch_size.observe(size)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    ml_cache_requests_total.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def record_sessions(active: int):
+    ml_active_sessions.set(active)
+
+
+def record_session_eviction(reason: str):
+    ml_session_evictions_total.labels(reason=reason).inc()
+
 
 class MetricsTracker:
     """Helper for tracking metrics during inference"""
@@ -221,7 +367,23 @@ def track_inference_time(endpoint: str):
     return decorator
 
 
+def record_cancellation(endpoint: str, reason: str):
+    """Count a request whose analysis was abandoned mid-flight."""
+    ml_cancelled_requests_total.labels(endpoint=endpoint, reason=reason).inc()
+
+
 def get_metrics() -> bytes:
     """Export metrics in Prometheus format"""
     result: bytes = generate_latest(registry)  # type: ignore[assignment]
     return result
+
+
+def get_metrics_for(accept: Optional[str]) -> Tuple[bytes, str]:
+    """Export metrics in the format the scraper asked for.
+
+    Exemplars are only part of the OpenMetrics exposition, so scrapers that
+    accept it get that format; everyone else gets plain Prometheus text.
+    """
+    if accept and "application/openmetrics-text" in accept:
+        return generate_openmetrics(registry), OPENMETRICS_CONTENT_TYPE
+    return get_metrics(), CONTENT_TYPE_LATEST
@@ -1,10 +1,17 @@
 from pathlib import Path
-from typing import Dict, Any, List
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple
 from loguru import logger
 import tempfile
+import threading
 
 from .config import settings
-from .metrics import MetricsTracker
+from .metrics import (
+    FEATURE_STAGES,
+    MetricsTracker,
+    record_cache_lookup,
+    track_script,
+)
 from .structured_logger import log_feature_scores
 from .repair_pipeline import (
     analyze_script_file,
@@ -13,6 +20,83 @@ from .repair_pipeline import (
     normalize_scene_scores as _normalize_scene_scores,
     map_scores_to_rating as _map_scores_to_rating,
 )
+from .scoring import scene_key
+from .sessions import SCENE_OVERHEAD_BYTES
+
+
+def analysis_size_bytes(analysis: Dict[str, Any]) -> int:
+    """Rough memory held by a pipeline result: its scenes' text and scores."""
+    scenes = analysis.get("scenes", [])
+    text_bytes = sum(len(scene.get("content", "").encode("utf-8")) for scene in scenes)
+    return text_bytes + SCENE_OVERHEAD_BYTES * len(scenes)
+
+
+class AnalysisCache:
+    """LRU of pipeline results by script hash, capped by entry count and by
+    the estimated bytes they hold. Results are shared and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Dict[str, Any] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache_lookup("script_analysis", entry is not None)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: bytes, analysis: Dict[str, Any]):
+        size = analysis_size_bytes(analysis)
+        # a result over the cap alone would only flush the others
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (analysis, size)
+            self.total_bytes += size
+            while (
+                len(self._entries) > self.max_entries
+                or self.total_bytes > self.max_bytes
+            ):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+# pipeline results by script text hash, for the rating advisor to reuse
+_analysis_cache = AnalysisCache(
+    settings.analysis_cache_size, settings.analysis_cache_max_bytes
+)
+
+
+def get_analysis_cache() -> AnalysisCache:
+    return _analysis_cache
+
+
+def script_hash(text: str) -> str:
+    """Hex content hash of a script, as /rate_script returns it."""
+    return scene_key(text).hex()
+
+
+def cached_analysis(content_hash: str) -> Dict[str, Any] | None:
+    """Pipeline result of an analyzed script by its ``script_hash``, if kept."""
+    try:
+        key = bytes.fromhex(content_hash)
+    except ValueError:
+        return None
+    return _analysis_cache.get(key)
 
 
 class RatingPipeline:
@@ -46,15 +130,24 @@ class RatingPipeline:
             temp_path = f.name
 
         try:
-            if tracker:
-                tracker.start_timer("analysis")
-
-            result = analyze_script_file(temp_path)
-
-            if tracker:
-                tracker.end_timer("analysis")
-                tracker.record_scenes_count(result.get("total_scenes", 0))
-                tracker.record_rating(result["predicted_rating"])
+            with track_script(script_id) as spans:
+                if tracker:
+                    tracker.start_timer("analysis")
+
+                result = analyze_script_file(temp_path)
+
+                if tracker:
+                    spans.add("analysis", tracker.end_timer("analysis"))
+                    total_scenes = result.get("total_scenes", 0)
+                    tracker.record_scene_parsing(spans.totals.get("parsing", 0.0))
+                    if total_scenes:
+                        feature_time = sum(
+                            spans.totals.get(stage, 0.0) for stage in FEATURE_STAGES
+                        )
+                        tracker.record_feature_extraction(feature_time / total_scenes)
+                    tracker.record_scenes_count(total_scenes)
+                    tracker.record_rating(result["predicted_rating"])
+                    tracker.record_scores(result.get("aggregated_scores", {}))
 
             if settings.json_logs:
                 agg_scores = result.get("aggregated_scores", {})
@@ -89,8 +182,9 @@ class RatingPipeline:
                     }
                 )
 
-            return {
+            analysis = {
                 "script_id": script_id,
+                "script_hash": script_hash(text),
                 "predicted_rating": result["predicted_rating"],
                 "reasons": result["reasons"],
                 "agg_scores": result.get("aggregated_scores", {}),
@@ -100,6 +194,8 @@ class RatingPipeline:
                 "evidence_excerpts": result.get("evidence_excerpts", []),
                 "scenes": result.get("scenes", []),
             }
+            _analysis_cache.put(scene_key(text), analysis)
+            return analysis
         finally:
             Path(temp_path).unlink(missing_ok=True)
 
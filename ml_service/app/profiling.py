@@ -0,0 +1,242 @@
+"""On-demand statistical profiling for the ``/debug/profile`` endpoint.
+
+``SamplingProfiler`` periodically snapshots the Python stacks of running
+threads and aggregates them into the collapsed-stack format understood by
+flamegraph tools (``frame;frame;frame count`` per line). ``PatternProfiler``
+collects per-pattern regex calls, hits and cost from the keyword scanner and
+the line detector, either for one profile or across a whole workload.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from types import FrameType
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from prometheus_client.core import CounterMetricFamily
+from prometheus_client.registry import Collector
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class PatternStats:
+    __slots__ = ("calls", "matches", "suppressed", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.matches = 0
+        self.suppressed = 0
+        self.seconds = 0.0
+
+
+class PatternProfiler:
+    """Per-pattern call counts, hits and cumulative time across a workload.
+
+    ``suppressed`` counts matches that were found but then discarded: false
+    positives in the scene scanner, duplicates in the line detector.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats: Dict[Tuple[str, str], PatternStats] = {}
+
+    def record(
+        self,
+        lexicon: str,
+        pattern: str,
+        seconds: float,
+        matches: int = 0,
+        suppressed: int = 0,
+    ):
+        key = (lexicon, pattern)
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = PatternStats()
+            stats.calls += 1
+            stats.matches += matches
+            stats.suppressed += suppressed
+            stats.seconds += seconds
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+    def report(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Patterns ordered by cumulative time, most expensive first."""
+        with self._lock:
+            ranked = sorted(
+                self.stats.items(), key=lambda kv: kv[1].seconds, reverse=True
+            )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [
+            {
+                "lexicon": lexicon,
+                "pattern": pattern,
+                "calls": stats.calls,
+                "matches": stats.matches,
+                "suppressed": stats.suppressed,
+                "total_seconds": round(stats.seconds, 6),
+                "avg_microseconds": round(stats.seconds / stats.calls * 1e6, 3),
+            }
+            for (lexicon, pattern), stats in ranked
+        ]
+
+    def to_json(self, limit: Optional[int] = None) -> str:
+        return json.dumps(self.report(limit), ensure_ascii=False, indent=2)
+
+
+class PatternProfilerCollector(Collector):
+    """Exposes the workload profiler as Prometheus counters at scrape time."""
+
+    def __init__(self, profiler: PatternProfiler):
+        self.profiler = profiler
+
+    def collect(self):
+        labels = ["lexicon", "pattern"]
+        calls = CounterMetricFamily(
+            "ml_pattern_calls", "Regex pattern invocations", labels=labels
+        )
+        matches = CounterMetricFamily(
+            "ml_pattern_matches", "Regex pattern matches", labels=labels
+        )
+        suppressed = CounterMetricFamily(
+            "ml_pattern_suppressed",
+            "Regex pattern matches discarded after matching",
+            labels=labels,
+        )
+        seconds = CounterMetricFamily(
+            "ml_pattern_seconds", "Cumulative regex pattern time", labels=labels
+        )
+        with self.profiler._lock:
+            items = [
+                (key, stats.calls, stats.matches, stats.suppressed, stats.seconds)
+                for key, stats in self.profiler.stats.items()
+            ]
+        for (lexicon, pattern), n_calls, n_matches, n_suppressed, n_seconds in items:
+            calls.add_metric([lexicon, pattern], n_calls)
+            matches.add_metric([lexicon, pattern], n_matches)
+            suppressed.add_metric([lexicon, pattern], n_suppressed)
+            seconds.add_metric([lexicon, pattern], n_seconds)
+        yield from (calls, matches, suppressed, seconds)
+
+
+class SamplingProfiler:
+    """Samples thread stacks every ``interval`` seconds in a daemon thread.
+
+    With ``thread_ids`` only those threads are sampled; otherwise every thread
+    that is currently executing service code is, which filters out idle
+    workers and the event loop waiting on its selector.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: Optional[Set[int]] = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self.pattern_timings = PatternProfiler()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, top in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self.thread_ids is not None and thread_id not in self.thread_ids:
+                    continue
+                stack: List[str] = []
+                in_app = False
+                frame: Optional[FrameType] = top
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    stack.append(_frame_label(code))
+                    frame = frame.f_back
+                if self.thread_ids is None and not in_app:
+                    continue
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(
+            f"{stack} {count}" for stack, count in self.stacks.most_common()
+        )
+
+
+# process-wide, because sampled live traffic runs on other threads; the
+# scanners record into every active profiler (workload mode and/or an
+# in-flight /debug/profile)
+_active_pattern_profilers: Tuple[PatternProfiler, ...] = ()
+_workload_profiler: Optional[PatternProfiler] = None
+
+
+def active_pattern_profilers() -> Tuple[PatternProfiler, ...]:
+    return _active_pattern_profilers
+
+
+def enable_pattern_profiling() -> PatternProfiler:
+    """Turn on workload-wide pattern profiling (idempotent)."""
+    global _workload_profiler, _active_pattern_profilers
+    if _workload_profiler is None:
+        _workload_profiler = PatternProfiler()
+        _active_pattern_profilers = _active_pattern_profilers + (_workload_profiler,)
+    return _workload_profiler
+
+
+def workload_pattern_profiler() -> Optional[PatternProfiler]:
+    return _workload_profiler
+
+
+@contextmanager
+def pattern_profiling() -> Iterator[PatternProfiler]:
+    """Collect pattern statistics for the enclosed block only."""
+    global _active_pattern_profilers
+    profiler = PatternProfiler()
+    _active_pattern_profilers = _active_pattern_profilers + (profiler,)
+    try:
+        yield profiler
+    finally:
+        _active_pattern_profilers = tuple(
+            p for p in _active_pattern_profilers if p is not profiler
+        )
+
+
+@contextmanager
+def profile_session(
+    interval: float = 0.005, thread_ids: Optional[Set[int]] = None
+) -> Iterator[SamplingProfiler]:
+    """Sample stacks and collect pattern statistics for the enclosed block."""
+    profiler = SamplingProfiler(interval=interval, thread_ids=thread_ids)
+    with pattern_profiling() as patterns:
+        profiler.pattern_timings = patterns
+        profiler.start()
+        started = time.perf_counter()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+            profiler.duration = time.perf_counter() - started
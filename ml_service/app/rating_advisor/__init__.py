@@ -1,4 +1,9 @@
-from .advisor import RatingAdvisor
+from .advisor import AnalysisNotCached, RatingAdvisor
 from .schemas import RatingAdvisorRequest, RatingAdvisorResponse
 
-__all__ = ["RatingAdvisor", "RatingAdvisorRequest", "RatingAdvisorResponse"]
+__all__ = [
+    "AnalysisNotCached",
+    "RatingAdvisor",
+    "RatingAdvisorRequest",
+    "RatingAdvisorResponse",
+]
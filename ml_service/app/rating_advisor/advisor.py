@@ -1,9 +1,10 @@
 from typing import List, Dict, Tuple, Literal
 import numpy as np
 import re
-from sentence_transformers import SentenceTransformer
 
-from ..pipeline import RatingPipeline
+from ..pipeline import RatingPipeline, cached_analysis, script_hash
+from ..repair_pipeline import embedder
+from ..scoring import SCORE_KEYS, aggregate_scores
 from .schemas import (
     RatingAdvisorRequest,
     RatingAdvisorResponse,
@@ -13,6 +14,10 @@ from .schemas import (
 )
 
 
+class AnalysisNotCached(LookupError):
+    """Only a script hash was sent, and no analysis of that script is kept."""
+
+
 class RatingAdvisor:
     RATING_ORDER = ["0+", "6+", "12+", "16+", "18+"]
 
@@ -133,13 +138,18 @@ class RatingAdvisor:
 
     def __init__(self, use_llm: bool = False):
         self.pipeline = RatingPipeline()
-        try:
-            self.nlp_model = SentenceTransformer("all-MiniLM-L6-v2")
-        except Exception:
-            self.nlp_model = None
-
-    def analyze(self, request: RatingAdvisorRequest) -> RatingAdvisorResponse:
-        result = self.pipeline.analyze_script(text=request.script_text, script_id=None)
+        # the pipeline's model, already loaded, rather than one per advisor
+        self.nlp_model = embedder
+
+    def analyze(
+        self, request: RatingAdvisorRequest, analysis: Dict | None = None
+    ) -> RatingAdvisorResponse:
+        # a pipeline result for the script already at hand (e.g. held by a
+        # what-if session) spares the full analysis
+        result = analysis or self.resolve_analysis(request)
+        script_text = request.script_text or "\n\n".join(
+            scene.get("content", "") for scene in result["scenes"]
+        )
 
         current_scores = result["agg_scores"]
         actual_rating = self._determine_rating_from_scores(current_scores)
@@ -153,7 +163,7 @@ class RatingAdvisor:
             target_rating,
             current_scores,
             target_thresholds,
-            request.script_text,
+            script_text,
             result["scenes"],
         )
 
@@ -169,7 +179,7 @@ class RatingAdvisor:
             problematic_scenes,
             rating_gaps,
             request.language,
-            request.script_text,
+            script_text,
             current_rating,
             target_rating,
             result["scenes"],
@@ -207,6 +217,46 @@ class RatingAdvisor:
             alternative_targets=alternative_targets,
         )
 
+    def resolve_analysis(self, request: RatingAdvisorRequest) -> Dict:
+        """Scores to advise on, analyzing the script only if none are known.
+
+        Per-scene scores sent with the request come first, then a kept
+        pipeline result for the script (by ``script_text`` or, without it,
+        ``script_hash``); the script is analyzed on a miss.
+        """
+        if request.scenes is not None:
+            return self._analysis_from_scenes(request)
+
+        if request.script_text:
+            cached = cached_analysis(script_hash(request.script_text))
+        elif request.script_hash:
+            cached = cached_analysis(request.script_hash)
+        else:
+            raise ValueError("Send script_text, script_hash or scenes")
+        if cached is not None:
+            return cached
+
+        if not request.script_text:
+            raise AnalysisNotCached(
+                f"No analysis kept for script {request.script_hash}; "
+                "send script_text"
+            )
+        return self.pipeline.analyze_script(text=request.script_text, script_id=None)
+
+    def _analysis_from_scenes(self, request: RatingAdvisorRequest) -> Dict:
+        scenes = [
+            dict(
+                scene.model_dump(),
+                scene_number=scene.scene_number or position + 1,
+            )
+            for position, scene in enumerate(request.scenes or [])
+        ]
+        agg_scores = request.agg_scores
+        if agg_scores is None:
+            agg = aggregate_scores(scenes)
+            agg_scores = {k: round(agg[k], 3) for k in SCORE_KEYS}
+        return {"agg_scores": agg_scores, "scenes": scenes}
+
     def _determine_rating_from_scores(self, scores: Dict[str, float]) -> str:
         for rating in reversed(self.RATING_ORDER):
             thresholds = self.RATING_THRESHOLDS[rating]
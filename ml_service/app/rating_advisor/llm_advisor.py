@@ -1,22 +1,18 @@
 import os
 from typing import List, Dict, Optional
 import json
-from openai import OpenAI
-from anthropic import Anthropic
 
+from ..cancellation import AnalysisCancelled
+from ..llm_gateway import API_KEY_VARS, LLMCall, LLMGateway, get_llm_gateway
 from .schemas import SceneIssue
 
 
 class LLMRatingAdvisor:
-    def __init__(self):
-        self.openai_client = None
-        self.anthropic_client = None
-
-        if os.getenv("OPENAI_API_KEY"):
-            self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-        if os.getenv("ANTHROPIC_API_KEY"):
-            self.anthropic_client = Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    def __init__(self, gateway: Optional[LLMGateway] = None):
+        # calls go through the shared gateway; a provider is enabled by its key
+        self.gateway = gateway or get_llm_gateway()
+        self.openai_key: Optional[str] = os.getenv(API_KEY_VARS["openai"])
+        self.anthropic_key: Optional[str] = os.getenv(API_KEY_VARS["anthropic"])
 
     def enhance_recommendations(
         self,
@@ -26,7 +22,7 @@ class LLMRatingAdvisor:
         target_rating: str,
         language: str = "en",
     ) -> List[Dict]:
-        if not self.openai_client and not self.anthropic_client:
+        if not self.openai_key and not self.anthropic_key:
             return []
 
         prompt = self._build_prompt(
@@ -34,14 +30,16 @@ class LLMRatingAdvisor:
         )
 
         try:
-            if self.openai_client:
+            if self.openai_key:
                 response = self._call_openai(prompt)
-            elif self.anthropic_client:
+            elif self.anthropic_key:
                 response = self._call_anthropic(prompt)
             else:
                 return []
 
             return self._parse_llm_response(response)
+        except AnalysisCancelled:
+            raise
         except Exception:
             return []
 
@@ -52,7 +50,7 @@ class LLMRatingAdvisor:
         target_rating: str,
         language: str = "en",
     ) -> Optional[str]:
-        if not self.openai_client and not self.anthropic_client:
+        if not self.openai_key and not self.anthropic_key:
             return None
 
         prompt = self._build_rewrite_prompt(
@@ -60,11 +58,13 @@ class LLMRatingAdvisor:
         )
 
         try:
-            if self.openai_client:
+            if self.openai_key:
                 return self._call_openai(prompt, temperature=0.7)
-            elif self.anthropic_client:
+            elif self.anthropic_key:
                 return self._call_anthropic(prompt, temperature=0.7)
             return None
+        except AnalysisCancelled:
+            raise
         except Exception:
             return None
 
@@ -172,22 +172,26 @@ Rewritten scene:"""
         return "\n\n".join(lines)
 
     def _call_openai(self, prompt: str, temperature: float = 0.3) -> str:
-        response = self.openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=temperature,
-            max_tokens=2000,
+        return self.gateway.complete(
+            LLMCall(
+                "openai",
+                prompt,
+                temperature=temperature,
+                max_tokens=2000,
+                api_key=self.openai_key,
+            )
         )
-        return str(response.choices[0].message.content)
 
     def _call_anthropic(self, prompt: str, temperature: float = 0.3) -> str:
-        response = self.anthropic_client.messages.create(
-            model="claude-3-5-haiku-20241022",
-            max_tokens=2000,
-            temperature=temperature,
-            messages=[{"role": "user", "content": prompt}],
+        return self.gateway.complete(
+            LLMCall(
+                "anthropic",
+                prompt,
+                temperature=temperature,
+                max_tokens=2000,
+                api_key=self.anthropic_key,
+            )
         )
-        return str(response.content[0].text)
 
     def _parse_llm_response(self, response: str) -> List[Dict]:
         try:
@@ -31,8 +31,30 @@ class RatingGap(BaseModel):
     priority: Literal["critical", "high", "medium", "low"]
 
 
+class SceneScores(BaseModel):
+    """One scene of an earlier analysis: the pipeline's ``scenes`` entries."""
+
+    scene_id: int
+    scene_number: Optional[int] = None
+    heading: str = ""
+    content: str = ""
+    violence: float = 0.0
+    gore: float = 0.0
+    sex_act: float = 0.0
+    nudity: float = 0.0
+    profanity: float = 0.0
+    drugs: float = 0.0
+    child_risk: float = 0.0
+
+
 class RatingAdvisorRequest(BaseModel):
-    script_text: str
+    # the script, or what stands in for re-analyzing it: per-scene scores
+    # (with script-level ones, derived from them if left out), or the
+    # script_hash of a script /rate_script analyzed recently
+    script_text: Optional[str] = None
+    script_hash: Optional[str] = None
+    scenes: Optional[List[SceneScores]] = None
+    agg_scores: Optional[Dict[str, float]] = None
     current_rating: Optional[str] = None
     target_rating: str = Field(..., pattern="^(0\\+|6\\+|12\\+|16\\+|18\\+)$")
     language: Literal["en", "ru"] = "en"
@@ -0,0 +1,267 @@
+"""Search for the smallest set of edits that brings a script to a target rating.
+
+Candidate edits are scene removals and per-scene content reductions with the
+what-if rewrite rules. A reduction is applied to its scene and rescored once
+(through the scene score cache); after that the beam search only touches the
+scenes x categories score matrix. All expansions of a plan differ from it in
+one row, so they are re-aggregated together with ``aggregate_score_batch``
+and rated with ``map_scores_to_rating`` without re-analysing any text.
+"""
+
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+import numpy as np
+from loguru import logger
+
+from .cancellation import checkpoint
+from .repair_pipeline import (
+    RATING_ORDER,
+    map_scores_to_rating,
+    parse_script_to_scenes,
+)
+from .scoring import (
+    SCORE_KEYS,
+    aggregate_score_batch,
+    aggregate_scores,
+    score_matrix,
+    score_scene,
+    score_scenes,
+)
+from .what_if import REDUCTION_TABLES
+
+REMOVE = "remove"
+
+# score keys a reduction is meant to lower; scenes scoring zero on all of
+# them are not worth rewriting
+REDUCTION_TARGETS = {
+    "violence": ("violence",),
+    "profanity": ("profanity",),
+    "gore": ("gore",),
+    "sexual": ("sex_act", "nudity"),
+    "drugs": ("drugs",),
+}
+
+# dropping a scene changes the story far more than toning it down
+EDIT_COSTS = {"reduce": 1, REMOVE: 2}
+
+# bounds the (candidates, scenes, keys) arrays evaluated at once
+BATCH_SIZE = 256
+
+Edit = Tuple[int, str]
+Plan = FrozenSet[Edit]
+
+
+def rating_of(scores: np.ndarray) -> str:
+    return str(map_scores_to_rating(dict(zip(SCORE_KEYS, scores.tolist())))["rating"])
+
+
+def plan_cost(plan: Plan) -> int:
+    return sum(
+        EDIT_COSTS[REMOVE if action == REMOVE else "reduce"] for _, action in plan
+    )
+
+
+class RatingOptimizer:
+    def __init__(
+        self,
+        scenes: List[Dict[str, Any]],
+        scene_scores: List[Dict[str, Any]] | None = None,
+        allow_removal: bool = True,
+    ):
+        if scene_scores is None:
+            scene_scores, _ = score_scenes(scenes)
+        self.scenes = scenes
+        self.base = score_matrix(scene_scores)
+        self.allow_removal = allow_removal
+        self.evaluated = 0
+        self._key_index = {k: j for j, k in enumerate(SCORE_KEYS)}
+        # score row of a scene after a set of reductions, built on demand
+        self._reduced: Dict[Tuple[int, FrozenSet[str]], np.ndarray] = {}
+
+    def reduced_row(self, scene: int, reductions: FrozenSet[str]) -> np.ndarray:
+        if not reductions:
+            return np.asarray(self.base[scene])
+        key = (scene, reductions)
+        row = self._reduced.get(key)
+        if row is None:
+            original = self.scenes[scene]["text"]
+            text = original
+            for content, table in REDUCTION_TABLES.items():
+                if content in reductions:
+                    text = table.sub(text)
+            if text == original:
+                row = self.base[scene]
+            else:
+                row = score_matrix([score_scene(text)])[0]
+            self._reduced[key] = row
+        return row
+
+    def state(self, plan: Plan) -> Tuple[np.ndarray, np.ndarray]:
+        """Score matrix and removed-scene mask after applying ``plan``."""
+        matrix = self.base.copy()
+        removed = np.zeros(len(self.scenes), dtype=bool)
+        reductions: Dict[int, set] = {}
+        for scene, action in plan:
+            if action == REMOVE:
+                removed[scene] = True
+            else:
+                reductions.setdefault(scene, set()).add(action)
+        for scene, contents in reductions.items():
+            matrix[scene] = self.reduced_row(scene, frozenset(contents))
+        return matrix, removed
+
+    def candidates(self, plan: Plan, matrix: np.ndarray, removed: np.ndarray):
+        """Edits that can extend ``plan``, with the score row each one yields."""
+        touched: Dict[int, set] = {}
+        for scene, action in plan:
+            touched.setdefault(scene, set()).add(action)
+
+        for scene in range(len(self.scenes)):
+            if removed[scene]:
+                continue
+            row = matrix[scene]
+            if not row.any():
+                continue
+            done = touched.get(scene, set())
+            for content, keys in REDUCTION_TARGETS.items():
+                if content in done:
+                    continue
+                if not any(row[self._key_index[k]] > 0 for k in keys):
+                    continue
+                checkpoint()
+                reduced = self.reduced_row(scene, frozenset(done | {content}))
+                if not np.array_equal(reduced, row):
+                    yield (scene, content), reduced
+            if self.allow_removal:
+                yield (scene, REMOVE), None
+
+    def expand(self, plan: Plan) -> List[Tuple[Plan, np.ndarray]]:
+        """Every one-edit extension of ``plan`` with its aggregated scores."""
+        matrix, removed = self.state(plan)
+        children: List[Tuple[Plan, np.ndarray]] = []
+        pending = list(self.candidates(plan, matrix, removed))
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start : start + BATCH_SIZE]
+            matrices = np.repeat(matrix[None], len(chunk), axis=0)
+            masks = np.repeat(removed[None], len(chunk), axis=0)
+            for b, ((scene, _), row) in enumerate(chunk):
+                if row is None:
+                    masks[b, scene] = True
+                else:
+                    matrices[b, scene] = row
+            agg = aggregate_score_batch(matrices, masks)
+            self.evaluated += len(chunk)
+            for (edit, _), scores in zip(chunk, agg):
+                children.append((plan | {edit}, scores))
+        return children
+
+    def search(
+        self,
+        target_rating: str,
+        max_edits: int = 8,
+        beam_width: int = 5,
+        max_plans: int = 3,
+    ) -> List[Tuple[Plan, np.ndarray]]:
+        """Plans with the fewest edits that reach ``target_rating`` or lower.
+
+        Keeps the ``beam_width`` most promising plans per depth (lowest
+        rating, then lowest total score) and stops at the first depth where
+        any plan reaches the target.
+        """
+        target_rank = RATING_ORDER.index(target_rating)
+        beam: List[Plan] = [frozenset()]
+        seen = set(beam)
+
+        for _ in range(max_edits):
+            found: List[Tuple[Plan, np.ndarray]] = []
+            frontier: List[Tuple[Tuple[int, float, int], Plan]] = []
+            for plan in beam:
+                checkpoint()
+                for child, scores in self.expand(plan):
+                    if child in seen:
+                        continue
+                    seen.add(child)
+                    rank = RATING_ORDER.index(rating_of(scores))
+                    if rank <= target_rank:
+                        found.append((child, scores))
+                    else:
+                        priority = (rank, float(scores.sum()), plan_cost(child))
+                        frontier.append((priority, child))
+            if found:
+                found.sort(key=lambda item: (plan_cost(item[0]), float(item[1].sum())))
+                return found[:max_plans]
+            if not frontier:
+                break
+            frontier.sort(key=lambda item: item[0])
+            beam = [child for _, child in frontier[:beam_width]]
+        return []
+
+    def describe(self, plan: Plan) -> Dict[str, Any]:
+        """Plan as returned by the API, with exactly re-aggregated scores."""
+        matrix, removed = self.state(plan)
+        rows = [
+            dict(zip(SCORE_KEYS, matrix[i].tolist()))
+            for i in range(len(self.scenes))
+            if not removed[i]
+        ]
+        agg = aggregate_scores(rows)
+        edits = []
+        for scene, action in sorted(plan):
+            edits.append(
+                {
+                    "scene_id": self.scenes[scene]["scene_id"],
+                    "heading": self.scenes[scene]["heading"],
+                    "action": "remove_scene" if action == REMOVE else "reduce_content",
+                    "content_type": None if action == REMOVE else action,
+                }
+            )
+        return {
+            "edits": edits,
+            "cost": plan_cost(plan),
+            "predicted_rating": map_scores_to_rating(agg)["rating"],
+            "predicted_scores": {k: round(v, 3) for k, v in agg.items()},
+        }
+
+
+def optimize_rating(
+    script_text: str,
+    target_rating: str,
+    max_edits: int = 8,
+    beam_width: int = 5,
+    max_plans: int = 3,
+    allow_removal: bool = True,
+    scene_scores: List[Dict[str, Any]] | None = None,
+) -> Dict[str, Any]:
+    scenes = parse_script_to_scenes(script_text)
+    if scene_scores is not None and len(scene_scores) != len(scenes):
+        scene_scores = None
+    optimizer = RatingOptimizer(scenes, scene_scores, allow_removal=allow_removal)
+
+    baseline = optimizer.describe(frozenset())
+    current_rating = baseline["predicted_rating"]
+    target_rank = RATING_ORDER.index(target_rating)
+
+    plans: List[Dict[str, Any]] = []
+    if RATING_ORDER.index(current_rating) <= target_rank:
+        plans.append(baseline)
+    else:
+        for plan, _ in optimizer.search(
+            target_rating, max_edits, beam_width, max_plans
+        ):
+            described = optimizer.describe(plan)
+            # batch and exact aggregation can differ in the last float bit
+            if RATING_ORDER.index(described["predicted_rating"]) <= target_rank:
+                plans.append(described)
+
+    logger.info(
+        f"Rating optimizer: {current_rating} -> {target_rating}, "
+        f"{len(plans)} plan(s) after {optimizer.evaluated} candidate evaluations"
+    )
+    return {
+        "current_rating": current_rating,
+        "target_rating": target_rating,
+        "current_scores": baseline["predicted_scores"],
+        "reachable": bool(plans),
+        "plans": plans,
+        "evaluated_candidates": optimizer.evaluated,
+    }
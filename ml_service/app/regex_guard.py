@@ -0,0 +1,130 @@
+"""Guards against pathological regex backtracking on long lines.
+
+Patterns with an unbounded ``.*``/``.+`` between two anchors (for example
+``\\bchild(ren)?\\b.*\\b(danger|threat)\\b``) are quadratic on a long line with
+many anchor hits, which is exactly what PDF-extracted scripts without line
+breaks look like. ``compile_guarded`` flags such patterns and either routes them
+to RE2 (linear time, when installed) or rewrites the gap to a bounded
+``.{0,MAX_GAP}``, which keeps matching linear in the line length.
+``ScanBudget`` is the backstop: scanners stop trying further patterns once a
+scene or line has used up its time budget, instead of stalling the worker.
+"""
+
+import re
+import time
+from functools import lru_cache
+from typing import Any, Iterator, List, Tuple
+
+from loguru import logger
+
+try:
+    import re2 as _re2  # type: ignore[import-not-found]
+except ImportError:
+    _re2 = None
+
+# max distance (in characters) an unbounded gap may span after rewriting
+MAX_GAP = 200
+
+# seconds of regex work allowed per scene / per line before degrading
+SCENE_SCAN_BUDGET = 2.0
+LINE_SCAN_BUDGET = 0.5
+
+_flagged_patterns: List[str] = []
+
+
+def _unbounded_gaps(pattern: str) -> Iterator[Tuple[int, int, bool, str]]:
+    """Yield (start, end, one_or_more, suffix) for each unescaped ``.*``/``.+``.
+
+    ``suffix`` is the lazy/possessive modifier (``?`` or ``+``) if present.
+    Dots inside character classes and escaped dots are skipped.
+    """
+    i = 0
+    length = len(pattern)
+    while i < length:
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            i += 1
+            if i < length and pattern[i] == "^":
+                i += 1
+            if i < length and pattern[i] == "]":
+                i += 1
+            while i < length and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            continue
+        if char == "." and i + 1 < length and pattern[i + 1] in "*+":
+            end = i + 2
+            suffix = ""
+            if end < length and pattern[end] in "?+":
+                suffix = pattern[end]
+                end += 1
+            yield i, end, pattern[i + 1] == "+", suffix
+            i = end
+            continue
+        i += 1
+
+
+def is_unbounded(pattern: str) -> bool:
+    return next(_unbounded_gaps(pattern), None) is not None
+
+
+def bound_pattern(pattern: str, max_gap: int = MAX_GAP) -> str:
+    """Rewrite unbounded ``.*``/``.+`` gaps to ``.{0,max_gap}``/``.{1,max_gap}``."""
+    parts = []
+    last = 0
+    for start, end, one_or_more, suffix in _unbounded_gaps(pattern):
+        parts.append(pattern[last:start])
+        parts.append(f".{{{int(one_or_more)},{max_gap}}}{suffix}")
+        last = end
+    parts.append(pattern[last:])
+    return "".join(parts)
+
+
+@lru_cache(maxsize=4096)
+def compile_guarded(pattern: str, flags: int = re.IGNORECASE) -> Any:
+    """Compile ``pattern``, making unbounded gaps safe on long inputs.
+
+    RE2 is used for ASCII patterns when available (its ``\\b``/``\\w`` are
+    ASCII-only, so Cyrillic patterns always take the rewrite path). Compiled
+    patterns are cached, so hot paths can call this per use.
+    """
+    if not is_unbounded(pattern):
+        return re.compile(pattern, flags)
+
+    _flagged_patterns.append(pattern)
+
+    if _re2 is not None and pattern.isascii():
+        inline = "(?i)" if flags & re.IGNORECASE else ""
+        try:
+            compiled = _re2.compile(inline + pattern)
+            logger.debug(f"Unbounded pattern routed to RE2: {pattern}")
+            return compiled
+        except Exception as e:
+            logger.debug(f"RE2 rejected {pattern!r} ({e}), rewriting instead")
+
+    bounded = bound_pattern(pattern)
+    logger.debug(f"Unbounded pattern rewritten: {pattern} -> {bounded}")
+    return re.compile(bounded, flags)
+
+
+def flagged_patterns() -> List[str]:
+    """Unbounded patterns seen by ``compile_guarded`` so far."""
+    return list(_flagged_patterns)
+
+
+class ScanBudget:
+    """Wall-clock budget shared by the pattern scans of one scene or line."""
+
+    def __init__(self, seconds: float = SCENE_SCAN_BUDGET):
+        self.seconds = seconds
+        self.deadline = time.perf_counter() + seconds
+        self.exhausted = False
+
+    def check(self) -> bool:
+        """Return True (and stay True) once the budget is used up."""
+        if not self.exhausted and time.perf_counter() > self.deadline:
+            self.exhausted = True
+        return self.exhausted
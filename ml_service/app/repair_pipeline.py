@@ -6,12 +6,58 @@
 
 import re
 import json
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Tuple, TypedDict
 import numpy as np
 from sentence_transformers import SentenceTransformer, util
 from tqdm import tqdm
 
+try:
+    from .cancellation import checkpoint
+    from .metrics import (
+        record_embedding_batch,
+        record_scan_degraded,
+        record_stage_time,
+        stage_span,
+    )
+    from .profiling import active_pattern_profilers
+    from .regex_guard import SCENE_SCAN_BUDGET, ScanBudget, compile_guarded
+    from .script_index import (
+        BLANK,
+        CAPS_RE,
+        HEADING,
+        PARENTHETICAL,
+        LineRange,
+        classify_lines,
+        get_script_index,
+        scene_line_ranges,
+    )
+except ImportError:  # запуск как отдельного скрипта
+    from cancellation import checkpoint  # type: ignore[no-redef]
+    from profiling import active_pattern_profilers  # type: ignore[no-redef]
+    from regex_guard import (  # type: ignore[no-redef]
+        SCENE_SCAN_BUDGET,
+        ScanBudget,
+        compile_guarded,
+    )
+    from script_index import (  # type: ignore[no-redef]
+        BLANK,
+        CAPS_RE,
+        HEADING,
+        PARENTHETICAL,
+        LineRange,
+        classify_lines,
+        get_script_index,
+        scene_line_ranges,
+    )
+    from metrics import (  # type: ignore[no-redef]
+        record_embedding_batch,
+        record_scan_degraded,
+        record_stage_time,
+        stage_span,
+    )
+
 # pdf parsing
 try:
     import PyPDF2
@@ -476,6 +522,8 @@ SEX_WORDS = [
 # ===== INITIALIZATION =====
 print("Загрузка модели эмбеддингов...")
 MODEL_NAME = "all-MiniLM-L6-v2"
+# сколько сцен кодируем за один вызов модели
+EMBEDDING_BATCH_SIZE = 64
 embedder = SentenceTransformer(MODEL_NAME)
 
 # предвычисляем эмбеддинги для контекстных шаблонов
@@ -514,20 +562,43 @@ def _get_keyword_context_weight(excerpt: str) -> float:
     ]
 
     for pattern in discussion_markers:
-        if re.search(pattern, excerpt, re.I):
+        if compile_guarded(pattern).search(excerpt):
             return 0.3
 
     for pattern in action_markers:
-        if re.search(pattern, excerpt, re.I):
+        if compile_guarded(pattern).search(excerpt):
             return 1.5
 
     return 1.0
 
 
-def count_pattern_matches(patterns: List[str], text: str) -> Tuple[float, List[str]]:
+def _is_false_positive_profiled(
+    excerpt: str, false_positive_patterns: List[re.Pattern], profilers: tuple
+) -> bool:
+    """Та же проверка, что any(...), но с учетом стоимости каждого паттерна."""
+    for fp in false_positive_patterns:
+        started = time.perf_counter()
+        hit = fp.search(excerpt) is not None
+        elapsed = time.perf_counter() - started
+        for profiler in profilers:
+            profiler.record("false_positives", fp.pattern, elapsed, matches=int(hit))
+        if hit:
+            return True
+    return False
+
+
+def count_pattern_matches(
+    patterns: List[str],
+    text: str,
+    lexicon: str = "",
+    budget: "ScanBudget | None" = None,
+) -> Tuple[float, List[str]]:
     """
     Подсчитывает совпадения паттернов и возвращает найденные фрагменты.
     Фильтрует ложные срабатывания от фигуральных выражений.
+    lexicon - имя словаря для профилировщика паттернов.
+    budget - бюджет времени сцены; когда он исчерпан, оставшиеся паттерны
+    пропускаются и возвращается частичный результат.
 
     Returns:
         (weighted_count, matched_excerpts)
@@ -588,43 +659,108 @@ def count_pattern_matches(patterns: List[str], text: str) -> Tuple[float, List[s
         r"ран(ь|н)(ше|ий|яя|ее|его|им|ему)",  # "раньше", "ранний" etc (not wounds)
     ]
 
-    false_positive_patterns = [re.compile(p, re.I) for p in FALSE_POSITIVES]
+    # компиляция кэшируется; неограниченные .* переписываются в .{0,N}
+    false_positive_patterns = [compile_guarded(p) for p in FALSE_POSITIVES]
+
+    scan_started = time.perf_counter()
+    filter_elapsed = 0.0
+    # включено только в режиме профилирования паттернов или во время /debug/profile
+    profilers = active_pattern_profilers()
 
     matches = []
     weighted_count = 0.0
     for pattern in patterns:
+        if budget is not None and budget.check():
+            break
         if isinstance(pattern, re.Pattern):
             regex = pattern
         else:
-            regex = re.compile(pattern, re.I)
+            regex = compile_guarded(pattern)
+        pattern_started = time.perf_counter()
+        pattern_filter_elapsed = 0.0
+        found_count = 0
+        suppressed_count = 0
         found = regex.finditer(text)
         for match in found:
+            found_count += 1
             start = max(0, match.start() - 50)
             end = min(len(text), match.end() + 50)
             excerpt = text[start:end].strip()
 
-            is_false_positive = any(
-                fp.search(excerpt) for fp in false_positive_patterns
-            )
+            filter_started = time.perf_counter()
+            if profilers:
+                is_false_positive = _is_false_positive_profiled(
+                    excerpt, false_positive_patterns, profilers
+                )
+            else:
+                is_false_positive = any(
+                    fp.search(excerpt) for fp in false_positive_patterns
+                )
+            pattern_filter_elapsed += time.perf_counter() - filter_started
 
             if not is_false_positive:
                 weight = _get_keyword_context_weight(excerpt)
                 weighted_count += weight
                 matches.append(excerpt)
+            else:
+                suppressed_count += 1
+
+        filter_elapsed += pattern_filter_elapsed
+        if profilers:
+            pattern_elapsed = (
+                time.perf_counter() - pattern_started - pattern_filter_elapsed
+            )
+            for profiler in profilers:
+                profiler.record(
+                    lexicon,
+                    regex.pattern,
+                    pattern_elapsed,
+                    matches=found_count,
+                    suppressed=suppressed_count,
+                )
 
     matches = [m for m in matches if len(m.strip()) > 10]
+
+    # время фильтрации ложных срабатываний учитываем отдельно от сканирования
+    record_stage_time(
+        "keyword_scan", time.perf_counter() - scan_started - filter_elapsed
+    )
+    record_stage_time("false_positive_filter", filter_elapsed)
     return weighted_count, matches[:5]
 
 
-def analyze_scene_context(scene_text: str) -> Dict[str, float]:
+def embed_scenes(texts: List[str]) -> np.ndarray:
+    """
+    Эмбеддинги нескольких сцен за один проход модели.
+    Кодируем порциями по EMBEDDING_BATCH_SIZE, чтобы отмена анализа
+    срабатывала между порциями, а не после всего сценария.
+    """
+    batches = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        checkpoint()
+        batch = texts[start : start + EMBEDDING_BATCH_SIZE]
+        with stage_span("embedding"):
+            batches.append(
+                embedder.encode(batch, convert_to_numpy=True, show_progress_bar=False)
+            )
+        record_embedding_batch(len(batch))
+    if not batches:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.concatenate(batches)
+
+
+def analyze_scene_context(
+    scene_text: str, scene_embedding: np.ndarray | None = None
+) -> Dict[str, float]:
     """
     Анализирует контекст сцены с использованием семантических эмбеддингов.
     Возвращает оценки сходства с различными типами контекстов.
+    Готовый эмбеддинг сцены (из embed_scenes) можно передать, чтобы не
+    кодировать сцену повторно.
     """
     # получаем эмбеддинг сцены
-    scene_embedding = embedder.encode(
-        [scene_text], convert_to_numpy=True, show_progress_bar=False
-    )[0]
+    if scene_embedding is None:
+        scene_embedding = embed_scenes([scene_text])[0]
 
     # вычисляем сходство с каждым типом контекста
     context_scores = {}
@@ -637,27 +773,55 @@ def analyze_scene_context(scene_text: str) -> Dict[str, float]:
     return context_scores
 
 
-def extract_scene_features(scene_text: str) -> Dict[str, Any]:
+def extract_scene_features(
+    scene_text: str,
+    scene_embedding: np.ndarray | None = None,
+    lines: LineRange | None = None,
+) -> Dict[str, Any]:
     """
     Извлекает признаки из текста сцены, включая подсчет ключевых слов
-    и примеры найденных фрагментов.
+    и примеры найденных фрагментов. ``lines`` - строки сцены в индексе
+    всего сценария, если он уже построен.
     """
     txt = scene_text.lower()
+    # общий бюджет на все словари сцены: длинная "простыня" текста из PDF
+    # не должна блокировать воркер
+    budget = ScanBudget(SCENE_SCAN_BUDGET)
 
-    violence_count, violence_excerpts = count_pattern_matches(VIOLENCE_WORDS, txt)
-    gore_count, gore_excerpts = count_pattern_matches(GORE_WORDS, txt)
-    profanity_count, profanity_excerpts = count_pattern_matches(PROFANITY, txt)
-    drugs_count, drugs_excerpts = count_pattern_matches(DRUG_WORDS, txt)
-    child_count, child_excerpts = count_pattern_matches(CHILD_WORDS, txt)
-    nudity_count, nudity_excerpts = count_pattern_matches(NUDITY_WORDS, txt)
-    sex_count, sex_excerpts = count_pattern_matches(SEX_WORDS, txt)
+    violence_count, violence_excerpts = count_pattern_matches(
+        VIOLENCE_WORDS, txt, "violence", budget
+    )
+    gore_count, gore_excerpts = count_pattern_matches(GORE_WORDS, txt, "gore", budget)
+    profanity_count, profanity_excerpts = count_pattern_matches(
+        PROFANITY, txt, "profanity", budget
+    )
+    drugs_count, drugs_excerpts = count_pattern_matches(
+        DRUG_WORDS, txt, "drugs", budget
+    )
+    child_count, child_excerpts = count_pattern_matches(
+        CHILD_WORDS, txt, "child_risk", budget
+    )
+    nudity_count, nudity_excerpts = count_pattern_matches(
+        NUDITY_WORDS, txt, "nudity", budget
+    )
+    sex_count, sex_excerpts = count_pattern_matches(SEX_WORDS, txt, "sex_act", budget)
 
-    semantic_context = analyze_scene_context(scene_text)
-    keyword_context = _compute_context_scores(scene_text)
-    context_scores = {**semantic_context, **keyword_context}
+    if budget.exhausted:
+        record_scan_degraded("scene")
+        print(
+            f"WARNING: превышен бюджет сканирования сцены ({budget.seconds}s), "
+            "результат неполный"
+        )
 
-    structure = _analyze_scene_structure(scene_text)
-    context_scores["dialogue_heavy"] = round(structure.get("dialogue_ratio", 0.5), 4)
+    semantic_context = analyze_scene_context(scene_text, scene_embedding)
+    with stage_span("context_scoring"):
+        keyword_context = _compute_context_scores(scene_text)
+        context_scores = {**semantic_context, **keyword_context}
+
+        structure = _analyze_scene_structure(scene_text, lines)
+        context_scores["dialogue_heavy"] = round(
+            structure.get("dialogue_ratio", 0.5), 4
+        )
 
     length = max(1, len(txt.split()))
 
@@ -679,15 +843,31 @@ def extract_scene_features(scene_text: str) -> Dict[str, Any]:
         "length": length,
         "context_scores": context_scores,
         "structure": structure,
+        "scan_degraded": budget.exhausted,
     }
 
 
-def _analyze_scene_structure(scene_text: str) -> Dict[str, float]:
+def _analyze_scene_structure(
+    scene_text: str, lines: LineRange | None = None
+) -> Dict[str, float]:
     """
     Analyzes scene structure to distinguish ACTION from DIALOGUE.
     Returns weights for content scoring.
     """
-    lines = scene_text.split("\n")
+    # разметка строк берётся из индекса всего сценария; сцену вне индекса
+    # (например, изменённую what-if) размечаем одним проходом без кэша
+    if lines is not None:
+        index, first, stop = lines
+        types = index.types[first:stop]
+        stripped = index.stripped[first:stop]
+        caps = index.caps[first:stop]
+        word_counts = index.words[first:stop]
+    else:
+        rows = list(classify_lines(scene_text.split("\n")))
+        stripped = [row[0] for row in rows]
+        types = [row[1] for row in rows]
+        caps = [bool(CAPS_RE.match(line)) and len(line) < 50 for line in stripped]
+        word_counts = [len(line.split()) for line in stripped]
 
     dialogue_lines = 0
     action_lines = 0
@@ -695,28 +875,26 @@ def _analyze_scene_structure(scene_text: str) -> Dict[str, float]:
     dialogue_words = 0
 
     i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        if not line:
+    while i < len(types):
+        if types[i] == BLANK:
             i += 1
             continue
 
-        if re.match(r"^[А-ЯA-Z\s]{2,}$", line) and len(line) < 50:
+        if caps[i]:
             i += 1
-            if i < len(lines):
-                next_line = lines[i].strip()
+            if i < len(types):
+                next_line = stripped[i]
                 if next_line and not next_line.startswith("("):
                     dialogue_lines += 1
-                    dialogue_words += len(next_line.split())
+                    dialogue_words += word_counts[i]
             continue
 
-        if line.startswith("(") and line.endswith(")"):
+        if types[i] == PARENTHETICAL:
             i += 1
             continue
 
-        if not re.match(r"^(INT\.|EXT\.|ИНТ\.|ЭКСТ\.)", line, re.I):
-            words = len(line.split())
+        if types[i] != HEADING:
+            words = word_counts[i]
             total_words += words
             if words < 80:
                 dialogue_words += words * 0.5
@@ -1186,6 +1364,142 @@ def map_scores_to_rating(agg: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+RATING_ORDER = ["0+", "6+", "12+", "16+", "18+"]
+
+
+def map_scores_to_rating_batch(agg: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Векторная версия map_scores_to_rating: по массивам агрегированных оценок
+    возвращает массив рейтингов (без причин и примеров).
+    Правила должны совпадать с map_scores_to_rating один в один - это
+    проверяет test_batch_rating_matches_scalar_rules.
+    """
+    violence, gore = agg["violence"], agg["gore"]
+    sex_act, nudity = agg["sex_act"], agg["nudity"]
+    profanity, drugs = agg["profanity"], agg["drugs"]
+    child_risk = agg.get("child_risk", np.zeros_like(violence))
+
+    rating = np.select(
+        [
+            (sex_act >= 0.75) | (gore >= 0.95),
+            (child_risk > 0.7) & ((sex_act >= 0.5) | (violence >= 0.8)),
+            ((violence >= 0.8) & (gore >= 0.7)) | (gore >= 0.75),
+            (violence >= 0.65) | (gore >= 0.5),
+            (sex_act >= 0.35) | (nudity >= 0.4),
+            (violence >= 0.3) | (profanity >= 0.4) | (drugs >= 0.3),
+            (violence >= 0.1) | (profanity >= 0.1),
+        ],
+        ["18+", "18+", "16+", "16+", "16+", "12+", "6+"],
+        "0+",
+    ).astype(object)
+
+    moderate_combo = (violence >= 0.22) & (gore >= 0.08)
+    adult_combo = (sex_act >= 0.15) | (nudity >= 0.2)
+    dark_combo = (profanity >= 0.15) | (drugs >= 0.12)
+
+    rating[np.isin(rating, ["0+", "6+"]) & moderate_combo] = "16+"
+    rating[
+        np.isin(rating, ["0+", "6+", "12+", "16+"])
+        & moderate_combo
+        & (adult_combo | dark_combo)
+    ] = "18+"
+
+    action_intensity = violence * 0.65 + gore * 0.2 + child_risk * 0.15
+    has_persistent_conflict = (violence >= 0.35) & (profanity >= 0.2)
+    rating[
+        (rating == "12+") & ((action_intensity >= 0.45) | has_persistent_conflict)
+    ] = "16+"
+
+    mild_conflict = (violence >= 0.05) | (profanity >= 0.05) | (child_risk >= 0.05)
+    rating[(rating == "0+") & mild_conflict] = "6+"
+    return rating
+
+
+def blend_aggregate(key: str, max_val, p95_val, p90_val):
+    """
+    Итоговая оценка категории по максимуму и перцентилям оценок сцен.
+    Работает и с числами, и с numpy-массивами.
+    """
+    # для насилия и крови: взвешенное среднее максимума и 95-го перцентиля
+    # если есть 1-2 очень графичные сцены, но остальные нормальные - это 16+, а не 18+
+    # если много графичных сцен - это 18+
+    if key in ["violence", "gore"]:
+        # 70% максимум + 30% p95 дает баланс
+        return max_val * 0.7 + p95_val * 0.3
+
+    # для сексуального контента и наготы - больше вес на максимум
+    if key in ["sex_act", "nudity", "child_risk"]:
+        return max_val * 0.85 + p90_val * 0.15
+
+    # для ненормативной лексики и наркотиков используем 90-й перцентиль
+    # так как они должны встречаться чаще для повышения рейтинга
+    return p90_val
+
+
+def percentile_position(n, q: float):
+    """
+    Соседние позиции и вес интерполяции q-го перцентиля среди n
+    отсортированных значений - так же, как считает np.percentile (linear).
+    n может быть массивом.
+    """
+    virtual = np.asarray(np.asarray(n) - 1) * (q / 100)
+    lower = np.floor(virtual)
+    gamma = virtual - lower
+    lower = lower.astype(int)
+    upper = np.minimum(lower + 1, np.maximum(np.asarray(n) - 1, 0))
+    return lower, upper, gamma
+
+
+def interpolate(below, above, gamma):
+    """Линейная интерполяция в той же форме, что и у np.percentile."""
+    diff = above - below
+    return np.where(gamma >= 0.5, above - diff * (1 - gamma), below + diff * gamma)
+
+
+def leave_one_out_scores(matrix: np.ndarray, score_keys: List[str]) -> np.ndarray:
+    """
+    Агрегированные оценки сценария без каждой сцены по очереди.
+
+    matrix: оценки сцен (сцены x score_keys). Строка i результата - то, что
+    дала бы агрегация без сцены i. Столбцы сортируются один раз, после чего
+    max/p90/p95 без любой сцены читаются по её позиции в сортировке:
+    O(n log n) вместо n полных пересчетов.
+    """
+    n, k = matrix.shape
+    if n <= 1:
+        # без единственной сцены сценарий пуст, все оценки нулевые
+        return np.zeros((n, k))
+
+    order = np.argsort(matrix, axis=0, kind="stable")
+    ranked = np.take_along_axis(matrix, order, axis=0)
+    # position[i, j] - место сцены i в отсортированном столбце j
+    position = np.empty_like(order)
+    np.put_along_axis(
+        position, order, np.broadcast_to(np.arange(n)[:, None], (n, k)), axis=0
+    )
+
+    def remaining(t: int) -> np.ndarray:
+        # t-е значение столбца после удаления сцены: все, кто стоял
+        # после нее, сдвигаются на одну позицию
+        return np.where(t < position, ranked[t], ranked[t + 1])
+
+    left = n - 1
+
+    def percentile(q: float) -> np.ndarray:
+        lower, upper, gamma = percentile_position(left, q)
+        return np.asarray(
+            interpolate(remaining(int(lower)), remaining(int(upper)), gamma)
+        )
+
+    max_val = remaining(left - 1)
+    p95_val, p90_val = percentile(95), percentile(90)
+
+    result = np.empty((n, k))
+    for j, key in enumerate(score_keys):
+        result[:, j] = blend_aggregate(key, max_val[:, j], p95_val[:, j], p90_val[:, j])
+    return result
+
+
 def parse_script_to_scenes(txt: str) -> List[Dict[str, Any]]:
     """
     Разбивает сценарий на отдельные сцены.
@@ -1274,18 +1588,32 @@ def analyze_script_file(path: str) -> Dict[str, Any]:
         txt = file_path.read_text(encoding="utf-8", errors="ignore")
 
     # разбиваем на сцены
-    scenes = parse_script_to_scenes(txt)
+    with stage_span("parsing"):
+        scenes = parse_script_to_scenes(txt)
+        # разметка строк строится один раз на весь сценарий
+        line_ranges = scene_line_ranges(
+            get_script_index(txt), [scene["text"] for scene in scenes]
+        )
     print(f"Найдено сцен: {len(scenes)}")
 
     # извлекаем признаки для каждой сцены
     print("Анализ сцен...")
+    # эмбеддинги всех сцен считаем одним батчем, а не по сцене за вызов
+    embeddings = embed_scenes([scene["text"] for scene in scenes])
     features = []
-    for scene in tqdm(scenes, desc="Обработка сцен"):
-        feat = extract_scene_features(scene["text"])
+    for scene, embedding, lines in zip(
+        tqdm(scenes, desc="Обработка сцен"), embeddings, line_ranges
+    ):
+        # прерываем анализ, если клиент ушел или истек дедлайн запроса
+        checkpoint()
+        feat = extract_scene_features(scene["text"], embedding, lines)
         features.append(feat)
 
     # нормализуем и применяем контекстную коррекцию
-    scores = [normalize_and_contextualize_scores(f) for f in features]
+    with stage_span("normalization"):
+        scores = [normalize_and_contextualize_scores(f) for f in features]
+
+    aggregation_started = time.perf_counter()
 
     # агрегируем оценки
     # используем гибридный подход: учитываем как максимум, так и частоту
@@ -1304,22 +1632,7 @@ def analyze_script_file(path: str) -> Dict[str, Any]:
         max_val = float(np.max(values))
         p95_val = float(np.percentile(values, 95))
         p90_val = float(np.percentile(values, 90))
-
-        # для насилия и крови: взвешенное среднее максимума и 95-го перцентиля
-        # если есть 1-2 очень графичные сцены, но остальные нормальные - это 16+, а не 18+
-        # если много графичных сцен - это 18+
-        if k in ["violence", "gore"]:
-            # 70% максимум + 30% p95 дает баланс
-            agg[k] = max_val * 0.7 + p95_val * 0.3
-
-        # для сексуального контента и наготы - больше вес на максимум
-        elif k in ["sex_act", "nudity", "child_risk"]:
-            agg[k] = max_val * 0.85 + p90_val * 0.15
-
-        # для ненормативной лексики и наркотиков используем 90-й перцентиль
-        # так как они должны встречаться чаще для повышения рейтинга
-        else:
-            agg[k] = float(np.percentile(values, 90))
+        agg[k] = blend_aggregate(k, max_val, p95_val, p90_val)
 
     # собираем все примеры из всех сцен
     all_excerpts: dict[str, list[Any]] = {
@@ -1341,9 +1654,19 @@ def analyze_script_file(path: str) -> Dict[str, Any]:
     # определяем рейтинг
     rating_info = map_scores_to_rating(agg)
 
-    # находим самые проблемные сцены
+    # находим самые проблемные сцены: сначала те, без которых рейтинг
+    # снижается, затем по тому, насколько падают агрегированные оценки,
+    # и только потом по фиксированным весам категорий
+    matrix = np.array([[s[k] for k in score_keys] for s in scores])
+    without = leave_one_out_scores(matrix, score_keys)
+    ratings_without = map_scores_to_rating_batch(
+        {k: without[:, j] for j, k in enumerate(score_keys)}
+    )
+    current_rank = RATING_ORDER.index(rating_info["rating"])
+    full = np.array([agg[k] for k in score_keys])
+
     ranking = []
-    for scene, score in zip(scenes, scores):
+    for idx, (scene, score) in enumerate(zip(scenes, scores)):
         weight = (
             score["violence"] * 0.5
             + score["gore"] * 0.8
@@ -1352,14 +1675,17 @@ def analyze_script_file(path: str) -> Dict[str, Any]:
             + score["drugs"] * 0.3
             + score["child_risk"] * 0.7
         )
-        ranking.append((weight, scene, score))
+        rating_drop = current_rank - RATING_ORDER.index(ratings_without[idx])
+        impact = float(np.clip(full - without[idx], 0, None).sum())
+        ranking.append(((rating_drop, impact, weight), weight, scene, score))
 
     ranking.sort(reverse=True, key=lambda x: x[0])
 
     # топ-5 самых влияющих на рейтинг сцен
     top_scenes = []
-    for weight, scene, score in ranking[:5]:
-        if weight > 0.1:  # показываем только значимые сцены
+    for (rating_drop, _, _), weight, scene, score in ranking[:5]:
+        # показываем только значимые сцены
+        if weight > 0.1 or rating_drop > 0:
             # генерируем рекомендации для каждой проблемной сцены
             recommendations = generate_scene_recommendations(score)
 
@@ -1393,6 +1719,8 @@ def analyze_script_file(path: str) -> Dict[str, Any]:
             }
         )
 
+    record_stage_time("aggregation", time.perf_counter() - aggregation_started)
+
     # формируем итоговый результат
     result = {
         "file": str(Path(path).name),
@@ -0,0 +1,187 @@
+"""Single-pass text rewriting with replacement tables.
+
+A replacement table maps patterns to replacements. Keys containing a word
+boundary (``\\b``) are regexes; any other key is a word stem that also
+matches its inflections (``kill`` -> ``kills``, ``killer``). A table is
+compiled into one alternation with a named group per entry, so rewriting a
+scene is a single ``subn`` scan that dispatches each match to its
+replacement and counts it, instead of search/sub/findall per entry.
+
+At any position the first matching entry in table order wins, as it did when
+entries were applied one after another. Unlike that sequential form, text
+produced by one replacement is never rewritten again by a later entry.
+
+Each regex key is compiled alone first, then rewritten to sit inside the
+alternation: its capture groups are renamed per entry, so numbered
+backreferences keep pointing at the key's own groups, and leading global
+flags such as ``(?i)`` become flags scoped to the entry.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+Rules = Tuple[Tuple[str, str], ...]
+
+
+def word_pattern(word: str) -> str:
+    return r"\b" + re.escape(word) + r"\w*"
+
+
+def as_pattern(key: str) -> str:
+    return key if r"\b" in key else word_pattern(key)
+
+
+_GLOBAL_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def embed_pattern(pattern: str, prefix: str) -> str:
+    """``pattern`` rewritten to be one branch of a larger alternation.
+
+    Capture groups are named ``<prefix><number>`` and references to them
+    (``\\1``, ``(?P=name)``, ``(?(1)...)``) follow; leading global flags
+    are turned into a scoped flag group. Raises ``re.error`` if the
+    pattern does not compile on its own.
+    """
+    re.compile(pattern)
+    flags = ""
+    match = _GLOBAL_FLAGS.match(pattern)
+    while match:
+        flags += match.group(1)
+        pattern = pattern[match.end() :]
+        match = _GLOBAL_FLAGS.match(pattern)
+    verbose = "x" in flags
+
+    out: List[str] = []
+    names: Dict[str, str] = {}
+    groups = 0
+    in_class = False
+    i, n = 0, len(pattern)
+    while i < n:
+        char = pattern[i]
+        if char == "\\":
+            digits = pattern[i + 1 : i + 3]
+            digits = digits if digits.isdigit() else digits[:1]
+            if in_class or not digits.isdigit() or digits[0] == "0":
+                out.append(pattern[i : i + 2])
+                i += 2
+            elif len(digits) == 2 and re.fullmatch("[0-7]{3}", pattern[i + 1 : i + 4]):
+                # three octal digits are a character, not a reference
+                out.append(pattern[i : i + 4])
+                i += 4
+            else:
+                out.append(f"(?P={prefix}{int(digits)})")
+                i += 1 + len(digits)
+        elif in_class:
+            in_class = char != "]"
+            out.append(char)
+            i += 1
+        elif char == "[":
+            in_class = True
+            start = i
+            i += 2 if pattern.startswith("[^", i) else 1
+            # a ] right after the opening bracket is literal
+            if pattern.startswith("]", i):
+                i += 1
+            out.append(pattern[start:i])
+        elif verbose and char == "#":
+            end = pattern.find("\n", i)
+            end = n if end < 0 else end
+            out.append(pattern[i:end])
+            i = end
+        elif pattern.startswith("(?P<", i):
+            end = pattern.index(">", i)
+            groups += 1
+            names[pattern[i + 4 : end]] = f"{prefix}{groups}"
+            out.append(f"(?P<{prefix}{groups}>")
+            i = end + 1
+        elif pattern.startswith("(?P=", i) or pattern.startswith("(?(", i):
+            opener = pattern[i : i + 3] if pattern[i + 2] == "(" else pattern[i : i + 4]
+            end = pattern.index(")", i + len(opener))
+            ref = pattern[i + len(opener) : end]
+            target = f"{prefix}{int(ref)}" if ref.isdigit() else names.get(ref, ref)
+            out.append(f"{opener}{target})")
+            i = end + 1
+        elif pattern.startswith("(?", i):
+            out.append("(?")
+            i += 2
+        elif char == "(":
+            groups += 1
+            out.append(f"(?P<{prefix}{groups}>")
+            i += 1
+        else:
+            out.append(char)
+            i += 1
+
+    body = "".join(out)
+    if flags:
+        # a comment in verbose mode runs to the end of the line
+        body = f"(?{flags}:{body}\n)" if verbose else f"(?{flags}:{body})"
+    return body
+
+
+def check_key(key: str) -> None:
+    """Raise ``re.error`` if ``key`` cannot be used in a replacement table."""
+    re.compile(embed_pattern(as_pattern(key), "_rw0_"))
+
+
+class RewriteTable:
+    """Compiled replacement table, safe to share between threads."""
+
+    def __init__(self, rules: Iterable[Tuple[str, str]], flags: int = re.I):
+        self._replacements: Dict[str, str] = {}
+        # entries whose replacement has escapes or group references
+        self._templates: Dict[str, re.Pattern] = {}
+        alternatives: List[str] = []
+        for i, (pattern, replacement) in enumerate(rules):
+            name = f"_rw{i}"
+            alternatives.append(f"(?P<{name}>{embed_pattern(pattern, name + '_')})")
+            self._replacements[name] = replacement
+            if "\\" in replacement:
+                self._templates[name] = re.compile(pattern, flags)
+        self.size = len(alternatives)
+        self.regex = re.compile("|".join(alternatives), flags) if alternatives else None
+        self._dispatch = self._expand if self._templates else self._literal
+
+    def _literal(self, match: re.Match) -> str:
+        return self._replacements[match.lastgroup or ""]
+
+    def _expand(self, match: re.Match) -> str:
+        name = match.lastgroup or ""
+        template = self._templates.get(name)
+        if template is None:
+            return self._replacements[name]
+        # re-match the entry alone so its own groups are numbered as written
+        own = template.match(match.string, match.start(name))
+        return own.expand(self._replacements[name]) if own else match.group(name)
+
+    def subn(self, text: str) -> Tuple[str, int]:
+        if self.regex is None:
+            return text, 0
+        return self.regex.subn(self._dispatch, text)
+
+    def sub(self, text: str) -> str:
+        return self.subn(text)[0]
+
+
+@lru_cache(maxsize=256)
+def _compile(rules: Rules) -> RewriteTable:
+    return RewriteTable((as_pattern(key), value) for key, value in rules)
+
+
+def compile_replacements(
+    replacements: Mapping[str, str] | Iterable[Tuple[str, str]],
+) -> RewriteTable:
+    """Compiled table for ``replacements``, cached by content."""
+    if isinstance(replacements, Mapping):
+        rules: Rules = tuple(replacements.items())
+    else:
+        rules = tuple(replacements)
+    return _compile(rules)
+
+
+def rewrite(
+    text: str, replacements: Mapping[str, str] | Iterable[Tuple[str, str]]
+) -> Tuple[str, int]:
+    """Apply a replacement table in one pass; returns text and match count."""
+    return compile_replacements(replacements).subn(text)
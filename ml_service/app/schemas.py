@@ -1,3 +1,5 @@
+from typing import Any, Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -29,6 +31,7 @@ class SceneFeatures(BaseModel):
 
 class ScriptRatingResponse(BaseModel):
     script_id: str | None
+    script_hash: str | None = None
     predicted_rating: str = Field(..., pattern="^(0\\+|6\\+|12\\+|16\\+|18\\+)$")
     reasons: list[str]
     agg_scores: dict[str, float]
@@ -63,6 +66,31 @@ class WhatIfResponse(BaseModel):
     rating_changed: bool
 
 
+class WhatIfBatchRequest(BaseModel):
+    script_text: str = Field(..., min_length=10, description="Original script text")
+    modification_requests: list[str] = Field(
+        ..., min_length=1, max_length=20, description="Candidate what-if requests"
+    )
+
+
+class WhatIfVariantSchema(BaseModel):
+    modification_request: str
+    modified_rating: str
+    modified_scores: dict[str, float]
+    score_deltas: dict[str, float] = Field(
+        ..., description="Modified minus original score per category"
+    )
+    rating_changed: bool
+    changes_applied: list[str]
+    explanation: str
+
+
+class WhatIfBatchResponse(BaseModel):
+    original_rating: str
+    original_scores: dict[str, float]
+    variants: list[WhatIfVariantSchema]
+
+
 class EntityTargetSchema(BaseModel):
     entity_type: str = "all"
     entity_names: list[str] | None = None
@@ -81,6 +109,10 @@ class StructuredWhatIfRequest(BaseModel):
     use_llm: bool = False
     llm_provider: str | None = None
     preserve_structure: bool = True
+    # per-scene patches ("scenes") or a unified diff; the whole modified
+    # script only when asked for
+    diff_format: Literal["scenes", "unified"] = "scenes"
+    include_modified_script: bool = False
 
 
 class EntityInfoSchema(BaseModel):
@@ -98,6 +130,14 @@ class SceneInfoSchema(BaseModel):
     summary: str | None
 
 
+class ScenePatchSchema(BaseModel):
+    op: Literal["replace", "delete", "insert"]
+    scene_id: int | None = None
+    start: int
+    end: int
+    text: str
+
+
 class AdvancedWhatIfResponse(BaseModel):
     original_rating: str
     modified_rating: str
@@ -108,11 +148,31 @@ class AdvancedWhatIfResponse(BaseModel):
     scene_analysis: list[SceneInfoSchema]
     explanation: str
     modified_script: str | None = None
+    changed_scene_ids: list[int] = Field(default_factory=list)
+    scene_patches: list[ScenePatchSchema] = Field(default_factory=list)
+    unified_diff: str | None = None
     rating_changed: bool
 
 
+class SceneScoresSchema(BaseModel):
+    scene_id: int
+    scene_number: int | None = None
+    heading: str = ""
+    content: str = ""
+    violence: float = 0.0
+    gore: float = 0.0
+    sex_act: float = 0.0
+    nudity: float = 0.0
+    profanity: float = 0.0
+    drugs: float = 0.0
+    child_risk: float = 0.0
+
+
 class RatingAdvisorRequest(BaseModel):
-    script_text: str = Field(..., min_length=10)
+    script_text: str | None = Field(None, min_length=10)
+    script_hash: str | None = None
+    scenes: list[SceneScoresSchema] | None = None
+    agg_scores: dict[str, float] | None = None
     current_rating: str | None = None
     target_rating: str = Field(..., pattern="^(0\\+|6\\+|12\\+|16\\+|18\\+)$")
     language: str = "en"
@@ -169,12 +229,20 @@ class SmartSuggestionSchema(BaseModel):
     confidence: float = Field(..., ge=0, le=1, description="Confidence score")
     affected_scenes: list[int] = Field(default_factory=list)
     reasoning: str = Field(..., description="Why this suggestion")
+    predicted_rating: str | None = Field(
+        default=None, description="Expected rating once the suggestion is applied"
+    )
+    score_deltas: dict[str, float] = Field(default_factory=dict)
 
 
 class SmartSuggestionsRequest(BaseModel):
     script_text: str = Field(..., min_length=10)
     current_scores: dict[str, float] | None = None
     current_rating: str | None = None
+    scene_scores: list[dict[str, float]] | None = Field(
+        default=None,
+        description="Per-scene category scores in scene order, if already known",
+    )
     language: str = "ru"
     max_suggestions: int = Field(default=8, ge=1, le=20)
 
@@ -186,12 +254,127 @@ class SmartSuggestionsResponse(BaseModel):
     total_scenes: int
 
 
+class RatingOptimizationRequest(BaseModel):
+    script_text: str = Field(..., min_length=10)
+    target_rating: str = Field(..., pattern="^(0\\+|6\\+|12\\+|16\\+|18\\+)$")
+    max_edits: int = Field(default=8, ge=1, le=30)
+    beam_width: int = Field(default=5, ge=1, le=50)
+    max_plans: int = Field(default=3, ge=1, le=10)
+    allow_removal: bool = Field(
+        default=True, description="Consider removing whole scenes"
+    )
+
+
+class PlannedEditSchema(BaseModel):
+    scene_id: int
+    heading: str
+    action: str = Field(..., description="remove_scene or reduce_content")
+    content_type: str | None = Field(
+        default=None, description="violence, profanity, gore, sexual or drugs"
+    )
+
+
+class EditPlanSchema(BaseModel):
+    edits: list[PlannedEditSchema]
+    cost: int = Field(..., description="Reductions count 1, removals 2")
+    predicted_rating: str
+    predicted_scores: dict[str, float]
+
+
+class RatingOptimizationResponse(BaseModel):
+    current_rating: str
+    target_rating: str
+    current_scores: dict[str, float]
+    reachable: bool
+    plans: list[EditPlanSchema]
+    evaluated_candidates: int
+
+
+class SensitivityRequest(BaseModel):
+    script_text: str = Field(..., min_length=10)
+    scene_scores: list[dict[str, float]] | None = Field(
+        default=None, description="Per-scene scores from a previous analysis"
+    )
+    max_scenes: int | None = Field(default=None, ge=1, le=500)
+
+
+class SceneSensitivitySchema(BaseModel):
+    scene_id: int
+    heading: str
+    rating_without: str = Field(..., description="Rating with this scene cut")
+    rating_drop: int = Field(..., description="Rating steps lost without the scene")
+    impact: float = Field(..., description="Total drop of the aggregated scores")
+    score_deltas: dict[str, float]
+
+
+class SensitivityResponse(BaseModel):
+    current_rating: str
+    current_scores: dict[str, float]
+    total_scenes: int
+    rating_changing_scenes: list[int]
+    scenes: list[SceneSensitivitySchema]
+
+
+class SessionSensitivityRequest(BaseModel):
+    max_scenes: int | None = Field(default=None, ge=1, le=500)
+
+
+class SessionOpenRequest(BaseModel):
+    script_text: str = Field(..., min_length=10, description="Script to hold")
+
+
+class SessionUpdateRequest(BaseModel):
+    script_text: str = Field(..., min_length=10, description="Edited script text")
+
+
+class SessionResponse(BaseModel):
+    session_id: str
+    revision: int = Field(..., description="Bumped on every change to the script")
+    rating: str
+    scores: dict[str, float]
+    total_scenes: int
+    expires_in: float = Field(..., description="Seconds of inactivity left")
+
+
+class SessionWhatIfRequest(BaseModel):
+    modification_request: str = Field(..., min_length=3)
+    apply: bool = Field(
+        default=False,
+        description="Keep the modified script as the session's new revision",
+    )
+
+
+class SessionWhatIfBatchRequest(BaseModel):
+    modification_requests: list[str] = Field(..., min_length=1, max_length=20)
+
+
+class SessionSuggestionsRequest(BaseModel):
+    language: str = "ru"
+    max_suggestions: int = Field(default=8, ge=1, le=20)
+
+
+class SessionAdvisorRequest(BaseModel):
+    current_rating: str | None = None
+    target_rating: str = Field(..., pattern="^(0\\+|6\\+|12\\+|16\\+|18\\+)$")
+    language: str = "en"
+    include_rewrites: bool = False
+
+
 class LineDetectionRequest(BaseModel):
     script_id: str | None = None
     text: str = Field(..., min_length=10, description="Full movie script text")
     context_size: int = Field(
         default=3, ge=0, le=10, description="Lines of context before/after"
     )
+    line_offset: int = Field(
+        default=0,
+        ge=0,
+        description="Lines preceding this text in the full script (for excerpts)",
+    )
+    compact: bool = Field(
+        default=False,
+        description="Return match spans and pattern ids without context strings",
+    )
 
 
 class LineMatchSchema(BaseModel):
@@ -223,3 +406,57 @@ class LineDetectionResponse(BaseModel):
     detections: list[LineDetectionItemSchema]
     stats: LineDetectionStatsSchema
     total_lines: int
+
+
+class ProfileRequest(BaseModel):
+    mode: Literal["request", "sample"] = Field(
+        default="request",
+        description="Profile one supplied request, or sample live traffic",
+    )
+    endpoint: Literal["rate_script", "what_if", "detect_lines"] | None = Field(
+        default=None, description="Endpoint to run in 'request' mode"
+    )
+    payload: dict[str, Any] = Field(
+        default_factory=dict, description="Request body for the endpoint"
+    )
+    duration_seconds: float = Field(
+        default=5.0, gt=0, description="Sampling window in 'sample' mode"
+    )
+    interval_ms: float = Field(default=5.0, ge=1, le=100)
+
+
+class PatternTimingSchema(BaseModel):
+    lexicon: str
+    pattern: str
+    calls: int
+    matches: int
+    suppressed: int
+    total_seconds: float
+    avg_microseconds: float
+
+
+class IntentMatchSchema(BaseModel):
+    intent: str
+    pattern: str
+    text: str
+    span: tuple[int, int]
+    groups: list[str | None]
+
+
+class IntentExplanationResponse(BaseModel):
+    modifications: dict[str, Any]
+    matches: list[IntentMatchSchema]
+    similarities: dict[str, float] = Field(
+        default_factory=dict,
+        description="Similarity of the replacement phrase to each example set",
+    )
+
+
+class ProfileResponse(BaseModel):
+    mode: str
+    endpoint: str | None = None
+    duration_seconds: float
+    samples: int
+    collapsed_stacks: str
+    pattern_timings: list[PatternTimingSchema]
+    error: str | None = None
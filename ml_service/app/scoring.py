@@ -0,0 +1,219 @@
+"""Per-scene scoring shared by the what-if analyzers.
+
+A scene's scores depend only on its text, so they are cached by content hash.
+Re-analysing a modified script then extracts features and embeddings only for
+the scenes a modification actually changed or added; removed scenes simply
+drop out of the aggregation, which is cheap to redo over the score matrix.
+The scenes that do need scoring are embedded in one batch.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .cancellation import checkpoint
+from .config import settings
+from .metrics import record_cache_lookup
+from .repair_pipeline import (
+    blend_aggregate,
+    embed_scenes,
+    extract_scene_features,
+    interpolate,
+    normalize_and_contextualize_scores,
+    percentile_position,
+)
+from .script_index import LineRange
+
+SCORE_KEYS = [
+    "violence",
+    "gore",
+    "sex_act",
+    "nudity",
+    "profanity",
+    "drugs",
+    "child_risk",
+]
+
+
+def aggregate_scores(scene_scores: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Script-level scores from per-scene scores (same blend as the pipeline)."""
+    agg = {}
+    for k in SCORE_KEYS:
+        values = [s[k] for s in scene_scores] or [0.0]
+        agg[k] = blend_aggregate(
+            k,
+            float(np.max(values)),
+            float(np.percentile(values, 95)),
+            float(np.percentile(values, 90)),
+        )
+    return agg
+
+
+def aggregate_score_batch(
+    matrices: np.ndarray, removed: np.ndarray | None = None
+) -> np.ndarray:
+    """``aggregate_scores`` for a batch of score matrices at once.
+
+    ``matrices`` has shape (batch, scenes, SCORE_KEYS) and ``removed`` marks
+    scenes left out of each batch entry. Percentiles are read off the sorted
+    columns the way np.percentile interpolates, so entries with different
+    scene counts are aggregated in one go. Returns (batch, SCORE_KEYS).
+    """
+    batch, n_scenes, n_keys = matrices.shape
+    if n_scenes == 0:
+        return np.zeros((batch, n_keys))
+
+    values = np.array(matrices, dtype=float)
+    if removed is None:
+        counts = np.full(batch, n_scenes)
+    else:
+        # removed scenes sort past the real ones and are never read
+        values[removed] = np.inf
+        counts = n_scenes - removed.sum(axis=1)
+    values.sort(axis=1)
+    # with every scene removed aggregate_scores sees a single 0.0
+    values[counts == 0] = 0.0
+    counts = np.maximum(counts, 1)
+
+    rows = np.arange(batch)
+
+    def percentile(q: float) -> np.ndarray:
+        lower, upper, gamma = percentile_position(counts, q)
+        return np.asarray(
+            interpolate(values[rows, lower], values[rows, upper], gamma[:, None])
+        )
+
+    max_val = values[rows, counts - 1]
+    p95, p90 = percentile(95), percentile(90)
+
+    agg = np.empty((batch, n_keys))
+    for j, k in enumerate(SCORE_KEYS):
+        agg[:, j] = blend_aggregate(k, max_val[:, j], p95[:, j], p90[:, j])
+    return agg
+
+
+def score_matrix(scene_scores: List[Dict[str, Any]]) -> np.ndarray:
+    """Per-scene scores as a (scenes, SCORE_KEYS) array."""
+    return np.array(
+        [[s.get(k, 0.0) for k in SCORE_KEYS] for s in scene_scores], dtype=float
+    ).reshape(len(scene_scores), len(SCORE_KEYS))
+
+
+def scene_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class SceneScoreCache:
+    """LRU of normalized scene scores keyed by scene text hash.
+
+    Cached score dicts are shared between callers and must not be mutated.
+    ``name`` labels its hits and misses in the cache metrics, so the class
+    can hold other per-scene results as well.
+    """
+
+    def __init__(self, max_entries: int, name: str = "scene_scores"):
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Dict[str, Any] | None:
+        return self.get_by_key(scene_key(text))
+
+    def get_by_key(self, key: bytes) -> Dict[str, Any] | None:
+        with self._lock:
+            scores = self._entries.get(key)
+            if scores is not None:
+                self._entries.move_to_end(key)
+        record_cache_lookup(self.name, scores is not None)
+        return scores
+
+    def put(self, text: str, scores: Dict[str, Any]):
+        self.put_by_key(scene_key(text), scores)
+
+    def put_by_key(self, key: bytes, scores: Dict[str, Any]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = scores
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_scene_score_cache = SceneScoreCache(settings.scene_score_cache_size)
+
+
+def get_scene_score_cache() -> SceneScoreCache:
+    return _scene_score_cache
+
+
+def _compute_scene_scores(
+    text: str,
+    cache: SceneScoreCache,
+    embedding: np.ndarray | None = None,
+    lines: LineRange | None = None,
+) -> Dict[str, Any]:
+    features = extract_scene_features(text, embedding, lines)
+    scores = normalize_and_contextualize_scores(features)
+    # a scan cut short by its time budget is incomplete; don't keep it
+    if not features.get("scan_degraded"):
+        cache.put(text, scores)
+    return scores
+
+
+def score_scene(text: str) -> Dict[str, Any]:
+    """Normalized scores of one scene, computed only if not cached."""
+    cache = get_scene_score_cache()
+    scores = cache.get(text)
+    if scores is None:
+        scores = _compute_scene_scores(text, cache)
+    return scores
+
+
+def score_scenes(
+    scenes: List[Dict[str, Any]],
+    embeddings: np.ndarray | None = None,
+    lines: Sequence[LineRange | None] | None = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Score matrix for ``scenes`` and how many scenes had to be rescored.
+
+    Scenes missing from the cache are embedded together in one batch, and a
+    text repeated within ``scenes`` is scored once. ``embeddings``, one row
+    per scene, can be passed when the caller already has them, and so can
+    ``lines``, each scene's range in the script's index.
+    """
+    cache = get_scene_score_cache()
+    scores: Dict[int, Dict[str, Any]] = {}
+    # uncached text -> positions in ``scenes`` it appears at
+    pending: Dict[str, List[int]] = {}
+    for i, scene in enumerate(scenes):
+        checkpoint()
+        if scene["text"] in pending:
+            pending[scene["text"]].append(i)
+            continue
+        scene_scores = cache.get(scene["text"])
+        if scene_scores is None:
+            pending[scene["text"]] = [i]
+        else:
+            scores[i] = scene_scores
+
+    if pending:
+        if embeddings is None:
+            vectors = embed_scenes(list(pending))
+        else:
+            vectors = np.asarray([embeddings[p[0]] for p in pending.values()])
+        for (text, positions), vector in zip(pending.items(), vectors):
+            checkpoint()
+            scene_lines = lines[positions[0]] if lines is not None else None
+            scene_scores = _compute_scene_scores(text, cache, vector, scene_lines)
+            for i in positions:
+                scores[i] = scene_scores
+    return [scores[i] for i in range(len(scenes))], len(pending)
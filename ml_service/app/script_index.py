@@ -0,0 +1,257 @@
+"""One-pass structure index of a screenplay.
+
+``ScriptIndex`` walks the text once and records, per line, its start
+offset, stripped text, word count, line type and current speaker, plus the
+scene headings. ``get_script_index`` caches indexes by content hash, so a
+script analyzed by several consumers (line detection, the rating pipeline,
+the advanced what-if analyzer) is indexed once. Consumers that work scene by
+scene take a ``LineRange`` of the script's index (see ``scene_line_ranges``);
+text that is not part of an indexed script, such as a scene a what-if
+modification rewrote, goes through ``classify_lines`` without an index.
+"""
+
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    from .metrics import record_cache_lookup
+except ImportError:  # запуск как отдельного скрипта
+    from metrics import record_cache_lookup  # type: ignore[no-redef]
+
+BLANK = "blank"
+HEADING = "heading"
+TRANSITION = "transition"
+CHARACTER = "character"
+PARENTHETICAL = "parenthetical"
+DIALOGUE = "dialogue"
+ACTION = "action"
+
+# same scene markers as parse_script_to_scenes
+HEADING_RE = re.compile(r"^(INT\.|EXT\.|ИНТ\.|ЭКСТ\.)", re.I)
+# all-caps speaker cue on its own line
+CUE_RE = re.compile(r"^[A-ZА-ЯЁ][A-ZА-ЯЁ\s\.\-]{1,}$")
+# short all-caps line, as used by the scene structure weighting
+CAPS_RE = re.compile(r"^[А-ЯA-Z\s]{2,}$")
+# "JOHN (V.O.)" or "John: line" / "JOHN (O.S.): line"
+EXTENSION_CUE_RE = re.compile(r"^([A-ZА-ЯЁ][A-ZА-ЯЁ\s\.\-]*?)\s*\([^)]*\)$")
+INLINE_CUE_RE = re.compile(
+    r"^([^\W\d_][\w'\-]*(?:\s[^\W\d_][\w'\-]*){0,2})\s*(?:\([^)]*\))?\s*:"
+)
+
+TRANSITIONS = (
+    "INT",
+    "EXT",
+    "FADE IN",
+    "FADE OUT",
+    "CUT TO",
+    "DISSOLVE TO",
+    "ИНТ",
+    "НАТ",
+    "ЗАТЕМНЕНИЕ",
+    "ПЕРЕХОД",
+)
+
+# indexes kept, by their estimated footprint: the text, its lines and
+# stripped lines, and per-line lists
+INDEX_CACHE_MAX_BYTES = 64 * 1024 * 1024
+LINE_OVERHEAD_BYTES = 200
+
+
+def _is_transition(stripped: str) -> bool:
+    upper = stripped.upper()
+    return any(
+        upper.startswith(word)
+        and (len(upper) == len(word) or not upper[len(word)].isalpha())
+        for word in TRANSITIONS
+    )
+
+
+def _cue_name(stripped: str) -> Optional[str]:
+    """Speaker name if ``stripped`` is a character cue line, else None."""
+    if CUE_RE.match(stripped):
+        if 2 <= len(stripped) <= 50 and "." not in stripped[-2:]:
+            return stripped
+        return None
+    match = EXTENSION_CUE_RE.match(stripped) or INLINE_CUE_RE.match(stripped)
+    if match and stripped[0].isupper():
+        name = match.group(1).strip()
+        if len(name) > 1 and not _is_transition(name):
+            return name
+    return None
+
+
+def classify_lines(lines: Iterable[str]) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """Stripped text, line type and speaker of each line, in one pass.
+
+    A speaker carries from a character cue down to the next blank line,
+    scene heading or transition; action lines have none.
+    """
+    speaker: Optional[str] = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped:
+            line_type, speaker = BLANK, None
+        elif HEADING_RE.match(stripped):
+            line_type, speaker = HEADING, None
+        elif stripped.isupper() and _is_transition(stripped):
+            line_type, speaker = TRANSITION, None
+        elif stripped.startswith("(") and stripped.endswith(")"):
+            line_type = PARENTHETICAL
+        else:
+            name = _cue_name(stripped)
+            if name is not None:
+                line_type, speaker = CHARACTER, name
+            elif speaker is not None:
+                line_type = DIALOGUE
+            else:
+                line_type = ACTION
+        yield stripped, line_type, speaker if line_type != ACTION else None
+
+
+class ScriptIndex:
+    """Per-line structure of a script; all lookups are O(1) or O(log n)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines = text.split("\n")
+        self.offsets: List[int] = []
+        self.stripped: List[str] = []
+        self.words: List[int] = []
+        self.types: List[str] = []
+        self.speakers: List[Optional[str]] = []
+        self.caps: List[bool] = []
+        # (line index, heading) for each scene heading, in order
+        self.scenes: List[Tuple[int, str]] = []
+        self._build()
+        # rough memory footprint, for the cache's byte cap
+        self.size_bytes = 3 * len(text.encode("utf-8")) + LINE_OVERHEAD_BYTES * len(
+            self.lines
+        )
+        self._scene_starts = [start for start, _ in self.scenes]
+
+    def _build(self):
+        offset = 0
+        for idx, (line, (stripped, line_type, speaker)) in enumerate(
+            zip(self.lines, classify_lines(self.lines))
+        ):
+            self.offsets.append(offset)
+            offset += len(line) + 1
+            self.stripped.append(stripped)
+            self.words.append(len(stripped.split()))
+            self.caps.append(bool(CAPS_RE.match(stripped)) and len(stripped) < 50)
+            self.types.append(line_type)
+            self.speakers.append(speaker)
+            if line_type == HEADING:
+                self.scenes.append((idx, stripped))
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def line_at(self, offset: int) -> int:
+        """0-based index of the line containing character ``offset``."""
+        return max(0, bisect_right(self.offsets, offset) - 1)
+
+    def scene_at(self, line_idx: int) -> int:
+        """0-based index into ``scenes`` for a line, -1 before the first heading."""
+        return bisect_right(self._scene_starts, line_idx) - 1
+
+    def speaker_at(self, line_idx: int) -> Optional[str]:
+        """Character speaking on this line (cue, parenthetical or dialogue)."""
+        if 0 <= line_idx < len(self.speakers):
+            return self.speakers[line_idx]
+        return None
+
+    def characters(self, first: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Distinct speaker names in order of first cue, in lines first..stop."""
+        seen: Dict[str, None] = {}
+        for idx in range(first, len(self.lines) if stop is None else stop):
+            speaker = self.speakers[idx]
+            if self.types[idx] == CHARACTER and speaker is not None:
+                seen.setdefault(speaker, None)
+        return list(seen)
+
+    def lines_of(self, name: str) -> List[int]:
+        """Cue, parenthetical and dialogue lines spoken by ``name``."""
+        target = name.casefold()
+        return [
+            idx
+            for idx, speaker in enumerate(self.speakers)
+            if speaker is not None and speaker.casefold() == target
+        ]
+
+    def span_lines(self, start: int, end: int) -> Optional["LineRange"]:
+        """Lines holding characters start..end, if the span covers them whole.
+
+        Whitespace at either end of the lines may fall outside the span, as
+        when scenes are cut from the script and stripped.
+        """
+        if not 0 <= start < end <= len(self.text):
+            return None
+        first = self.line_at(start)
+        last = self.line_at(end - 1)
+        line_end = self.offsets[last] + len(self.lines[last])
+        if self.text[self.offsets[first] : start].strip():
+            return None
+        if self.text[end:line_end].strip():
+            return None
+        return LineRange(self, first, last + 1)
+
+
+class LineRange(NamedTuple):
+    """Lines first..stop (0-based, stop exclusive) of a script's index."""
+
+    script: ScriptIndex
+    first: int
+    stop: int
+
+
+def scene_line_ranges(
+    index: ScriptIndex, texts: Sequence[str]
+) -> List[Optional[LineRange]]:
+    """Line range of each scene text in the indexed script, None if a scene is
+    not found in order or does not start and end on line boundaries."""
+    ranges: List[Optional[LineRange]] = []
+    position = 0
+    for text in texts:
+        start = index.text.find(text, position) if text else -1
+        if start < 0:
+            ranges.append(None)
+            continue
+        position = start + len(text)
+        ranges.append(index.span_lines(start, position))
+    return ranges
+
+
+_cache: "OrderedDict[bytes, ScriptIndex]" = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def get_script_index(text: str) -> ScriptIndex:
+    """Return the index of ``text``, building it on first use (LRU cached)."""
+    global _cache_bytes
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _cache_lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+    record_cache_lookup("script_index", index is not None)
+    if index is not None:
+        return index
+
+    index = ScriptIndex(text)
+    size = index.size_bytes
+    if size > INDEX_CACHE_MAX_BYTES:
+        return index
+    with _cache_lock:
+        if key not in _cache:
+            _cache[key] = index
+            _cache_bytes += size
+        while _cache_bytes > INDEX_CACHE_MAX_BYTES:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= evicted.size_bytes
+    return index
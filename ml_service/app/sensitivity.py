@@ -0,0 +1,73 @@
+"""How much each scene contributes to a script's rating.
+
+For every scene the script is re-aggregated as if that scene were cut, using
+``leave_one_out_scores`` (one sort per category instead of a full
+re-aggregation per scene), and all those variants are rated at once with
+``map_scores_to_rating_batch``. Scenes whose removal alone lowers the rating
+are reported separately, most influential first.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .repair_pipeline import (
+    RATING_ORDER,
+    leave_one_out_scores,
+    map_scores_to_rating,
+    map_scores_to_rating_batch,
+    parse_script_to_scenes,
+)
+from .scoring import SCORE_KEYS, aggregate_scores, score_matrix, score_scenes
+
+
+def scene_sensitivity(
+    script_text: str,
+    scene_scores: List[Dict[str, Any]] | None = None,
+    max_scenes: int | None = None,
+) -> Dict[str, Any]:
+    scenes = parse_script_to_scenes(script_text)
+    if scene_scores is None or len(scene_scores) != len(scenes):
+        scene_scores, _ = score_scenes(scenes)
+
+    matrix = score_matrix(scene_scores)
+    current = aggregate_scores([dict(zip(SCORE_KEYS, row)) for row in matrix.tolist()])
+    current_rating = map_scores_to_rating(current)["rating"]
+    current_rank = RATING_ORDER.index(current_rating)
+    full = np.array([current[k] for k in SCORE_KEYS])
+
+    without = leave_one_out_scores(matrix, SCORE_KEYS)
+    ratings = map_scores_to_rating_batch(
+        {k: without[:, j] for j, k in enumerate(SCORE_KEYS)}
+    )
+    deltas = without - full
+    impacts = np.clip(-deltas, 0, None).sum(axis=1)
+
+    entries = []
+    for i, scene in enumerate(scenes):
+        rating_without = str(ratings[i])
+        entries.append(
+            {
+                "scene_id": scene["scene_id"],
+                "heading": scene["heading"],
+                "rating_without": rating_without,
+                "rating_drop": current_rank - RATING_ORDER.index(rating_without),
+                "impact": round(float(impacts[i]), 3),
+                "score_deltas": {
+                    k: round(float(deltas[i, j]), 3) for j, k in enumerate(SCORE_KEYS)
+                },
+            }
+        )
+
+    entries.sort(key=lambda e: (e["rating_drop"], e["impact"]), reverse=True)
+    changing = [e["scene_id"] for e in entries if e["rating_drop"] > 0]
+    if max_scenes is not None:
+        entries = entries[:max_scenes]
+
+    return {
+        "current_rating": current_rating,
+        "current_scores": {k: round(v, 3) for k, v in current.items()},
+        "total_scenes": len(scenes),
+        "rating_changing_scenes": changing,
+        "scenes": entries,
+    }
@@ -0,0 +1,188 @@
+"""Server-side what-if sessions.
+
+An editing sitting issues dozens of what-if, suggestion and advisor calls
+against one script. A session keeps the script with its analysis (per-scene
+scores included) so those calls start from the cached result instead of
+re-parsing and re-scoring the whole script. Replacing a session's text goes
+through the scene score cache, so only edited scenes are rescored.
+
+Idle sessions expire after ``session_ttl_seconds``; past ``session_max_count``
+or ``session_max_bytes`` the least recently used ones are evicted.
+"""
+
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+from .config import settings
+from .metrics import record_cache_lookup, record_session_eviction, record_sessions
+
+# rough footprint of one scene's scores, excerpts and dict overhead
+SCENE_OVERHEAD_BYTES = 2048
+
+
+class SessionTooLarge(ValueError):
+    """The script alone would exceed the store's memory cap."""
+
+
+class SessionConflict(RuntimeError):
+    """The session was revised by another call in the meantime."""
+
+
+class ScriptSession:
+    def __init__(self, session_id: str, script_text: str, analysis: Dict[str, Any]):
+        self.session_id = session_id
+        self.script_text = script_text
+        self.analysis = analysis
+        # full pipeline result for the rating advisor, computed on first use
+        self.advisor_analysis: Dict[str, Any] | None = None
+        self.revision = 0
+        self.last_used = 0.0
+
+    @property
+    def size_bytes(self) -> int:
+        text_bytes = len(self.script_text.encode("utf-8"))
+        size = text_bytes + SCENE_OVERHEAD_BYTES * len(self.analysis["scene_scores"])
+        if self.advisor_analysis is not None:
+            scenes = self.advisor_analysis.get("scenes", [])
+            size += text_bytes + SCENE_OVERHEAD_BYTES * len(scenes)
+        return size
+
+
+class SessionStore:
+    """Sessions by id with idle expiry, LRU eviction and a memory cap."""
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_sessions: int,
+        max_bytes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._sessions: "OrderedDict[str, ScriptSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def add(self, script_text: str, analysis: Dict[str, Any]) -> ScriptSession:
+        session = ScriptSession(uuid.uuid4().hex, script_text, analysis)
+        self._check_size(session.size_bytes)
+        with self._lock:
+            session.last_used = self._clock()
+            self._sessions[session.session_id] = session
+            self._enforce_limits(session.session_id)
+        return session
+
+    def get(self, session_id: str) -> ScriptSession | None:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = self._clock()
+                self._sessions.move_to_end(session_id)
+        record_cache_lookup("sessions", session is not None)
+        return session
+
+    def snapshot(self, session: ScriptSession) -> ScriptSession:
+        """Consistent detached copy to work from while other calls revise it."""
+        with self._lock:
+            return copy.copy(session)
+
+    def update(
+        self,
+        session: ScriptSession,
+        script_text: str,
+        analysis: Dict[str, Any],
+        revision: int,
+    ):
+        """Replace the session's script, unless it moved past ``revision``."""
+        with self._lock:
+            if session.revision != revision:
+                raise SessionConflict(session.session_id)
+            text_bytes = len(script_text.encode("utf-8"))
+            self._check_size(
+                text_bytes + SCENE_OVERHEAD_BYTES * len(analysis["scene_scores"])
+            )
+            session.script_text = script_text
+            session.analysis = analysis
+            session.advisor_analysis = None
+            session.revision += 1
+            session.last_used = self._clock()
+            if session.session_id in self._sessions:
+                self._sessions.move_to_end(session.session_id)
+            self._enforce_limits(session.session_id)
+
+    def set_advisor_analysis(
+        self, session: ScriptSession, result: Dict[str, Any], revision: int
+    ):
+        with self._lock:
+            # a result for an older revision describes a script that is gone
+            if session.revision == revision:
+                session.advisor_analysis = result
+                self._enforce_limits(session.session_id)
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+            record_sessions(len(self._sessions))
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            record_sessions(0)
+
+    def expires_in(self, session: ScriptSession) -> float:
+        return max(0.0, session.last_used + self.ttl_seconds - self._clock())
+
+    def _check_size(self, size: int):
+        if size > self.max_bytes:
+            raise SessionTooLarge(
+                f"Script needs ~{size} bytes, sessions are capped at {self.max_bytes}"
+            )
+
+    def _expire(self):
+        deadline = self._clock() - self.ttl_seconds
+        # sessions are kept in last-use order, so expired ones lead
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_used > deadline:
+                break
+            self._sessions.popitem(last=False)
+            record_session_eviction("ttl")
+        record_sessions(len(self._sessions))
+
+    def _enforce_limits(self, keep: str):
+        self._expire()
+        while len(self._sessions) > max(self.max_sessions, 1):
+            self._evict_oldest(keep, "count")
+        total = sum(s.size_bytes for s in self._sessions.values())
+        while total > self.max_bytes and len(self._sessions) > 1:
+            total -= self._evict_oldest(keep, "memory")
+        record_sessions(len(self._sessions))
+
+    def _evict_oldest(self, keep: str, reason: str) -> int:
+        session_id = next(sid for sid in self._sessions if sid != keep)
+        session = self._sessions.pop(session_id)
+        record_session_eviction(reason)
+        return session.size_bytes
+
+
+_store = SessionStore(
+    settings.session_ttl_seconds,
+    settings.session_max_count,
+    settings.session_max_bytes,
+)
+
+
+def get_session_store() -> SessionStore:
+    return _store
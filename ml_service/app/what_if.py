@@ -1,16 +1,152 @@
-import re
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from typing import Dict, Any, List, Tuple, cast
-from loguru import logger
-from sentence_transformers import SentenceTransformer, util
 import numpy as np
-
+from loguru import logger
+from sentence_transformers import SentenceTransformer
+
+from .config import settings
+from .intent_parser import IntentParser
+from .rewrite_engine import compile_replacements
+from .scoring import (
+    SCORE_KEYS,
+    aggregate_score_batch,
+    aggregate_scores,
+    score_matrix,
+    score_scenes,
+)
 from .repair_pipeline import (
     parse_script_to_scenes,
-    extract_scene_features,
-    normalize_and_contextualize_scores,
     map_scores_to_rating,
+    map_scores_to_rating_batch,
 )
 
+# replacement tables of the _reduce_* rules; see rewrite_engine for key syntax
+VIOLENCE_REPLACEMENTS = {
+    "kill": "confront",
+    "shoot": "point at",
+    "stab": "threaten",
+    "murder": "argue with",
+    "attack": "approach",
+    "beating": "pushing",
+    "fight": "scuffle",
+    "автомат": "устройство",
+    "винтовка": "инструмент",
+    "пистолет": "предмет",
+    "оружие": "предмет",
+    "gun": "device",
+    "rifle": "tool",
+    "weapon": "item",
+    "убить": "противостоять",
+    "убийство": "конфликт",
+    "стрелять": "направить на",
+    "зарезать": "угрожать",
+    "атаковать": "приблизиться",
+    "избиение": "толкание",
+    "драка": "потасовка",
+    "бьет": "толкает",
+    "ударил": "подтолкнул",
+    "ломает": "скручивает",
+    "broke": "twisted",
+    "smashed": "pushed",
+    "crushed": "squeezed",
+}
+
+# "verbal" violence replacements turn fights into arguments
+VERBAL_VIOLENCE_REPLACEMENTS = {
+    **VIOLENCE_REPLACEMENTS,
+    "fight": "argue",
+    "драка": "спор",
+}
+
+PROFANITY_REPLACEMENTS = {
+    r"\bfuck\w*\b": "darn",
+    r"\bshit\b": "crap",
+    r"\bmotherfucker\b": "jerk",
+    r"\bbitch\b": "witch",
+    r"\basshole\b": "idiot",
+    r"\bблядь\b": "черт",
+    r"\bбля\b": "блин",
+    r"\bсука\b": "зараза",
+    r"\bхуй\w*\b": "черт",
+    r"\bпизд\w*\b": "черт",
+    r"\bебать\b": "черт",
+    r"\bебал\w*\b": "черт",
+    r"\bдерьм\w*\b": "ерунда",
+    r"\bговн\w*\b": "ерунда",
+}
+
+GORE_REPLACEMENTS = {
+    "blood": "mark",
+    "bloody": "marked",
+    "bleeding": "injured",
+    "wound": "injury",
+    "guts": "injury",
+    "dismember": "injured",
+    "gore": "impact",
+    "mutilate": "harm",
+    "кровь": "след",
+    "кровавый": "помеченный",
+    "кровоточ": "ранен",
+    "рана": "повреждение",
+    "кишки": "повреждение",
+    "увечь": "поврежд",
+    "изуродован": "поврежден",
+    "расчленен": "поврежден",
+    "брызга": "полет",
+    "текла": "появилась",
+    "пролилась": "образовалась",
+}
+
+SEXUAL_REPLACEMENTS = {
+    r"\brape\b": "assault",
+    r"\bsex scene\b": "romantic scene",
+    r"\bnaked\b": "undressed",
+    r"\bnude\b": "unclothed",
+    r"\bизнасилов\w*\b": "напад",
+    r"\bсексуальн\w*\b": "романтическ",
+    r"\bголый\b": "раздетый",
+    r"\bголая\b": "раздетая",
+}
+
+DRUG_REPLACEMENTS = {
+    r"\bheroin\b": "substance",
+    r"\bcocaine\b": "substance",
+    r"\bmarijuana\b": "substance",
+    r"\bгероин\b": "вещество",
+    r"\bкокаин\b": "вещество",
+    r"\bмарихуан\w*\b": "вещество",
+}
+
+_VIOLENCE_TABLES = {
+    "mild": compile_replacements(VIOLENCE_REPLACEMENTS),
+    "verbal": compile_replacements(VERBAL_VIOLENCE_REPLACEMENTS),
+}
+_PROFANITY_TABLE = compile_replacements(PROFANITY_REPLACEMENTS)
+_GORE_TABLE = compile_replacements(GORE_REPLACEMENTS)
+_SEXUAL_TABLE = compile_replacements(SEXUAL_REPLACEMENTS)
+_DRUG_TABLE = compile_replacements(DRUG_REPLACEMENTS)
+
+# default rewrite per content type, in the order apply_modifications runs them
+REDUCTION_TABLES = {
+    "violence": _VIOLENCE_TABLES["mild"],
+    "profanity": _PROFANITY_TABLE,
+    "gore": _GORE_TABLE,
+    "sexual": _SEXUAL_TABLE,
+    "drugs": _DRUG_TABLE,
+}
+
+# rewrite a follow-up what-if applies for a suggestion of each category
+SUGGESTION_REDUCTIONS = {
+    "violence": "violence",
+    "gore": "gore",
+    "profanity": "profanity",
+    "sex_act": "sexual",
+    "nudity": "sexual",
+    "drugs": "drugs",
+}
+
 
 class WhatIfAnalyzer:
     def __init__(self):
@@ -87,10 +223,20 @@ class WhatIfAnalyzer:
                 "мультяшный стиль боевых сцен",
             ],
         }
+        self.intent_parser = IntentParser(
+            self.modification_patterns, self.context_examples, self.embedder
+        )
 
     def analyze_modification_request(self, request: str) -> Dict[str, Any]:
         """Parse user's what-if request and extract modification intent."""
-        request_lower = request.lower()
+        modifications: Dict[str, Any] = self.explain_modification_request(request)[
+            "modifications"
+        ]
+        return modifications
+
+    def explain_modification_request(self, request: str) -> Dict[str, Any]:
+        """Parsed modifications together with the matches and similarities
+        that decided them."""
         modifications = {
             "remove_scenes": [],
             "reduce_violence": False,
@@ -101,56 +247,40 @@ class WhatIfAnalyzer:
             "violence_replacement": None,
         }
 
-        for pattern_type, patterns in self.modification_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, request_lower, re.I | re.U)
-                if match:
-                    if pattern_type == "remove_scenes":
-                        start_scene = int(match.group(1))
-                        end_scene = (
-                            int(match.group(2)) if match.group(2) else start_scene
-                        )
-                        scene_list = cast(List[int], modifications["remove_scenes"])
-                        scene_list.extend(range(start_scene, end_scene + 1))
-                    elif pattern_type == "reduce_violence":
-                        modifications["reduce_violence"] = True
-                        if match.lastindex and match.lastindex >= 2:
-                            replacement = match.group(match.lastindex).strip()
-                            if replacement:
-                                modifications["violence_replacement"] = replacement
-                    elif pattern_type == "reduce_profanity":
-                        modifications["reduce_profanity"] = True
-                    elif pattern_type == "reduce_gore":
-                        modifications["reduce_gore"] = True
-                    elif pattern_type == "reduce_sexual":
-                        modifications["reduce_sexual"] = True
-                    elif pattern_type == "reduce_drugs":
-                        modifications["reduce_drugs"] = True
+        matches = self.intent_parser.matches(request.lower())
+        for match in matches:
+            intent, groups = match["intent"], match["groups"]
+            if intent == "remove_scenes":
+                start_scene = int(groups[0])
+                end_scene = int(groups[1]) if groups[1] else start_scene
+                scene_list = cast(List[int], modifications["remove_scenes"])
+                scene_list.extend(range(start_scene, end_scene + 1))
+            elif intent == "reduce_violence":
+                modifications["reduce_violence"] = True
+                last_group = match["last_group"]
+                if last_group and last_group >= 2:
+                    replacement = groups[last_group - 1].strip()
+                    if replacement:
+                        modifications["violence_replacement"] = replacement
+            else:
+                modifications[intent] = True
 
+        similarities: Dict[str, float] = {}
         replacement = modifications["violence_replacement"]
         if replacement and isinstance(replacement, str):
-            verbal_sim = self._get_max_similarity(
-                replacement, self.context_examples["replace_violence_verbal"]
-            )
-            mild_sim = self._get_max_similarity(
-                replacement, self.context_examples["replace_violence_mild"]
-            )
-
-            if verbal_sim > 0.5:
+            similarities = self.intent_parser.similarities(replacement)
+            if similarities["replace_violence_verbal"] > 0.5:
                 modifications["violence_replacement_type"] = "verbal"
-            elif mild_sim > 0.5:
+            elif similarities["replace_violence_mild"] > 0.5:
                 modifications["violence_replacement_type"] = "mild"
             else:
                 modifications["violence_replacement_type"] = "mild"
 
-        return modifications
-
-    def _get_max_similarity(self, text: str, examples: List[str]) -> float:
-        """Calculate maximum semantic similarity between text and examples."""
-        text_emb = self.embedder.encode([text], convert_to_numpy=True)[0]
-        example_embs = self.embedder.encode(examples, convert_to_numpy=True)
-        similarities = util.cos_sim(text_emb, example_embs)[0]
-        return float(similarities.max())
+        return {
+            "modifications": modifications,
+            "matches": matches,
+            "similarities": similarities,
+        }
 
     def apply_modifications(
         self, original_text: str, modifications: Dict[str, Any]
@@ -218,157 +348,62 @@ class WhatIfAnalyzer:
         self, text: str, replacement_type: str = "mild"
     ) -> Tuple[str, bool]:
         """Reduce violence in text by replacing violent words with milder alternatives."""
-        modified = False
-
-        violence_replacements = {
-            "kill": "confront",
-            "shoot": "point at",
-            "stab": "threaten",
-            "murder": "argue with",
-            "attack": "approach",
-            "beating": "pushing",
-            "fight": "argue" if replacement_type == "verbal" else "scuffle",
-            "автомат": "устройство",
-            "винтовка": "инструмент",
-            "пистолет": "предмет",
-            "оружие": "предмет",
-            "gun": "device",
-            "rifle": "tool",
-            "weapon": "item",
-            "убить": "противостоять",
-            "убийство": "конфликт",
-            "стрелять": "направить на",
-            "зарезать": "угрожать",
-            "атаковать": "приблизиться",
-            "избиение": "толкание",
-            "драка": "спор" if replacement_type == "verbal" else "потасовка",
-            "бьет": "толкает",
-            "ударил": "подтолкнул",
-            "ломает": "скручивает",
-            "broke": "twisted",
-            "smashed": "pushed",
-            "crushed": "squeezed",
-        }
-
-        for violent_word, replacement in violence_replacements.items():
-            pattern = r"\b" + re.escape(violent_word) + r"\w*"
-            if re.search(pattern, text, re.I):
-                text = re.sub(pattern, replacement, text, flags=re.I)
-                modified = True
-
-        return text, modified
+        table = _VIOLENCE_TABLES.get(replacement_type, _VIOLENCE_TABLES["mild"])
+        text, count = table.subn(text)
+        return text, count > 0
 
     def _reduce_profanity_in_text(self, text: str) -> Tuple[str, bool]:
         """Remove profanity from text."""
-        modified = False
-
-        profanity_patterns = [
-            (r"\bfuck\w*\b", "darn", re.I),
-            (r"\bshit\b", "crap", re.I),
-            (r"\bmotherfucker\b", "jerk", re.I),
-            (r"\bbitch\b", "witch", re.I),
-            (r"\basshole\b", "idiot", re.I),
-            (r"\bблядь\b", "черт", re.I),
-            (r"\bбля\b", "блин", re.I),
-            (r"\bсука\b", "зараза", re.I),
-            (r"\bхуй\w*\b", "черт", re.I),
-            (r"\bпизд\w*\b", "черт", re.I),
-            (r"\bебать\b", "черт", re.I),
-            (r"\bебал\w*\b", "черт", re.I),
-            (r"\bдерьм\w*\b", "ерунда", re.I),
-            (r"\bговн\w*\b", "ерунда", re.I),
-        ]
-
-        for pattern, replacement, flags in profanity_patterns:
-            if re.search(pattern, text, flags):
-                text = re.sub(pattern, replacement, text, flags=flags)
-                modified = True
-
-        return text, modified
+        text, count = _PROFANITY_TABLE.subn(text)
+        return text, count > 0
 
     def _reduce_gore_in_text(self, text: str) -> Tuple[str, bool]:
         """Reduce gore descriptions in text."""
-        modified = False
-
-        gore_replacements = {
-            "blood": "mark",
-            "bloody": "marked",
-            "bleeding": "injured",
-            "wound": "injury",
-            "guts": "injury",
-            "dismember": "injured",
-            "gore": "impact",
-            "mutilate": "harm",
-            "кровь": "след",
-            "кровавый": "помеченный",
-            "кровоточ": "ранен",
-            "рана": "повреждение",
-            "кишки": "повреждение",
-            "увечь": "поврежд",
-            "изуродован": "поврежден",
-            "расчленен": "поврежден",
-            "брызга": "полет",
-            "текла": "появилась",
-            "пролилась": "образовалась",
-        }
-
-        for gore_word, replacement in gore_replacements.items():
-            pattern = r"\b" + re.escape(gore_word) + r"\w*"
-            if re.search(pattern, text, re.I):
-                text = re.sub(pattern, replacement, text, flags=re.I)
-                modified = True
-
-        return text, modified
+        text, count = _GORE_TABLE.subn(text)
+        return text, count > 0
 
     def _reduce_sexual_in_text(self, text: str) -> Tuple[str, bool]:
         """Reduce sexual content in text."""
-        modified = False
-
-        sexual_patterns = [
-            (r"\brape\b", "assault", re.I),
-            (r"\bsex scene\b", "romantic scene", re.I),
-            (r"\bnaked\b", "undressed", re.I),
-            (r"\bnude\b", "unclothed", re.I),
-            (r"\bизнасилов\w*\b", "напад", re.I),
-            (r"\bсексуальн\w*\b", "романтическ", re.I),
-            (r"\bголый\b", "раздетый", re.I),
-            (r"\bголая\b", "раздетая", re.I),
-        ]
-
-        for pattern, replacement, flags in sexual_patterns:
-            if re.search(pattern, text, flags):
-                text = re.sub(pattern, replacement, text, flags=flags)
-                modified = True
-
-        return text, modified
+        text, count = _SEXUAL_TABLE.subn(text)
+        return text, count > 0
 
     def _reduce_drugs_in_text(self, text: str) -> Tuple[str, bool]:
         """Reduce drug references in text."""
-        modified = False
-
-        drug_patterns = [
-            (r"\bheroin\b", "substance", re.I),
-            (r"\bcocaine\b", "substance", re.I),
-            (r"\bmarijuana\b", "substance", re.I),
-            (r"\bгероин\b", "вещество", re.I),
-            (r"\bкокаин\b", "вещество", re.I),
-            (r"\bмарихуан\w*\b", "вещество", re.I),
-        ]
-
-        for pattern, replacement, flags in drug_patterns:
-            if re.search(pattern, text, flags):
-                text = re.sub(pattern, replacement, text, flags=flags)
-                modified = True
+        text, count = _DRUG_TABLE.subn(text)
+        return text, count > 0
 
-        return text, modified
-
-    def simulate_what_if(self, original_text: str, user_request: str) -> Dict[str, Any]:
+    def simulate_what_if(
+        self,
+        original_text: str,
+        user_request: str,
+        original_result: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
         """Simulate what-if scenario and return rating comparison."""
+        comparison, _, _ = self.simulate_modification(
+            original_text, user_request, original_result
+        )
+        return comparison
+
+    def simulate_modification(
+        self,
+        original_text: str,
+        user_request: str,
+        original_result: Dict[str, Any] | None = None,
+        modifications: Dict[str, Any] | None = None,
+    ) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+        """Rating comparison plus the modified text and its analysis.
+
+        ``original_result`` is a prior ``_analyze_script`` result for
+        ``original_text`` (e.g. held by a session) and skips re-analysing it;
+        ``modifications`` the already parsed ``user_request``.
+        """
         logger.info(f"Processing what-if request: {user_request}")
 
-        original_result = self._analyze_script(original_text)
+        if original_result is None:
+            original_result = self._analyze_script(original_text)
 
-        modifications = self.analyze_modification_request(user_request)
+        if modifications is None:
+            modifications = self.analyze_modification_request(user_request)
         modified_text, changes = self.apply_modifications(original_text, modifications)
 
         modified_result = self._analyze_script(modified_text)
@@ -377,7 +412,7 @@ class WhatIfAnalyzer:
             original_result, modified_result, changes, modifications
         )
 
-        return {
+        comparison = {
             "original_rating": original_result["rating"],
             "modified_rating": modified_result["rating"],
             "original_scores": original_result["scores"],
@@ -386,41 +421,130 @@ class WhatIfAnalyzer:
             "explanation": explanation,
             "rating_changed": original_result["rating"] != modified_result["rating"],
         }
+        return comparison, modified_text, modified_result
+
+    def simulate_what_if_batch(
+        self,
+        original_text: str,
+        user_requests: List[str],
+        original_result: Dict[str, Any] | None = None,
+    ) -> Dict[str, Any]:
+        """Evaluate several what-if requests against one script.
+
+        The original is analysed once and shared by every variant; requests
+        that parse to the same modifications are simulated once. Variants run
+        concurrently, and each only rescores the scenes its edits changed.
+        """
+        logger.info(f"Processing {len(user_requests)} what-if requests in batch")
+
+        if original_result is None:
+            original_result = self._analyze_script(original_text)
+
+        # requests worded differently often mean the same edit
+        parsed = [self.analyze_modification_request(r) for r in user_requests]
+        groups: Dict[str, List[int]] = {}
+        for i, modifications in enumerate(parsed):
+            key = json.dumps(modifications, sort_keys=True)
+            groups.setdefault(key, []).append(i)
+        unique = [indices[0] for indices in groups.values()]
+
+        def run(i: int) -> Dict[str, Any]:
+            comparison, _, _ = self.simulate_modification(
+                original_text, user_requests[i], original_result, parsed[i]
+            )
+            return comparison
+
+        workers = max(1, min(settings.what_if_batch_workers, len(unique)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # each task gets its own copy so checkpoint() sees the caller's token
+            futures = {i: pool.submit(copy_context().run, run, i) for i in unique}
+            results = {i: future.result() for i, future in futures.items()}
+
+        variants: List[Dict[str, Any] | None] = [None] * len(user_requests)
+        for indices in groups.values():
+            result = results[indices[0]]
+            for i in indices:
+                variants[i] = {
+                    "modification_request": user_requests[i],
+                    "modified_rating": result["modified_rating"],
+                    "modified_scores": result["modified_scores"],
+                    "score_deltas": {
+                        k: round(v - result["original_scores"].get(k, 0.0), 3)
+                        for k, v in result["modified_scores"].items()
+                    },
+                    "rating_changed": result["rating_changed"],
+                    "changes_applied": result["changes_applied"],
+                    "explanation": result["explanation"],
+                }
+
+        return {
+            "original_rating": original_result["rating"],
+            "original_scores": original_result["scores"],
+            "variants": variants,
+        }
+
+    def _preview_suggestions(
+        self,
+        scenes: List[Dict[str, Any]],
+        scene_scores: List[Dict[str, Any]],
+        suggestions: List[Dict[str, Any]],
+    ) -> None:
+        """Add the rating each suggestion would lead to, without a what-if run.
+
+        Every scene is rewritten with the suggestion's reduction table and
+        only the scenes that changed are rescored (through the scene cache).
+        Reductions run concurrently; the resulting score matrices are then
+        aggregated and rated together in one batch.
+        """
+        if not suggestions:
+            return
+        contents = sorted({SUGGESTION_REDUCTIONS[s["category"]] for s in suggestions})
+        base = score_matrix(scene_scores)
+
+        def reduce(content: str) -> np.ndarray:
+            table = REDUCTION_TABLES[content]
+            changed = []
+            for i, scene in enumerate(scenes):
+                text = table.sub(scene["text"])
+                if text != scene["text"]:
+                    changed.append((i, {"text": text}))
+            matrix = base.copy()
+            if changed:
+                rescored, _ = score_scenes([scene for _, scene in changed])
+                matrix[[i for i, _ in changed]] = score_matrix(rescored)
+            return matrix
+
+        workers = max(1, min(settings.what_if_batch_workers, len(contents)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(copy_context().run, reduce, c) for c in contents]
+            matrices = [base] + [future.result() for future in futures]
+
+        agg = aggregate_score_batch(np.stack(matrices))
+        ratings = map_scores_to_rating_batch(
+            {k: agg[:, j] for j, k in enumerate(SCORE_KEYS)}
+        )
+        for suggestion in suggestions:
+            row = contents.index(SUGGESTION_REDUCTIONS[suggestion["category"]]) + 1
+            suggestion["predicted_rating"] = str(ratings[row])
+            suggestion["score_deltas"] = {
+                k: round(float(agg[row, j] - agg[0, j]), 3)
+                for j, k in enumerate(SCORE_KEYS)
+            }
 
     def _analyze_script(self, text: str) -> Dict[str, Any]:
-        """Analyze script and return rating with scores."""
+        """Analyze script and return rating with scores.
+
+        Scene scores come from the shared per-scene cache, so analysing a
+        modified version only rescores the scenes whose text changed.
+        """
         scenes = parse_script_to_scenes(text)
+        scores, rescored = score_scenes(scenes)
+        logger.debug(f"Rescored {rescored} of {len(scenes)} scenes")
+        return self._rate_scene_scores(scores)
 
-        features = []
-        for scene in scenes:
-            feat = extract_scene_features(scene["text"])
-            features.append(feat)
-
-        scores = [normalize_and_contextualize_scores(f) for f in features]
-
-        score_keys = [
-            "violence",
-            "gore",
-            "sex_act",
-            "nudity",
-            "profanity",
-            "drugs",
-            "child_risk",
-        ]
-        agg = {}
-
-        for k in score_keys:
-            values = [s[k] for s in scores]
-            max_val = float(np.max(values))
-            p95_val = float(np.percentile(values, 95))
-            p90_val = float(np.percentile(values, 90))
-
-            if k in ["violence", "gore"]:
-                agg[k] = max_val * 0.7 + p95_val * 0.3
-            elif k in ["sex_act", "nudity", "child_risk"]:
-                agg[k] = max_val * 0.85 + p90_val * 0.15
-            else:
-                agg[k] = float(np.percentile(values, 90))
+    def _rate_scene_scores(self, scores: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Rating and script scores from a per-scene score matrix."""
+        agg: Dict[str, Any] = dict(aggregate_scores(scores))
 
         all_excerpts: Dict[str, List[Any]] = {
             "violence": [],
@@ -431,8 +555,10 @@ class WhatIfAnalyzer:
             "drugs": [],
         }
         for s in scores:
+            # caller-supplied scene scores may come without excerpts
+            scene_excerpts = s.get("excerpts", {})
             for key in all_excerpts.keys():
-                all_excerpts[key].extend(s["excerpts"][key])
+                all_excerpts[key].extend(scene_excerpts.get(key, []))
 
         limited_excerpts = {k: v[:5] for k, v in all_excerpts.items()}
         agg["excerpts"] = cast(Any, limited_excerpts)
@@ -442,8 +568,9 @@ class WhatIfAnalyzer:
         return {
             "rating": rating_info["rating"],
             "reasons": rating_info["reasons"],
-            "scores": {k: round(agg[k], 3) for k in score_keys},
-            "total_scenes": len(scenes),
+            "scores": {k: round(agg[k], 3) for k in SCORE_KEYS},
+            "total_scenes": len(scores),
+            "scene_scores": scores,
         }
 
     def _generate_explanation(
@@ -505,25 +632,42 @@ class WhatIfAnalyzer:
         current_scores: Dict[str, float] | None = None,
         language: str = "ru",
         max_suggestions: int = 8,
+        current_rating: str | None = None,
+        analysis: Dict[str, Any] | None = None,
+        scene_scores: List[Dict[str, Any]] | None = None,
     ) -> Dict[str, Any]:
-        """Generate smart, personalized suggestions based on script analysis."""
-        logger.info("Generating smart suggestions for script")
+        """Generate smart, personalized suggestions based on script analysis.
 
-        # Analyze script if scores not provided
-        if current_scores is None:
-            analysis = self._analyze_script(script_text)
-            current_scores = analysis["scores"]
-            current_rating = analysis["rating"]
-            total_scenes = analysis["total_scenes"]
-        else:
-            # Quick analysis for rating
-            analysis = self._analyze_script(script_text)
-            current_rating = analysis["rating"]
-            total_scenes = analysis["total_scenes"]
+        Everything is derived from one scenes x categories score matrix.
+        ``analysis`` is a prior ``_analyze_script`` result for ``script_text``
+        and ``scene_scores`` the caller's per-scene scores in scene order;
+        whatever is not supplied is computed once (cached scenes are reused).
+        """
+        logger.info("Generating smart suggestions for script")
 
         # Parse scenes for detailed analysis
         scenes = parse_script_to_scenes(script_text)
 
+        if scene_scores is not None and len(scene_scores) != len(scenes):
+            logger.warning(
+                f"Ignoring {len(scene_scores)} scene scores for {len(scenes)} scenes"
+            )
+            scene_scores = None
+        if current_scores is None or current_rating is None:
+            if analysis is None:
+                if scene_scores is None:
+                    analysis = self._analyze_script(script_text)
+                else:
+                    analysis = self._rate_scene_scores(scene_scores)
+            current_scores = current_scores or analysis["scores"]
+            current_rating = current_rating or analysis["rating"]
+        if scene_scores is None:
+            if analysis is not None:
+                scene_scores = analysis["scene_scores"]
+            else:
+                scene_scores, _ = score_scenes(scenes)
+        total_scenes = len(scenes)
+
         suggestions = []
 
         # Define thresholds and icons
@@ -551,19 +695,22 @@ class WhatIfAnalyzer:
             "drugs": {"threshold": 0.2, "icon": "💊", "ru": "наркотики", "en": "drugs"},
         }
 
+        # Scenes scoring above 0.5 in a category are the ones to point at
+        categories = list(category_config)
+        matrix = np.array(
+            [[s.get(c, 0.0) for c in categories] for s in scene_scores], dtype=float
+        ).reshape(len(scene_scores), len(categories))
+        scene_ids = np.array([scene["scene_id"] for scene in scenes], dtype=int)
+        flagged = matrix > 0.5
+
         # Analyze each category
-        for category, config in category_config.items():
+        for column, (category, config) in enumerate(category_config.items()):
             score = current_scores.get(category, 0)
             threshold = cast(float, config["threshold"])
 
             if score > threshold:
                 # Find problematic scenes
-                affected_scenes = []
-                for scene in scenes:
-                    features = extract_scene_features(scene["text"])
-                    normalized = normalize_and_contextualize_scores(features)
-                    if normalized.get(category, 0) > 0.5:
-                        affected_scenes.append(scene["scene_id"])
+                affected_scenes = scene_ids[flagged[:, column]].tolist()
 
                 # Calculate priority (higher score = higher priority)
                 priority = min(10, int(score * 10) + 2)
@@ -626,6 +773,7 @@ class WhatIfAnalyzer:
 
         # Limit to max_suggestions
         suggestions = suggestions[:max_suggestions]
+        self._preview_suggestions(scenes, scene_scores, suggestions)
 
         # Generate summary
         if language == "ru":
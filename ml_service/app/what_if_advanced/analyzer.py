@@ -1,12 +1,13 @@
 from typing import Dict, Any, List, Optional
 import numpy as np
 from loguru import logger
-from sentence_transformers import SentenceTransformer
 
+from ..scoring import SCORE_KEYS, aggregate_scores, score_scenes
+from ..script_index import LineRange, get_script_index, scene_line_ranges
 from ..repair_pipeline import (
+    embed_scenes,
+    embedder as scene_embedder,
     parse_script_to_scenes,
-    extract_scene_features,
-    normalize_and_contextualize_scores,
     map_scores_to_rating,
 )
 from .analyzers import EntityExtractor, SceneClassifier
@@ -18,11 +19,15 @@ from .strategies import (
     CharacterFocusedStrategy,
     LLMRewriteStrategy,
 )
+from .patch import build_scene_patches, unified_diff
+from .plan import ExecutionPlan, PlanResult
+from .utils import extract_character_names
 from .schemas import (
     StructuredWhatIfRequest,
     AdvancedWhatIfResponse,
     EntityInfo,
     SceneInfo,
+    ScenePatch,
 )
 
 
@@ -40,7 +45,8 @@ class AdvancedWhatIfAnalyzer:
     ):
         logger.info("Initializing Advanced What-If Analyzer")
 
-        self.embedder = SentenceTransformer("all-MiniLM-L6-v2")
+        # the rating pass's model: scene embeddings are shared with the classifier
+        self.embedder = scene_embedder
 
         self.entity_extractor = EntityExtractor()
         self.scene_classifier = SceneClassifier(self.embedder)
@@ -83,57 +89,50 @@ class AdvancedWhatIfAnalyzer:
             f"Processing structured what-if with {len(request.modifications)} modifications"
         )
 
-        original_result = self._analyze_script(request.script_text)
-
         scenes = parse_script_to_scenes(request.script_text)
+        texts = [scene["text"] for scene in scenes]
+        # one batch of scene embeddings serves both the rating and the
+        # classifier, and one index of the script serves every scene
+        embeddings = embed_scenes(texts)
+        line_ranges = scene_line_ranges(get_script_index(request.script_text), texts)
+        original_result = self._analyze_scenes(scenes, embeddings, line_ranges)
+
+        for scene, lines in zip(scenes, line_ranges):
+            scene["characters"] = (
+                lines.script.characters(lines.first, lines.stop)
+                if lines is not None
+                else extract_character_names(scene["text"])
+            )
 
         entities = self.entity_extractor.extract_entities(scenes)
 
-        classified_scenes = self.scene_classifier.classify_scenes(scenes)
-
-        modified_scenes = classified_scenes.copy()
-        modifications_applied = []
-
-        registry = get_strategy_registry()
-
-        for mod_config in request.modifications:
-            try:
-                strategy = registry.get_strategy(mod_config.type)
-
-                if not strategy.validate_params(mod_config.params):
-                    logger.warning(f"Invalid params for {mod_config.type}, skipping")
-                    continue
-
-                modified_scenes, metadata = strategy.apply(
-                    modified_scenes,
-                    mod_config.params,
-                    entities,
-                )
-
-                modifications_applied.append(
-                    {
-                        "type": mod_config.type,
-                        "metadata": metadata,
-                    }
-                )
-
-                logger.info(f"Applied {mod_config.type}: {metadata}")
+        classified_scenes = self.scene_classifier.classify_scenes(scenes, embeddings)
 
-            except Exception as e:
-                logger.error(f"Failed to apply {mod_config.type}: {e}")
-                modifications_applied.append(
-                    {
-                        "type": mod_config.type,
-                        "error": str(e),
-                    }
-                )
+        plan = ExecutionPlan(request.modifications, get_strategy_registry(), entities)
+        applied = plan.run(classified_scenes)
+        modified_scenes = applied.scenes
+        modifications_applied = applied.applied
+        changed = applied.changed_positions()
+        logger.debug(
+            f"{len(changed)} scene(s) changed, "
+            f"{len(applied.removed_origins())} removed"
+        )
 
-        if request.preserve_structure:
-            modified_text = self._reconstruct_script(modified_scenes)
-        else:
-            modified_text = "\n\n".join([s["text"] for s in modified_scenes])
+        # the client has the original script; the changes are enough
+        patches = build_scene_patches(request.script_text, applied)
+        unified = None
+        if request.diff_format == "unified":
+            unified = unified_diff(request.script_text, patches)
+            patches = []
+
+        modified_text = None
+        if request.include_modified_script:
+            if request.preserve_structure:
+                modified_text = self._reconstruct_script(modified_scenes)
+            else:
+                modified_text = "\n\n".join([s["text"] for s in modified_scenes])
 
-        modified_result = self._analyze_script(modified_text)
+        modified_result = self._rescore(original_result, applied)
 
         explanation = self._generate_explanation(
             original_result, modified_result, modifications_applied
@@ -152,51 +151,58 @@ class AdvancedWhatIfAnalyzer:
             scene_analysis=scene_infos,
             explanation=explanation,
             modified_script=modified_text,
+            changed_scene_ids=[modified_scenes[i].get("scene_id", i) for i in changed],
+            scene_patches=[ScenePatch(**patch) for patch in patches],
+            unified_diff=unified,
             rating_changed=original_result["rating"] != modified_result["rating"],
         )
 
     def _analyze_script(self, text: str) -> Dict[str, Any]:
-        """Analyze script and return rating with scores."""
-        scenes = parse_script_to_scenes(text)
-
-        features = []
-        for scene in scenes:
-            feat = extract_scene_features(scene["text"])
-            features.append(feat)
-
-        scores = [normalize_and_contextualize_scores(f) for f in features]
-
-        score_keys = [
-            "violence",
-            "gore",
-            "sex_act",
-            "nudity",
-            "profanity",
-            "drugs",
-            "child_risk",
+        """Analyze script and return rating with scores.
+
+        Unchanged scenes reuse their cached scores, so the modified script only
+        costs feature extraction for the scenes a modification touched.
+        """
+        return self._analyze_scenes(parse_script_to_scenes(text))
+
+    def _analyze_scenes(
+        self,
+        scenes: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None,
+        lines: Optional[List[Optional[LineRange]]] = None,
+    ) -> Dict[str, Any]:
+        scores, rescored = score_scenes(scenes, embeddings, lines)
+        logger.debug(f"Rescored {rescored} of {len(scenes)} scenes")
+        return self._rate_scene_scores(scores)
+
+    def _rescore(self, original: Dict[str, Any], applied: PlanResult) -> Dict[str, Any]:
+        """Rating of the plan's scenes; only scenes it changed are scored."""
+        changed = set(applied.changed)
+        pending = [
+            i
+            for i, origin in enumerate(applied.origins)
+            if i in changed or origin is None
         ]
-        agg = {}
-
-        for k in score_keys:
-            values = [s[k] for s in scores]
-            max_val = float(np.max(values))
-            p95_val = float(np.percentile(values, 95))
-            p90_val = float(np.percentile(values, 90))
-
-            if k in ["violence", "gore"]:
-                agg[k] = max_val * 0.7 + p95_val * 0.3
-            elif k in ["sex_act", "nudity", "child_risk"]:
-                agg[k] = max_val * 0.85 + p90_val * 0.15
-            else:
-                agg[k] = float(np.percentile(values, 90))
+        fresh, _ = score_scenes([applied.scenes[i] for i in pending])
+        rescored = dict(zip(pending, fresh))
+        scores = [
+            rescored[i] if i in rescored else original["scene_scores"][origin]
+            for i, origin in enumerate(applied.origins)
+        ]
+        logger.debug(f"Rescored {len(pending)} of {len(scores)} scenes")
+        return self._rate_scene_scores(scores)
+
+    def _rate_scene_scores(self, scores: List[Dict[str, Any]]) -> Dict[str, Any]:
+        agg = aggregate_scores(scores)
 
         rating_info = map_scores_to_rating(agg)
 
         return {
             "rating": rating_info["rating"],
             "reasons": rating_info["reasons"],
-            "scores": {k: round(agg[k], 3) for k in score_keys},
-            "total_scenes": len(scenes),
+            "scores": {k: round(agg[k], 3) for k in SCORE_KEYS},
+            "total_scenes": len(scores),
+            "scene_scores": scores,
         }
 
     def _reconstruct_script(self, scenes: List[Dict[str, Any]]) -> str:
@@ -3,6 +3,10 @@ from typing import Dict, List, Any, DefaultDict, Set, TypedDict, cast
 from collections import defaultdict
 from loguru import logger
 
+from ...cancellation import checkpoint
+from ...config import settings
+from ...scoring import SceneScoreCache
+
 try:
     import spacy
 
@@ -17,16 +21,50 @@ class EntityData(TypedDict):
     scenes: Set[int]
 
 
+# spaCy labels we keep, by the entity group they count towards
+ENTITY_GROUPS = {
+    "PERSON": "characters",
+    "GPE": "locations",
+    "LOC": "locations",
+    "FAC": "locations",
+    "PRODUCT": "objects",
+    "ORG": "objects",
+}
+
+_scene_entity_cache = SceneScoreCache(settings.entity_cache_size, "scene_entities")
+
+
+def get_scene_entity_cache() -> SceneScoreCache:
+    return _scene_entity_cache
+
+
+def _unused_components(nlp: Any) -> List[str]:
+    """Pipeline components NER does not need: all but it and its tok2vec."""
+    needed = {"ner"}
+    for name, component in nlp.pipeline:
+        if "ner" in getattr(component, "listening_components", ()):
+            needed.add(name)
+    return [name for name in nlp.pipe_names if name not in needed]
+
+
 class EntityExtractor:
     """Extract entities (characters, locations, objects) from script scenes."""
 
     def __init__(self):
-        self.nlp = None
+        # a spaCy Language once loaded
+        self.nlp: Any = None
+        self.batch_size = settings.entity_batch_size
+        self.n_process = settings.entity_n_process
+        self.max_scene_chars = settings.entity_max_scene_chars
         if SPACY_AVAILABLE:
             try:
                 self.nlp = spacy.load("en_core_web_sm")
             except OSError:
                 logger.warning("spaCy model not found, using fallback")
+            else:
+                # only doc.ents is read; tagger, parser and the rest are dead weight
+                for name in _unused_components(self.nlp):
+                    self.nlp.disable_pipe(name)
 
     def extract_entities(self, scenes: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
         """Extract entities from all scenes."""
@@ -43,20 +81,14 @@ class EntityExtractor:
             "objects": defaultdict(lambda: {"mentions": 0, "scenes": set()}),
         }
 
-        for scene in scenes:
-            doc = self.nlp(scene["text"])
+        scene_entities = self._scene_entities([scene["text"] for scene in scenes])
+        for scene, found in zip(scenes, scene_entities):
             scene_id = scene.get("scene_id", 0)
 
-            for ent in doc.ents:
-                if ent.label_ == "PERSON":
-                    entities["characters"][ent.text]["mentions"] += 1
-                    entities["characters"][ent.text]["scenes"].add(scene_id)
-                elif ent.label_ in ["GPE", "LOC", "FAC"]:
-                    entities["locations"][ent.text]["mentions"] += 1
-                    entities["locations"][ent.text]["scenes"].add(scene_id)
-                elif ent.label_ in ["PRODUCT", "ORG"]:
-                    entities["objects"][ent.text]["mentions"] += 1
-                    entities["objects"][ent.text]["scenes"].add(scene_id)
+            for entity_type, names in found.items():
+                for name in names:
+                    entities[entity_type][name]["mentions"] += 1
+                    entities[entity_type][name]["scenes"].add(scene_id)
 
         result = {}
         for entity_type, entity_dict in entities.items():
@@ -75,6 +107,54 @@ class EntityExtractor:
 
         return result
 
+    def _scene_entities(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Entity names of each scene by group, in order of appearance.
+
+        Scenes are looked up by content hash first; the rest go through
+        ``nlp.pipe`` in batches, each distinct text once, cut to
+        ``max_scene_chars`` so one runaway scene cannot stall the request.
+        """
+        cache = get_scene_entity_cache()
+        found: Dict[int, Dict[str, Any]] = {}
+        # uncached text -> positions in ``texts`` it appears at
+        pending: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if text in pending:
+                pending[text].append(i)
+                continue
+            cached = cache.get(text)
+            if cached is None:
+                pending[text] = [i]
+            else:
+                found[i] = cached
+
+        if pending:
+            # worker processes only pay off with at least a batch for each
+            n_process = self.n_process
+            if len(pending) < self.batch_size * n_process:
+                n_process = 1
+            docs = self.nlp.pipe(
+                (text[: self.max_scene_chars] for text in pending),
+                batch_size=self.batch_size,
+                n_process=n_process,
+            )
+            for (text, positions), doc in zip(pending.items(), docs):
+                checkpoint()
+                groups: Dict[str, List[str]] = {
+                    "characters": [],
+                    "locations": [],
+                    "objects": [],
+                }
+                for ent in doc.ents:
+                    if ent.label_ in ENTITY_GROUPS:
+                        groups[ENTITY_GROUPS[ent.label_]].append(ent.text)
+                # shared through the cache, so stored as tuples
+                scene_found = {group: tuple(names) for group, names in groups.items()}
+                cache.put(text, scene_found)
+                for i in positions:
+                    found[i] = scene_found
+        return [found[i] for i in range(len(texts))]
+
     def _extract_fallback(self, scenes: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
         """Fallback entity extraction using regex patterns."""
         entities: Dict[str, DefaultDict[str, EntityData]] = {
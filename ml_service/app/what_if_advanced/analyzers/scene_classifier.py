@@ -1,9 +1,14 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
 from loguru import logger
 
 
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.asarray(vectors / np.where(norms == 0, 1, norms))
+
+
 class SceneClassifier:
     """Classify scenes into types using zero-shot classification."""
 
@@ -60,32 +65,53 @@ class SceneClassifier:
             embeddings = self.embedder.encode(templates, convert_to_numpy=True)
             self.type_embeddings[scene_type] = np.mean(embeddings, axis=0)
 
+        self._type_names = list(self.type_embeddings)
+        self._types = _normalize(
+            np.array([self.type_embeddings[t] for t in self._type_names], dtype=float)
+        )
+
         logger.info(
             f"SceneClassifier initialized with {len(self.scene_type_templates)} scene types"
         )
 
     def classify_scene(self, scene_text: str, top_k: int = 3) -> List[Dict[str, Any]]:
         """Classify a single scene into types."""
-        scene_embedding = self.embedder.encode([scene_text], convert_to_numpy=True)[0]
-
-        scores = {}
-        for scene_type, type_embedding in self.type_embeddings.items():
-            similarity = util.cos_sim(scene_embedding, type_embedding)[0][0].item()
-            scores[scene_type] = similarity
-
-        sorted_types = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-
+        scene_embedding = self.embedder.encode([scene_text], convert_to_numpy=True)
+        return self.classify_embeddings(scene_embedding, top_k=top_k)[0]
+
+    def classify_embeddings(
+        self, embeddings: np.ndarray, top_k: int = 3
+    ) -> List[List[Dict[str, Any]]]:
+        """Top types of each scene embedding, as one scenes x types product."""
+        similarities = _normalize(np.asarray(embeddings, dtype=float)) @ self._types.T
+        # stable sort keeps type order on ties, like sorting the scores dict
+        order = np.argsort(-similarities, axis=1, kind="stable")[:, :top_k]
         return [
-            {"type": scene_type, "confidence": float(score)}
-            for scene_type, score in sorted_types[:top_k]
+            [{"type": self._type_names[j], "confidence": float(row[j])} for j in ranked]
+            for row, ranked in zip(similarities, order)
         ]
 
-    def classify_scenes(self, scenes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Classify all scenes and add type information."""
+    def classify_scenes(
+        self,
+        scenes: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """Classify all scenes and add type information.
+
+        ``embeddings`` (one row per scene, from the same model) are reused
+        when given; otherwise all scenes are encoded in one batch.
+        """
+        if not scenes:
+            return []
+        if embeddings is None:
+            embeddings = self.embedder.encode(
+                [scene["text"] for scene in scenes], convert_to_numpy=True
+            )
         classified_scenes = []
 
-        for scene in scenes:
-            scene_types = self.classify_scene(scene["text"], top_k=1)
+        for scene, scene_types in zip(
+            scenes, self.classify_embeddings(embeddings, top_k=1)
+        ):
             primary_type = scene_types[0]["type"] if scene_types else "unknown"
 
             classified_scene = scene.copy()
@@ -1,19 +1,10 @@
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence, Tuple
 from loguru import logger
 
-try:
-    import openai
+from ...llm_gateway import DEFAULT_MODELS, LLMCall, LLMGateway, get_llm_gateway
 
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import anthropic
-
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+# (scene text, instruction, context) of one rewrite
+RewriteJob = Tuple[str, str, Optional[Dict[str, Any]]]
 
 
 class LLMGenerator:
@@ -24,42 +15,24 @@ class LLMGenerator:
         provider: str = "openai",
         api_key: Optional[str] = None,
         model: Optional[str] = None,
+        gateway: Optional[LLMGateway] = None,
     ):
         self.provider = provider.lower()
         self.api_key = api_key
         self.model = model or self._get_default_model()
+        self.gateway: Optional[LLMGateway] = None
 
-        if self.provider == "openai" and not OPENAI_AVAILABLE:
-            raise ImportError(
-                "OpenAI package not installed. Install with: pip install openai"
-            )
-        if self.provider == "anthropic" and not ANTHROPIC_AVAILABLE:
-            raise ImportError(
-                "Anthropic package not installed. Install with: pip install anthropic"
-            )
-
-        self._init_client()
-
-    def _get_default_model(self) -> str:
-        """Get default model for provider."""
-        defaults = {
-            "openai": "gpt-4o-mini",
-            "anthropic": "claude-3-5-haiku-20241022",
-        }
-        return defaults.get(self.provider, "gpt-4o-mini")
-
-    def _init_client(self):
-        """Initialize LLM client."""
-        if self.provider == "openai":
-            self.client = openai.OpenAI(api_key=self.api_key)
-        elif self.provider == "anthropic":
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+        if self.provider in DEFAULT_MODELS:
+            self.gateway = gateway or get_llm_gateway()
         else:
-            self.client = None
             logger.warning(
                 f"Unknown provider: {self.provider}, LLM generation disabled"
             )
 
+    def _get_default_model(self) -> str:
+        """Get default model for provider."""
+        return DEFAULT_MODELS.get(self.provider, DEFAULT_MODELS["openai"])
+
     def rewrite_scene(
         self,
         scene_text: str,
@@ -67,22 +40,36 @@ class LLMGenerator:
         context: Optional[Dict[str, Any]] = None,
     ) -> str:
         """Rewrite a scene according to instructions."""
-        if not self.client:
-            logger.warning("LLM client not available, returning original text")
-            return scene_text
+        return self.rewrite_scenes([(scene_text, instruction, context)])[0]
 
-        prompt = self._build_rewrite_prompt(scene_text, instruction, context)
+    def rewrite_scenes(self, jobs: Sequence[RewriteJob]) -> List[str]:
+        """Rewrite several scenes with concurrent calls through the gateway.
 
-        try:
-            if self.provider == "openai":
-                return self._generate_openai(prompt)
-            elif self.provider == "anthropic":
-                return self._generate_anthropic(prompt)
+        A scene whose call fails keeps its original text.
+        """
+        if not self.gateway:
+            logger.warning("LLM client not available, returning original text")
+            return [scene_text for scene_text, _, _ in jobs]
+
+        calls = [
+            LLMCall(
+                self.provider,
+                self._build_rewrite_prompt(scene_text, instruction, context),
+                model=self.model,
+                temperature=0.7,
+                max_tokens=2000,
+                api_key=self.api_key,
+            )
+            for scene_text, instruction, context in jobs
+        ]
+        rewritten = []
+        for (scene_text, _, _), result in zip(jobs, self.gateway.complete_many(calls)):
+            if isinstance(result, Exception):
+                logger.error(f"LLM generation failed: {result}")
+                rewritten.append(scene_text)
             else:
-                return scene_text
-        except Exception as e:
-            logger.error(f"LLM generation failed: {e}")
-            return scene_text
+                rewritten.append(result.strip())
+        return rewritten
 
     def _build_rewrite_prompt(
         self, scene_text: str, instruction: str, context: Optional[Dict[str, Any]]
@@ -111,26 +98,6 @@ REQUIREMENTS:
         prompt += "\n\nREWRITTEN SCENE:"
         return prompt
 
-    def _generate_openai(self, prompt: str) -> str:
-        """Generate using OpenAI API."""
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            max_tokens=2000,
-        )
-        return str(response.choices[0].message.content).strip()
-
-    def _generate_anthropic(self, prompt: str) -> str:
-        """Generate using Anthropic API."""
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=2000,
-            temperature=0.7,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return str(response.content[0].text).strip()
-
     def generate_alternative_action(
         self,
         original_action: str,
@@ -0,0 +1,222 @@
+"""Compact patches of a what-if result against the request's script.
+
+Instead of the whole modified script, a structured what-if can return one
+patch per scene a plan changed, removed or inserted. Each patch holds the
+scene's character offsets in the original ``script_text`` and its
+replacement text, so applying them to the script the client already has
+gives the modified script, with the original spacing between scenes. The
+same patches render as a unified diff in which only the lines a patch
+touches are compared, so diffing costs what the change costs.
+"""
+
+import difflib
+import re
+from bisect import bisect_right
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .plan import PlanResult
+
+# put in front of an inserted scene, as between scenes of a rebuilt script
+SCENE_SEPARATOR = "\n\n"
+
+# split lines never contain it, so it flags the last line of a file that
+# has no final newline
+_NO_NEWLINE = "\n"
+
+
+def scene_spans(
+    script_text: str, scenes: Sequence[Dict[str, Any]]
+) -> List[Tuple[int, int]]:
+    """Offsets of each parsed scene's text in ``script_text``.
+
+    parse_script_to_scenes cuts the script into consecutive parts and strips
+    them, so each scene is found at or after the end of the one before.
+    """
+    spans = []
+    position = 0
+    for scene in scenes:
+        start = script_text.find(scene["text"], position)
+        if start < 0:
+            raise ValueError(f"Scene {scene.get('scene_id')} not found in the script")
+        position = start + len(scene["text"])
+        spans.append((start, position))
+    return spans
+
+
+def build_scene_patches(script_text: str, applied: PlanResult) -> List[Dict[str, Any]]:
+    """Patches turning ``script_text`` into the plan's scenes, by offset.
+
+    ``op`` is "replace", "delete" (empty ``text``) or "insert" (``start``
+    equals ``end``); ``scene_id`` is the original scene's id, None for an
+    inserted scene.
+    """
+    spans = scene_spans(script_text, applied.original)
+    changed = set(applied.changed)
+    patches: List[Dict[str, Any]] = []
+    # end of the last original scene kept so far: where insertions go
+    kept_end = 0
+    for position, (scene, origin) in enumerate(zip(applied.scenes, applied.origins)):
+        if origin is None:
+            patches.append(
+                {
+                    "op": "insert",
+                    "scene_id": None,
+                    "start": kept_end,
+                    "end": kept_end,
+                    "text": SCENE_SEPARATOR + scene["text"],
+                }
+            )
+            continue
+        start, end = spans[origin]
+        kept_end = end
+        original = applied.original[origin]
+        if position in changed and scene["text"] != original["text"]:
+            patches.append(
+                {
+                    "op": "replace",
+                    "scene_id": original.get("scene_id", origin),
+                    "start": start,
+                    "end": end,
+                    "text": scene["text"],
+                }
+            )
+    for origin in applied.removed_origins():
+        start, end = spans[origin]
+        patches.append(
+            {
+                "op": "delete",
+                "scene_id": applied.original[origin].get("scene_id", origin),
+                "start": start,
+                "end": end,
+                "text": "",
+            }
+        )
+    patches.sort(key=lambda patch: (patch["start"], patch["end"]))
+    return patches
+
+
+def apply_scene_patches(script_text: str, patches: Sequence[Dict[str, Any]]) -> str:
+    pieces = []
+    position = 0
+    for patch in sorted(patches, key=lambda patch: (patch["start"], patch["end"])):
+        pieces.append(script_text[position : patch["start"]])
+        pieces.append(patch["text"])
+        position = max(position, patch["end"])
+    pieces.append(script_text[position:])
+    return "".join(pieces)
+
+
+def unified_diff(
+    script_text: str,
+    patches: Sequence[Dict[str, Any]],
+    name: str = "script",
+    context: int = 3,
+) -> str:
+    """``patches`` as a unified diff of ``script_text``, line numbers included.
+
+    Only the lines a patch touches are compared, so changes never drift
+    into the surrounding text; hunks then get ``context`` lines around them
+    and are merged when their context would overlap, as in ``diff -u``.
+    A last line without a newline is marked so, on either side.
+    """
+    if not patches:
+        return ""
+    lines = script_text.split("\n")
+    # a final newline ends the last line rather than starting an empty one
+    no_final_newline = not script_text.endswith("\n")
+    line_count = len(lines) if no_final_newline else len(lines) - 1
+    if no_final_newline:
+        lines[-1] += _NO_NEWLINE
+    newlines = [match.start() for match in re.finditer("\n", script_text)]
+
+    def line_of(offset: int) -> int:
+        return bisect_right(newlines, offset - 1)
+
+    # lines touched by patches: [first, last] and the patches in them
+    cores: List[Tuple[int, int, List[Dict[str, Any]]]] = []
+    for patch in sorted(patches, key=lambda patch: (patch["start"], patch["end"])):
+        first, last = line_of(patch["start"]), line_of(patch["end"])
+        if cores and first <= cores[-1][1]:
+            cores[-1] = (cores[-1][0], max(last, cores[-1][1]), cores[-1][2])
+            cores[-1][2].append(patch)
+        else:
+            cores.append((first, last, [patch]))
+
+    # (old from, old to, new lines) of every changed run, in old line numbers
+    changes: List[Tuple[int, int, List[str]]] = []
+    for first, last, core_patches in cores:
+        start = newlines[first - 1] + 1 if first else 0
+        end = newlines[last] if last < len(newlines) else len(script_text)
+        old = lines[first : last + 1]
+        new_text = apply_scene_patches(
+            script_text[start:end],
+            [
+                dict(patch, start=patch["start"] - start, end=patch["end"] - start)
+                for patch in core_patches
+            ],
+        )
+        new = new_text.split("\n")
+        if no_final_newline and end == len(script_text):
+            # the new file ends here too, after the line before if empty
+            if not new_text:
+                new = []
+            elif new_text.endswith("\n"):
+                new.pop()
+            else:
+                new[-1] += _NO_NEWLINE
+        matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag != "equal":
+                changes.append((first + i1, first + i2, new[j1:j2]))
+
+    out = [f"--- a/{name}", f"+++ b/{name}"]
+    # lines added minus lines removed before the current hunk
+    shift = 0
+    group: List[Tuple[int, int, List[str]]] = []
+    for index, change in enumerate(changes):
+        group.append(change)
+        following = changes[index + 1] if index + 1 < len(changes) else None
+        if following is not None and following[0] - change[1] <= 2 * context:
+            continue
+
+        old_from = max(0, group[0][0] - context)
+        old_to = min(line_count, group[-1][1] + context)
+        body = _diff_lines(" ", lines[old_from : group[0][0]])
+        delta = 0
+        for number, (i1, i2, new) in enumerate(group):
+            if number:
+                body += _diff_lines(" ", lines[group[number - 1][1] : i1])
+            body += _diff_lines("-", lines[i1:i2])
+            body += _diff_lines("+", new)
+            delta += len(new) - (i2 - i1)
+        body += _diff_lines(" ", lines[group[-1][1] : old_to])
+
+        old_len = old_to - old_from
+        new_len = old_len + delta
+        out.append(
+            f"@@ -{_hunk_range(old_from, old_len)} "
+            f"+{_hunk_range(old_from + shift, new_len)} @@"
+        )
+        out += body
+        shift += delta
+        group = []
+    return "\n".join(out) + "\n"
+
+
+def _diff_lines(prefix: str, lines: Sequence[str]) -> List[str]:
+    out = []
+    for line in lines:
+        if line.endswith(_NO_NEWLINE):
+            out += [prefix + line[:-1], "\\ No newline at end of file"]
+        else:
+            out.append(prefix + line)
+    return out
+
+
+def _hunk_range(start: int, length: int) -> str:
+    """Range of a hunk header from a 0-based start, as ``diff -u`` writes it."""
+    if length == 1:
+        return str(start + 1)
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
@@ -0,0 +1,217 @@
+"""Execution plans for structured what-if requests.
+
+Modifications are applied in request order, but consecutive ones whose
+strategies compile to a ``SceneOperation`` are fused into a single walk over
+the scenes, and a scene dict is copied only when an operation changes it.
+Strategies that need the whole scene list (LLM rewrites) run as their own
+stage between fused walks. The result records where every resulting scene
+came from, so callers can tell changed scenes from untouched ones.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from loguru import logger
+
+from ..cancellation import AnalysisCancelled, checkpoint
+from .schemas import ModificationConfig
+from .strategies.base import (
+    ChangeSet,
+    ModificationStrategy,
+    OperationError,
+    PassResult,
+    SceneOperation,
+    StrategyRegistry,
+    apply_operations,
+)
+
+
+class PlanStep:
+    def __init__(
+        self,
+        index: int,
+        config: ModificationConfig,
+        strategy: ModificationStrategy,
+        fusable: bool,
+    ):
+        self.index = index
+        self.config = config
+        self.strategy = strategy
+        self.fusable = fusable
+
+
+class PlanResult:
+    def __init__(
+        self,
+        original: Sequence[Dict[str, Any]],
+        scenes: List[Dict[str, Any]],
+        origins: List[Optional[int]],
+        changed: List[int],
+        applied: List[Dict[str, Any]],
+        changes: Dict[int, ChangeSet],
+        passes: int,
+    ):
+        self.original = original
+        self.scenes = scenes
+        # index of the input scene each resulting scene came from, if known
+        self.origins = origins
+        # positions in ``scenes`` whose text a modification changed
+        self.changed = changed
+        self.applied = applied
+        # change set of each applied modification, by position in the request
+        self.changes = changes
+        self.passes = passes
+
+    def changed_positions(self) -> List[int]:
+        return list(self.changed)
+
+    def removed_origins(self) -> List[int]:
+        """Input scenes that did not make it into the result."""
+        kept = {origin for origin in self.origins if origin is not None}
+        return [i for i in range(len(self.original)) if i not in kept]
+
+
+class ExecutionPlan:
+    def __init__(
+        self,
+        modifications: Sequence[ModificationConfig],
+        registry: StrategyRegistry,
+        entities: Dict[str, List[Any]],
+    ):
+        self.entities = entities
+        self.steps: List[PlanStep] = []
+        # entries of modifications_applied, by position in the request
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._changes: Dict[int, ChangeSet] = {}
+
+        for index, config in enumerate(modifications):
+            try:
+                strategy = registry.get_strategy(config.type)
+            except ValueError as e:
+                logger.error(f"Failed to apply {config.type}: {e}")
+                self._records[index] = {"type": config.type, "error": str(e)}
+                continue
+            if not strategy.validate_params(config.params):
+                logger.warning(f"Invalid params for {config.type}, skipping")
+                continue
+            fusable = type(strategy).compile is not ModificationStrategy.compile
+            self.steps.append(PlanStep(index, config, strategy, fusable))
+
+    def stages(self) -> List[List[PlanStep]]:
+        """Steps grouped into passes: runs of fusable steps, or one bulk step."""
+        stages: List[List[PlanStep]] = []
+        for step in self.steps:
+            if step.fusable and stages and stages[-1][0].fusable:
+                stages[-1].append(step)
+            else:
+                stages.append([step])
+        return stages
+
+    def run(self, scenes: Sequence[Dict[str, Any]]) -> PlanResult:
+        """Apply the plan. ``scenes`` and the dicts in it are not modified."""
+        current: List[Dict[str, Any]] = list(scenes)
+        origins: List[Optional[int]] = list(range(len(current)))
+        changed: Set[int] = set()
+        passes = 0
+
+        for stage in self.stages():
+            checkpoint()
+            if stage[0].fusable:
+                result = self._run_fused(stage, current)
+            else:
+                result = self._run_bulk(stage[0], current)
+            changed = set(result.changed) | {
+                i for i, p in enumerate(result.origins) if p in changed
+            }
+            origins = [None if p is None else origins[p] for p in result.origins]
+            current = result.scenes
+            passes += 1
+
+        applied = [self._records[i] for i in sorted(self._records)]
+        logger.info(
+            f"Plan applied {len(self.steps)} modification(s) in {passes} pass(es)"
+        )
+        return PlanResult(
+            scenes,
+            current,
+            origins,
+            sorted(changed),
+            applied,
+            dict(self._changes),
+            passes,
+        )
+
+    def _run_fused(self, stage: List[PlanStep], scenes: List[Dict[str, Any]]):
+        steps = list(stage)
+        while True:
+            operations: List[SceneOperation] = []
+            compiled: List[PlanStep] = []
+            for step in steps:
+                try:
+                    operation = step.strategy.compile(step.config.params, self.entities)
+                except AnalysisCancelled:
+                    raise
+                except Exception as e:
+                    self._record_error(step, e)
+                    continue
+                if operation is not None:
+                    operations.append(operation)
+                    compiled.append(step)
+
+            try:
+                result = apply_operations(scenes, operations)
+            except OperationError as e:
+                if isinstance(e.error, AnalysisCancelled):
+                    raise e.error
+                # operations only count as they go; redo the pass without it
+                failed = compiled[e.index]
+                self._record_error(failed, e.error)
+                steps = [step for step in compiled if step is not failed]
+                continue
+
+            for step, operation, changes in zip(compiled, operations, result.changes):
+                self._record(step, operation.metadata(changes), changes)
+            return result
+
+    def _run_bulk(self, step: PlanStep, scenes: List[Dict[str, Any]]) -> PassResult:
+        result = PassResult(0)
+        try:
+            modified, metadata, changes = step.strategy.apply_with_changes(
+                scenes, step.config.params, self.entities
+            )
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            self._record_error(step, e)
+            result.scenes = scenes
+            result.origins = list(range(len(scenes)))
+            return result
+        self._record(step, metadata, changes)
+
+        position = {id(scene): i for i, scene in enumerate(scenes)}
+        result.scenes = modified
+        # rewritten in place: a replaced dict stands for the scene it replaced
+        in_place = len(modified) == len(scenes)
+        result.origins = [
+            position.get(id(scene), i if in_place else None)
+            for i, scene in enumerate(modified)
+        ]
+        result.changed = [
+            i
+            for i, (scene, origin) in enumerate(zip(modified, result.origins))
+            if origin is None
+            or (scene is not scenes[origin] and scene["text"] != scenes[origin]["text"])
+        ]
+        return result
+
+    def _record(self, step: PlanStep, metadata: Dict[str, Any], changes: ChangeSet):
+        logger.info(f"Applied {step.config.type}: {metadata}")
+        self._records[step.index] = {
+            "type": step.config.type,
+            "metadata": metadata,
+            "changes": changes.summary(),
+        }
+        self._changes[step.index] = changes
+
+    def _record_error(self, step: PlanStep, error: Exception):
+        logger.error(f"Failed to apply {step.config.type}: {error}")
+        self._records[step.index] = {"type": step.config.type, "error": str(error)}
@@ -26,6 +26,13 @@ class StructuredWhatIfRequest(BaseModel):
     preserve_structure: bool = Field(
         default=True, description="Preserve script formatting"
     )
+    diff_format: Literal["scenes", "unified"] = Field(
+        default="scenes",
+        description="Changes as per-scene patches or as a unified diff",
+    )
+    include_modified_script: bool = Field(
+        default=False, description="Also return the whole modified script"
+    )
 
 
 class EntityInfo(BaseModel):
@@ -43,6 +50,16 @@ class SceneInfo(BaseModel):
     summary: Optional[str]
 
 
+class ScenePatch(BaseModel):
+    op: Literal["replace", "delete", "insert"]
+    scene_id: Optional[int] = Field(
+        None, description="Original scene id; None for an inserted scene"
+    )
+    start: int = Field(..., description="Start offset in the original script")
+    end: int = Field(..., description="End offset in the original script")
+    text: str = Field(..., description="Text replacing original[start:end]")
+
+
 class AdvancedWhatIfResponse(BaseModel):
     original_rating: str
     modified_rating: str
@@ -53,4 +70,13 @@ class AdvancedWhatIfResponse(BaseModel):
     scene_analysis: List[SceneInfo]
     explanation: str
     modified_script: Optional[str] = None
+    changed_scene_ids: List[int] = Field(
+        default_factory=list,
+        description="Scene IDs in the modified script whose text was changed",
+    )
+    scene_patches: List[ScenePatch] = Field(
+        default_factory=list,
+        description="Patches that turn script_text into the modified script",
+    )
+    unified_diff: Optional[str] = None
     rating_changed: bool
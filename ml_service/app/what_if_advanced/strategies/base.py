@@ -1,5 +1,156 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from ...cancellation import checkpoint
+
+
+class ChangeSet:
+    """Scenes one modification changed, recorded while it is applied.
+
+    Scene ids are the ones the modification saw, i.e. before any
+    renumbering it caused.
+    """
+
+    def __init__(self):
+        # scene id -> change in UTF-8 size of its text
+        self.modified: Dict[int, int] = {}
+        self.removed: List[int] = []
+
+    def record_modified(self, scene_id: int, before: str, after: str):
+        delta = len(after.encode("utf-8")) - len(before.encode("utf-8"))
+        self.modified[scene_id] = self.modified.get(scene_id, 0) + delta
+
+    def record_removed(self, scene_id: int):
+        self.removed.append(scene_id)
+
+    @property
+    def scenes_modified(self) -> int:
+        return len(self.modified)
+
+    @property
+    def scenes_removed(self) -> int:
+        return len(self.removed)
+
+    @property
+    def bytes_delta(self) -> int:
+        return sum(self.modified.values())
+
+    def __bool__(self) -> bool:
+        return bool(self.modified or self.removed)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "modified_scene_ids": sorted(self.modified),
+            "removed_scene_ids": list(self.removed),
+            "scenes_modified": self.scenes_modified,
+            "scenes_removed": self.scenes_removed,
+            "bytes_delta": self.bytes_delta,
+        }
+
+
+class SceneOperation(ABC):
+    """A modification compiled for one in-order pass over the scenes.
+
+    ``apply_to`` returns the scene itself when it is left alone, a new dict
+    when it changes (the input is never mutated), or None to drop it.
+    """
+
+    # surviving scenes get consecutive scene ids, as after a removal
+    renumbers = False
+
+    @abstractmethod
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        """Metadata about the changes, once every scene has been seen."""
+        pass
+
+
+class OperationError(Exception):
+    """An operation failed part-way through a fused pass."""
+
+    def __init__(self, index: int, error: Exception):
+        super().__init__(str(error))
+        self.index = index
+        self.error = error
+
+
+class PassResult:
+    def __init__(self, operations: int):
+        self.scenes: List[Dict[str, Any]] = []
+        # index of the input scene each resulting scene came from
+        self.origins: List[Optional[int]] = []
+        # positions in ``scenes`` whose text some operation changed
+        self.changed: List[int] = []
+        self.changes = [ChangeSet() for _ in range(operations)]
+
+
+def apply_operations(
+    scenes: Sequence[Dict[str, Any]], operations: Sequence[SceneOperation]
+) -> PassResult:
+    """Run ``operations`` in order over ``scenes`` in a single pass.
+
+    Scenes are copied only when an operation changes them, and each
+    operation's changes are recorded as it makes them.
+    """
+    survivors = [0] * len(operations)
+    result = PassResult(len(operations))
+    for origin, scene in enumerate(scenes):
+        checkpoint()
+        current = scene
+        modified = False
+        for k, operation in enumerate(operations):
+            try:
+                after = operation.apply_to(current)
+            except Exception as e:
+                raise OperationError(k, e) from e
+            if after is None:
+                result.changes[k].record_removed(current.get("scene_id", 0))
+                break
+            if after is not current and after["text"] != current["text"]:
+                result.changes[k].record_modified(
+                    current.get("scene_id", 0), current["text"], after["text"]
+                )
+                modified = True
+            if operation.renumbers:
+                if after.get("scene_id") != survivors[k]:
+                    after = dict(after, scene_id=survivors[k])
+                survivors[k] += 1
+            current = after
+        else:
+            # no operation dropped the scene
+            if modified:
+                result.changed.append(len(result.scenes))
+            result.scenes.append(current)
+            result.origins.append(origin)
+    return result
+
+
+def diff_scenes(
+    before: Sequence[Dict[str, Any]], after: Sequence[Dict[str, Any]]
+) -> ChangeSet:
+    """Changes made by a strategy that rebuilt the scene list itself.
+
+    Only scene dicts the strategy replaced are compared. When the list kept
+    its length a replaced scene is compared with the one it replaced;
+    otherwise input scenes that are no longer present count as removed.
+    """
+    changes = ChangeSet()
+    same_length = len(before) == len(after)
+    present = {id(scene) for scene in after}
+    for i, scene in enumerate(before):
+        if id(scene) in present:
+            continue
+        if same_length:
+            if after[i]["text"] != scene["text"]:
+                changes.record_modified(
+                    scene.get("scene_id", i), scene["text"], after[i]["text"]
+                )
+        else:
+            changes.record_removed(scene.get("scene_id", i))
+    return changes
 
 
 class ModificationStrategy(ABC):
@@ -14,6 +165,14 @@ class ModificationStrategy(ABC):
         pass
 
     @abstractmethod
+    def compile(
+        self, params: Dict[str, Any], entities: Dict[str, List[Any]]
+    ) -> Optional[SceneOperation]:
+        """Per-scene form of the modification, so it can share one pass over
+        the scenes with others. None if it needs the whole scene list; such
+        a strategy overrides ``apply`` as well."""
+        pass
+
     def apply(
         self,
         scenes: List[Dict[str, Any]],
@@ -27,7 +186,34 @@ class ModificationStrategy(ABC):
         Returns:
             Tuple of (modified_scenes, metadata about changes)
         """
-        pass
+        operation = self.compile(params, entities)
+        if operation is None:
+            raise TypeError(f"{self.name} works on the whole scene list")
+        result = self._run(operation, scenes)
+        return result.scenes, operation.metadata(result.changes[0])
+
+    def apply_with_changes(
+        self,
+        scenes: List[Dict[str, Any]],
+        params: Dict[str, Any],
+        entities: Dict[str, List[Any]],
+        **kwargs,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any], ChangeSet]:
+        """``apply`` plus the set of scenes it changed."""
+        operation = self.compile(params, entities)
+        if operation is None:
+            modified_scenes, metadata = self.apply(scenes, params, entities, **kwargs)
+            return modified_scenes, metadata, diff_scenes(scenes, modified_scenes)
+        result = self._run(operation, scenes)
+        changes = result.changes[0]
+        return result.scenes, operation.metadata(changes), changes
+
+    @staticmethod
+    def _run(operation: SceneOperation, scenes: List[Dict[str, Any]]) -> PassResult:
+        try:
+            return apply_operations(scenes, [operation])
+        except OperationError as e:
+            raise e.error
 
     @abstractmethod
     def validate_params(self, params: Dict[str, Any]) -> bool:
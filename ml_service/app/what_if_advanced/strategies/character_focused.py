@@ -1,6 +1,146 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional
 import re
-from .base import ModificationStrategy
+from .base import ChangeSet, ModificationStrategy, SceneOperation
+from ...script_index import classify_lines
+
+
+def remove_character_lines(text: str, character_name: str) -> str:
+    """Remove the cues, parentheticals and dialogue of a character."""
+    target = character_name.casefold()
+    lines = text.split("\n")
+    kept = [
+        line
+        for line, (_, _, speaker) in zip(lines, classify_lines(lines))
+        if speaker is None or speaker.casefold() != target
+    ]
+    if len(kept) == len(lines):
+        return text
+    return "\n".join(kept)
+
+
+class UnchangedOperation(SceneOperation):
+    """Leaves every scene alone and reports fixed metadata (e.g. an error)."""
+
+    def __init__(self, metadata: Dict[str, Any]):
+        self._metadata = metadata
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return scene
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return self._metadata
+
+
+class RemoveCharacterScenesOperation(SceneOperation):
+    """Remove every scene the character appears in."""
+
+    renumbers = True
+
+    def __init__(self, character_name: str):
+        self.character_name = character_name
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.character_name in scene.get("characters", []):
+            return None
+        return scene
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return {
+            "action": "remove_character",
+            "character": self.character_name,
+            "scenes_removed": changes.scenes_removed,
+        }
+
+
+class RemoveCharacterLinesOperation(SceneOperation):
+    """Remove the cues, parentheticals and dialogue of a character."""
+
+    def __init__(self, character_name: str):
+        self.character_name = character_name
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        modified_text = remove_character_lines(scene["text"], self.character_name)
+        if modified_text == scene["text"]:
+            return scene
+        return dict(scene, text=modified_text)
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return {
+            "action": "remove_character_lines",
+            "character": self.character_name,
+            "scenes_modified": changes.scenes_modified,
+        }
+
+
+class RenameCharacterOperation(SceneOperation):
+    """Rename character throughout script."""
+
+    def __init__(self, character_name: str, new_name: str):
+        self.character_name = character_name
+        self.new_name = new_name
+        self.pattern = re.compile(r"\b" + re.escape(character_name) + r"\b", re.I)
+        self.replacements_count = 0
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        modified_text, count = self.pattern.subn(self.new_name, scene["text"])
+        self.replacements_count += count
+
+        characters = scene.get("characters") or []
+        renamed = self.character_name in characters
+        if not count and not renamed:
+            return scene
+
+        modified_scene = dict(scene, text=modified_text)
+        if renamed:
+            modified_scene["characters"] = [
+                self.new_name if c == self.character_name else c for c in characters
+            ]
+        return modified_scene
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return {
+            "action": "rename_character",
+            "old_name": self.character_name,
+            "new_name": self.new_name,
+            "replacements": self.replacements_count,
+        }
+
+
+class ModifyCharacterActionsOperation(SceneOperation):
+    """Modify specific actions performed by a character."""
+
+    def __init__(self, character_name: str, action_replacements: Dict[str, str]):
+        self.character_name = character_name
+        name = re.escape(character_name)
+        self.rules = [
+            (
+                re.compile(rf"({name}[^.]*?{re.escape(old_action)})", re.I),
+                re.compile(rf"\b{re.escape(old_action)}\b", re.I),
+                new_action,
+            )
+            for old_action, new_action in action_replacements.items()
+        ]
+        self.replacements_count = 0
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.character_name not in scene.get("characters", []):
+            return scene
+
+        modified_text = scene["text"]
+        for counted, pattern, new_action in self.rules:
+            self.replacements_count += len(counted.findall(modified_text))
+            modified_text = pattern.sub(new_action, modified_text)
+
+        if modified_text == scene["text"]:
+            return scene
+        return dict(scene, text=modified_text)
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return {
+            "action": "modify_character_actions",
+            "character": self.character_name,
+            "actions_replaced": self.replacements_count,
+        }
 
 
 class CharacterFocusedStrategy(ModificationStrategy):
@@ -14,13 +154,9 @@ class CharacterFocusedStrategy(ModificationStrategy):
             "change_character_actions",
         ]
 
-    def apply(
-        self,
-        scenes: List[Dict[str, Any]],
-        params: Dict[str, Any],
-        entities: Dict[str, List[Any]],
-        **kwargs,
-    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    def compile(
+        self, params: Dict[str, Any], entities: Dict[str, List[Any]]
+    ) -> SceneOperation:
         """
         Apply character-focused modifications.
 
@@ -35,166 +171,25 @@ class CharacterFocusedStrategy(ModificationStrategy):
         character_name = params.get("character_name")
 
         if not character_name:
-            return scenes, {"error": "character_name required"}
+            return UnchangedOperation({"error": "character_name required"})
 
         if action == "remove":
-            return self._remove_character(scenes, character_name, params)
+            if params.get("remove_scenes", False):
+                return RemoveCharacterScenesOperation(character_name)
+            return RemoveCharacterLinesOperation(character_name)
         elif action == "rename":
-            return self._rename_character(scenes, character_name, params)
+            new_name = params.get("new_name")
+            if not new_name:
+                return UnchangedOperation(
+                    {"error": "new_name required for rename action"}
+                )
+            return RenameCharacterOperation(character_name, new_name)
         elif action == "modify_actions":
-            return self._modify_character_actions(scenes, character_name, params)
-        else:
-            return scenes, {"error": f"Unknown action: {action}"}
-
-    def _remove_character(
-        self, scenes: List[Dict[str, Any]], character_name: str, params: Dict[str, Any]
-    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-        """Remove character from script."""
-        remove_scenes = params.get("remove_scenes", False)
-
-        if remove_scenes:
-            filtered_scenes = []
-            removed_count = 0
-
-            for scene in scenes:
-                scene_chars = scene.get("characters", [])
-                if character_name not in scene_chars:
-                    filtered_scenes.append(scene)
-                else:
-                    removed_count += 1
-
-            for idx, scene in enumerate(filtered_scenes):
-                scene["scene_id"] = idx
-
-            return filtered_scenes, {
-                "action": "remove_character",
-                "character": character_name,
-                "scenes_removed": removed_count,
-            }
+            return ModifyCharacterActionsOperation(
+                character_name, params.get("action_replacements", {})
+            )
         else:
-            modified_scenes = []
-            lines_removed = 0
-
-            for scene in scenes:
-                modified_text = self._remove_character_lines(
-                    scene["text"], character_name
-                )
-                if modified_text != scene["text"]:
-                    lines_removed += 1
-
-                modified_scene = scene.copy()
-                modified_scene["text"] = modified_text
-                modified_scenes.append(modified_scene)
-
-            return modified_scenes, {
-                "action": "remove_character_lines",
-                "character": character_name,
-                "scenes_modified": lines_removed,
-            }
-
-    def _remove_character_lines(self, text: str, character_name: str) -> str:
-        """Remove dialogue and action lines for a character."""
-        lines = text.split("\n")
-        filtered_lines: list[str] = []
-        skip_next = False
-
-        for i, line in enumerate(lines):
-            if re.match(rf"^\s*{re.escape(character_name)}\s*[:.]", line, re.I):
-                skip_next = True
-                continue
-
-            if (
-                skip_next
-                and line.strip()
-                and not re.match(r"^\s*[A-Z][A-Z\s]+[:.]", line)
-            ):
-                skip_next = False
-                continue
-
-            skip_next = False
-            filtered_lines.append(line)
-
-        return "\n".join(filtered_lines)
-
-    def _rename_character(
-        self, scenes: List[Dict[str, Any]], character_name: str, params: Dict[str, Any]
-    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-        """Rename character throughout script."""
-        new_name = params.get("new_name")
-        if not new_name:
-            return scenes, {"error": "new_name required for rename action"}
-
-        modified_scenes = []
-        replacements_count = 0
-
-        for scene in scenes:
-            modified_text = scene["text"]
-
-            pattern = r"\b" + re.escape(character_name) + r"\b"
-            matches = len(re.findall(pattern, modified_text, re.I))
-            replacements_count += matches
-
-            modified_text = re.sub(pattern, new_name, modified_text, flags=re.I)
-
-            modified_scene = scene.copy()
-            modified_scene["text"] = modified_text
-
-            if (
-                "characters" in modified_scene
-                and character_name in modified_scene["characters"]
-            ):
-                modified_scene["characters"] = [
-                    new_name if c == character_name else c
-                    for c in modified_scene["characters"]
-                ]
-
-            modified_scenes.append(modified_scene)
-
-        return modified_scenes, {
-            "action": "rename_character",
-            "old_name": character_name,
-            "new_name": new_name,
-            "replacements": replacements_count,
-        }
-
-    def _modify_character_actions(
-        self, scenes: List[Dict[str, Any]], character_name: str, params: Dict[str, Any]
-    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
-        """Modify specific actions performed by a character."""
-        action_replacements = params.get("action_replacements", {})
-
-        modified_scenes = []
-        replacements_count = 0
-
-        for scene in scenes:
-            scene_chars = scene.get("characters", [])
-            if character_name not in scene_chars:
-                modified_scenes.append(scene)
-                continue
-
-            modified_text = scene["text"]
-
-            for old_action, new_action in action_replacements.items():
-                pattern = rf"({re.escape(character_name)}[^.]*?{re.escape(old_action)})"
-                matches = len(re.findall(pattern, modified_text, re.I))
-                replacements_count += matches
-
-                modified_text = re.sub(
-                    rf"\b{re.escape(old_action)}\b",
-                    new_action,
-                    modified_text,
-                    flags=re.I,
-                )
-
-            modified_scene = scene.copy()
-            modified_scene["text"] = modified_text
-            modified_scenes.append(modified_scene)
-
-        return modified_scenes, {
-            "action": "modify_character_actions",
-            "character": character_name,
-            "actions_replaced": replacements_count,
-        }
+            return UnchangedOperation({"error": f"Unknown action: {action}"})
 
     def validate_params(self, params: Dict[str, Any]) -> bool:
         """Validate parameters."""
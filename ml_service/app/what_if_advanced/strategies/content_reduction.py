@@ -1,6 +1,47 @@
-from typing import Dict, Any, List, Tuple
 import re
-from .base import ModificationStrategy
+from typing import Dict, Any, List, Optional
+from loguru import logger
+from .base import ChangeSet, ModificationStrategy, SceneOperation
+from ...rewrite_engine import RewriteTable, check_key, compile_replacements
+
+
+class ContentReductionOperation(SceneOperation):
+    def __init__(
+        self,
+        table: RewriteTable,
+        content_types: List[str],
+        scope: Optional[List[int]],
+        target_characters: Optional[List[str]],
+        skipped_replacements: Optional[List[str]] = None,
+    ):
+        self.table = table
+        self.skipped_replacements = skipped_replacements or []
+        self.content_types = content_types
+        self.scope = set(scope) if scope else None
+        self.target_characters = set(target_characters) if target_characters else None
+        self.total_replacements = 0
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.scope is not None and scene.get("scene_id", 0) not in self.scope:
+            return scene
+        if self.target_characters is not None and not (
+            self.target_characters & set(scene.get("characters", []))
+        ):
+            return scene
+
+        modified_text, count = self.table.subn(scene["text"])
+        self.total_replacements += count
+        if modified_text == scene["text"]:
+            return scene
+        return dict(scene, text=modified_text)
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return {
+            "content_types_reduced": self.content_types,
+            "total_replacements": self.total_replacements,
+            "scenes_modified": changes.scenes_modified,
+            "skipped_replacements": self.skipped_replacements,
+        }
 
 
 class ContentReductionStrategy(ModificationStrategy):
@@ -83,88 +124,45 @@ class ContentReductionStrategy(ModificationStrategy):
             "reduce_content",
         ]
 
-    def apply(
-        self,
-        scenes: List[Dict[str, Any]],
-        params: Dict[str, Any],
-        entities: Dict[str, List[Any]],
-        **kwargs
-    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    def compile(
+        self, params: Dict[str, Any], entities: Dict[str, List[Any]]
+    ) -> "ContentReductionOperation":
         """
         Reduce content intensity by replacing words/phrases.
 
         Params:
             content_types: List[str] - types to reduce (violence, profanity, gore, sexual, drugs)
-            custom_replacements: Dict[str, str] - custom word replacements
+            custom_replacements: Dict[str, str] - custom word replacements;
+                keys that are not valid patterns are skipped and listed in
+                the metadata
             scope: List[int] - scene IDs to apply to (if None, apply to all)
             target_characters: List[str] - only modify scenes with these characters
         """
         content_types = params.get("content_types", ["violence", "profanity"])
         custom_replacements = params.get("custom_replacements", {})
-        scope = params.get("scope")
-        target_characters = params.get("target_characters")
 
-        replacements = custom_replacements.copy()
+        replacements = {}
+        skipped = []
+        for key, value in custom_replacements.items():
+            try:
+                check_key(key)
+            except re.error as e:
+                logger.warning(f"Skipping custom replacement {key!r}: {e}")
+                skipped.append(key)
+            else:
+                replacements[key] = value
         for content_type in content_types:
             if content_type in self.default_replacements:
                 replacements.update(self.default_replacements[content_type])
 
-        modified_scenes = []
-        total_replacements = 0
-
-        for scene in scenes:
-            scene_id = scene.get("scene_id", 0)
-
-            if scope and scene_id not in scope:
-                modified_scenes.append(scene)
-                continue
-
-            if target_characters:
-                scene_chars = set(scene.get("characters", []))
-                if not (scene_chars & set(target_characters)):
-                    modified_scenes.append(scene)
-                    continue
-
-            modified_text, count = self._apply_replacements(scene["text"], replacements)
-            total_replacements += count
-
-            modified_scene = scene.copy()
-            modified_scene["text"] = modified_text
-            modified_scenes.append(modified_scene)
-
-        metadata = {
-            "content_types_reduced": content_types,
-            "total_replacements": total_replacements,
-            "scenes_modified": sum(
-                1
-                for s in modified_scenes
-                if s["text"] != scenes[modified_scenes.index(s)]["text"]
-            ),
-        }
-
-        return modified_scenes, metadata
-
-    def _apply_replacements(
-        self, text: str, replacements: Dict[str, str]
-    ) -> Tuple[str, int]:
-        """Apply all replacements to text."""
-        modified_text = text
-        count = 0
-
-        for pattern, replacement in replacements.items():
-            if r"\b" in pattern or pattern.startswith(r"\b"):
-                matches = re.findall(pattern, modified_text, re.I)
-                count += len(matches)
-                modified_text = re.sub(pattern, replacement, modified_text, flags=re.I)
-            else:
-                pattern_regex = r"\b" + re.escape(pattern) + r"\w*"
-                matches = re.findall(pattern_regex, modified_text, re.I)
-                count += len(matches)
-                modified_text = re.sub(
-                    pattern_regex, replacement, modified_text, flags=re.I
-                )
-
-        return modified_text, count
+        # custom and default entries compile into one cached table
+        return ContentReductionOperation(
+            compile_replacements(replacements),
+            content_types,
+            params.get("scope"),
+            params.get("target_characters"),
+            skipped,
+        )
 
     def validate_params(self, params: Dict[str, Any]) -> bool:
         """Validate parameters."""
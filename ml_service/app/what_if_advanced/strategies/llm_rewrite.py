@@ -1,5 +1,6 @@
 from typing import Dict, Any, List, Tuple, Optional
-from .base import ModificationStrategy
+from ...cancellation import AnalysisCancelled
+from .base import ModificationStrategy, SceneOperation
 from ..generators.llm_generator import LLMGenerator
 from loguru import logger
 
@@ -18,6 +19,12 @@ class LLMRewriteStrategy(ModificationStrategy):
             "contextual_modification",
         ]
 
+    def compile(
+        self, params: Dict[str, Any], entities: Dict[str, List[Any]]
+    ) -> Optional[SceneOperation]:
+        # rewrites go to the LLM as one batch, so they need every scene
+        return None
+
     def apply(
         self,
         scenes: List[Dict[str, Any]],
@@ -46,10 +53,8 @@ class LLMRewriteStrategy(ModificationStrategy):
         target_characters = params.get("target_characters")
         preserve_style = params.get("preserve_style", True)
 
-        modified_scenes = []
-        rewrites_count = 0
-
-        for scene in scenes:
+        targets = []
+        for position, scene in enumerate(scenes):
             scene_id = scene.get("scene_id", 0)
 
             should_rewrite = True
@@ -61,27 +66,40 @@ class LLMRewriteStrategy(ModificationStrategy):
                     should_rewrite = False
 
             if should_rewrite:
-                context = {
-                    "characters": scene.get("characters", []),
-                    "location": scene.get("location"),
-                    "scene_type": scene.get("scene_type"),
+                targets.append(position)
+
+        jobs = [
+            (
+                scenes[i]["text"],
+                instruction,
+                {
+                    "characters": scenes[i].get("characters", []),
+                    "location": scenes[i].get("location"),
+                    "scene_type": scenes[i].get("scene_type"),
                     "preserve_style": preserve_style,
-                }
-
-                try:
-                    rewritten_text = self.llm_generator.rewrite_scene(
-                        scene["text"], instruction, context
-                    )
-                    modified_scene = scene.copy()
-                    modified_scene["text"] = rewritten_text
-                    modified_scene["llm_rewritten"] = True
-                    modified_scenes.append(modified_scene)
-                    rewrites_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to rewrite scene {scene_id}: {e}")
-                    modified_scenes.append(scene)
-            else:
-                modified_scenes.append(scene)
+                },
+            )
+            for i in targets
+        ]
+
+        modified_scenes = list(scenes)
+        rewrites_count = 0
+        try:
+            # all scenes in scope go out at once; the gateway runs them
+            # concurrently instead of one round trip after another
+            rewritten = self.llm_generator.rewrite_scenes(jobs)
+        except AnalysisCancelled:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to rewrite scenes {targets}: {e}")
+            rewritten = []
+
+        for i, rewritten_text in zip(targets, rewritten):
+            modified_scene = scenes[i].copy()
+            modified_scene["text"] = rewritten_text
+            modified_scene["llm_rewritten"] = True
+            modified_scenes[i] = modified_scene
+            rewrites_count += 1
 
         metadata = {
             "scenes_rewritten": rewrites_count,
@@ -1,5 +1,41 @@
-from typing import Dict, Any, List, Tuple
-from .base import ModificationStrategy
+from typing import Dict, Any, List, Optional
+from .base import ChangeSet, ModificationStrategy, SceneOperation
+
+
+class SceneRemovalOperation(SceneOperation):
+    renumbers = True
+
+    def __init__(self, params: Dict[str, Any]):
+        self.scene_ids = set(params.get("scene_ids", []))
+        self.scene_types = params.get("scene_types")
+        self.characters = set(params["characters"]) if "characters" in params else None
+        self.locations = set(params["locations"]) if "locations" in params else None
+        self.removed_ids = set(self.scene_ids)
+        self.kept = 0
+
+    def apply_to(self, scene: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self._matches(scene):
+            self.removed_ids.add(scene.get("scene_id", 0))
+        if scene.get("scene_id", 0) in self.removed_ids:
+            return None
+        self.kept += 1
+        return scene
+
+    def _matches(self, scene: Dict[str, Any]) -> bool:
+        if self.scene_types is not None and scene.get("scene_type") in self.scene_types:
+            return True
+        if self.characters is not None and self.characters & set(
+            scene.get("characters", [])
+        ):
+            return True
+        return self.locations is not None and scene.get("location") in self.locations
+
+    def metadata(self, changes: ChangeSet) -> Dict[str, Any]:
+        return {
+            "removed_count": changes.scenes_removed,
+            "removed_scene_ids": sorted(self.removed_ids),
+            "remaining_count": self.kept,
+        }
 
 
 class SceneRemovalStrategy(ModificationStrategy):
@@ -8,13 +44,9 @@ class SceneRemovalStrategy(ModificationStrategy):
     def can_handle(self, modification_type: str) -> bool:
         return modification_type in ["remove_scenes", "delete_scenes"]
 
-    def apply(
-        self,
-        scenes: List[Dict[str, Any]],
-        params: Dict[str, Any],
-        entities: Dict[str, List[Any]],
-        **kwargs
-    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    def compile(
+        self, params: Dict[str, Any], entities: Dict[str, List[Any]]
+    ) -> "SceneRemovalOperation":
         """
         Remove scenes by ID or by criteria.
 
@@ -24,45 +56,7 @@ class SceneRemovalStrategy(ModificationStrategy):
             characters: List[str] - remove scenes with these characters
             locations: List[str] - remove scenes in these locations
         """
-        scenes_to_remove = set()
-
-        if "scene_ids" in params:
-            scenes_to_remove.update(params["scene_ids"])
-
-        if "scene_types" in params:
-            target_types = params["scene_types"]
-            for scene in scenes:
-                if scene.get("scene_type") in target_types:
-                    scenes_to_remove.add(scene.get("scene_id", 0))
-
-        if "characters" in params:
-            target_chars = set(params["characters"])
-            for scene in scenes:
-                scene_chars = set(scene.get("characters", []))
-                if scene_chars & target_chars:
-                    scenes_to_remove.add(scene.get("scene_id", 0))
-
-        if "locations" in params:
-            target_locs = set(params["locations"])
-            for scene in scenes:
-                if scene.get("location") in target_locs:
-                    scenes_to_remove.add(scene.get("scene_id", 0))
-
-        original_count = len(scenes)
-        filtered_scenes = [
-            s for s in scenes if s.get("scene_id", 0) not in scenes_to_remove
-        ]
-
-        for idx, scene in enumerate(filtered_scenes):
-            scene["scene_id"] = idx
-
-        metadata = {
-            "removed_count": original_count - len(filtered_scenes),
-            "removed_scene_ids": sorted(list(scenes_to_remove)),
-            "remaining_count": len(filtered_scenes),
-        }
-
-        return filtered_scenes, metadata
+        return SceneRemovalOperation(params)
 
     def validate_params(self, params: Dict[str, Any]) -> bool:
         """Validate parameters."""
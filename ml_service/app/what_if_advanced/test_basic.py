@@ -108,6 +108,7 @@ def test_profanity_reduction(analyzer):
                 scope=None,
             )
         ],
+        include_modified_script=True,
     )
 
     result = analyzer.analyze_structured(request)
@@ -148,6 +149,7 @@ def test_character_rename(analyzer):
                 scope=None,
             )
         ],
+        include_modified_script=True,
     )
 
     result = analyzer.analyze_structured(request)
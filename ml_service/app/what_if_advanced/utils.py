@@ -3,6 +3,8 @@
 from typing import List, Dict, Any
 import re
 
+from ..script_index import CHARACTER, classify_lines
+
 
 def extract_scene_heading(scene_text: str) -> str:
     """Extract scene heading (INT/EXT location)."""
@@ -23,18 +25,12 @@ def extract_location_from_heading(heading: str) -> str:
 
 
 def extract_character_names(scene_text: str) -> List[str]:
-    """Extract character names from scene (simple regex approach)."""
-    pattern = r"^([A-Z][A-Z\s]+?)(?:\s*\(|:)"
-    characters = set()
-
-    for line in scene_text.split("\n"):
-        match = re.match(pattern, line.strip())
-        if match:
-            char_name = match.group(1).strip()
-            if len(char_name) > 1 and not char_name.startswith(("INT", "EXT")):
-                characters.add(char_name)
-
-    return list(characters)
+    """Extract speaking character names from scene, in order of first cue."""
+    seen: Dict[str, None] = {}
+    for _, line_type, speaker in classify_lines(scene_text.split("\n")):
+        if line_type == CHARACTER and speaker is not None:
+            seen.setdefault(speaker, None)
+    return list(seen)
 
 
 def count_words(text: str) -> int:
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from ml_service.app.main import app
@@ -56,3 +58,152 @@ def test_rate_script_without_script_id(client):
     data = response.json()
     assert data["script_id"] is None
     assert data["predicted_rating"] in ["0+", "6+", "12+", "16+", "18+"]
+
+
+def test_rating_advisor_reuses_rated_script_by_hash(client):
+    text = "INT. BAR - NIGHT\n\nTom pulls a gun and shoots the bartender."
+    rated = client.post("/rate_script", json={"text": text}).json()
+
+    response = client.post(
+        "/rating_advisor",
+        json={"script_hash": rated["script_hash"], "target_rating": "6+"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["current_scores"] == rated["agg_scores"]
+
+
+def test_rating_advisor_input_errors(client):
+    missing = client.post("/rating_advisor", json={"target_rating": "6+"})
+    unknown = client.post(
+        "/rating_advisor", json={"script_hash": "ab" * 16, "target_rating": "6+"}
+    )
+
+    assert missing.status_code == 422
+    assert unknown.status_code == 404
+
+
+def test_rate_script_expired_deadline(client):
+    payload = {
+        "text": "INT. HOUSE - DAY\n\nJohn enters the room and sits down.",
+        "script_id": "test_script_deadline",
+    }
+
+    response = client.post(
+        "/rate_script", json=payload, headers={"X-Request-Deadline": "1"}
+    )
+    assert response.status_code == 504
+    assert response.json()["reason"] == "deadline_exceeded"
+
+
+def test_debug_profile_disabled_by_default(client):
+    response = client.post(
+        "/debug/profile",
+        json={"mode": "sample", "duration_seconds": 0.1},
+        headers={"X-Admin-Token": "anything"},
+    )
+    assert response.status_code == 404
+
+
+def test_debug_profile_rejects_bad_token(client, monkeypatch):
+    from ml_service.app.config import settings
+
+    monkeypatch.setattr(settings, "enable_profiling", True)
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+
+    response = client.post(
+        "/debug/profile",
+        json={"mode": "sample", "duration_seconds": 0.1},
+        headers={"X-Admin-Token": "wrong"},
+    )
+    assert response.status_code == 403
+
+
+def test_debug_profile_request_mode(client, monkeypatch):
+    from ml_service.app.config import settings
+
+    monkeypatch.setattr(settings, "enable_profiling", True)
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+
+    response = client.post(
+        "/debug/profile",
+        json={
+            "mode": "request",
+            "endpoint": "rate_script",
+            "payload": {"text": "INT. HOUSE - DAY\n\nJohn kills the intruder."},
+            "interval_ms": 1,
+        },
+        headers={"X-Admin-Token": "secret"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mode"] == "request"
+    assert data["pattern_timings"]
+    assert all(item["calls"] > 0 for item in data["pattern_timings"])
+
+
+def test_debug_intents_explains_parse(client, monkeypatch):
+    from ml_service.app.config import settings
+
+    monkeypatch.setattr(settings, "enable_profiling", True)
+    monkeypatch.setattr(settings, "profiling_token", "secret")
+
+    response = client.get(
+        "/debug/intents",
+        params={"request": "remove scene 2 and replace the fight with an argument"},
+        headers={"X-Admin-Token": "secret"},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["modifications"]["remove_scenes"] == [2]
+    assert data["modifications"]["violence_replacement"] == "an argument"
+    assert {m["intent"] for m in data["matches"]} == {
+        "remove_scenes",
+        "reduce_violence",
+    }
+    assert set(data["similarities"]) == {
+        "replace_violence_verbal",
+        "replace_violence_mild",
+    }
+
+
+def test_detect_lines_stream_matches_batch_endpoint(client):
+    payload = {
+        "text": (
+            "INT. WAREHOUSE - NIGHT\n\nJOHN\n"
+            "I will kill you, damn it.\n\nHe fires a gun."
+        ),
+        "context_size": 1,
+    }
+
+    batch = client.post("/detect_lines", json=payload).json()
+    response = client.post("/detect_lines/stream", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    detections = [r["detection"] for r in records[:-1]]
+    summary = records[-1]["summary"]
+
+    assert [(d["line_start"], d["category"]) for d in detections] == [
+        (d["line_start"], d["category"]) for d in batch["detections"]
+    ]
+    assert summary["total_detections"] == batch["stats"]["total_detections"]
+    assert summary["by_category"] == batch["stats"]["by_category"]
+    assert summary["total_lines"] == batch["total_lines"]
+
+
+def test_what_if_batch_endpoint(client):
+    payload = {
+        "script_text": "INT. BAR - NIGHT\n\nWhat the fuck, he says.",
+        "modification_requests": ["remove profanity", "remove scene 0"],
+    }
+
+    response = client.post("/what_if_batch", json=payload)
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [v["modification_request"] for v in data["variants"]] == payload[
+        "modification_requests"
+    ]
+    assert "profanity" in data["variants"][0]["score_deltas"]
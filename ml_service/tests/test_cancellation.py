@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from ml_service.app.cancellation import (
+    CancellationToken,
+    ClientDisconnected,
+    DeadlineExceeded,
+    bind_token,
+    checkpoint,
+    current_token,
+    parse_deadline_header,
+)
+from ml_service.app.metrics import get_metrics, record_cancellation
+
+
+def test_checkpoint_without_token_is_noop():
+    assert current_token() is None
+    checkpoint()
+
+
+def test_checkpoint_raises_after_deadline():
+    token = CancellationToken(deadline=time.time() - 1)
+    with bind_token(token):
+        with pytest.raises(DeadlineExceeded):
+            checkpoint()
+
+
+def test_checkpoint_raises_when_cancelled():
+    token = CancellationToken(deadline=time.time() + 60)
+    token.cancel()
+    with bind_token(token):
+        with pytest.raises(ClientDisconnected):
+            checkpoint()
+
+
+def test_token_unbound_after_block():
+    token = CancellationToken(deadline=time.time() - 1)
+    with bind_token(token):
+        assert current_token() is token
+    assert current_token() is None
+    checkpoint()
+
+
+def test_cancellation_status_codes_are_distinct():
+    assert DeadlineExceeded.status_code == 504
+    assert ClientDisconnected.status_code == 499
+    assert DeadlineExceeded.reason != ClientDisconnected.reason
+
+
+def test_remaining_budget():
+    assert CancellationToken().remaining() is None
+    token = CancellationToken(deadline=time.time() + 30)
+    assert 29 < token.remaining() <= 30
+    assert CancellationToken(deadline=time.time() - 5).remaining() == 0.0
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("", None),
+        ("garbage", None),
+        ("-5", None),
+        ("1700000000.5", 1700000000.5),
+    ],
+)
+def test_parse_deadline_header(value, expected):
+    assert parse_deadline_header(value) == expected
+
+
+def test_record_cancellation_exported():
+    record_cancellation("rate_script", "deadline_exceeded")
+    output = get_metrics().decode("utf-8")
+    assert "ml_cancelled_requests_total" in output
+    assert 'reason="deadline_exceeded"' in output
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ml_service.app.what_if_advanced.analyzers import EntityExtractor
+from ml_service.app.what_if_advanced.analyzers.entity_extractor import (
+    _unused_components,
+    get_scene_entity_cache,
+)
+
+LABELS = {"JOHN": "PERSON", "MARY": "PERSON", "PARIS": "GPE", "ACME": "ORG"}
+
+
+class FakeNLP:
+    """Tags the known words of a text as entities."""
+
+    def __init__(self):
+        self.calls = []
+
+    def pipe(self, texts, batch_size, n_process):
+        texts = list(texts)
+        self.calls.append((texts, batch_size, n_process))
+        for text in texts:
+            ents = [
+                SimpleNamespace(text=word, label_=LABELS.get(word, "DATE"))
+                for word in text.split()
+            ]
+            yield SimpleNamespace(ents=ents)
+
+
+@pytest.fixture
+def extractor():
+    get_scene_entity_cache().clear()
+    extractor = EntityExtractor()
+    extractor.nlp = FakeNLP()
+    extractor.batch_size = 2
+    extractor.n_process = 1
+    return extractor
+
+
+def scenes(*texts):
+    return [{"scene_id": i, "text": text} for i, text in enumerate(texts)]
+
+
+def test_scenes_go_through_one_pipe_and_repeats_hit_the_cache(extractor):
+    script = scenes("JOHN meets MARY", "JOHN in PARIS", "JOHN meets MARY", "ACME")
+
+    entities = extractor.extract_entities(script)
+
+    assert extractor.nlp.calls == [(["JOHN meets MARY", "JOHN in PARIS", "ACME"], 2, 1)]
+    assert entities["characters"] == [
+        {"type": "character", "name": "JOHN", "mentions": 3, "scenes": [0, 1, 2]},
+        {"type": "character", "name": "MARY", "mentions": 2, "scenes": [0, 2]},
+    ]
+    assert [e["name"] for e in entities["locations"]] == ["PARIS"]
+    assert [e["name"] for e in entities["objects"]] == ["ACME"]
+
+    assert extractor.extract_entities(script) == entities
+    assert len(extractor.nlp.calls) == 1
+
+
+def test_long_scenes_are_truncated_and_small_requests_stay_in_process(extractor):
+    extractor.max_scene_chars = 9
+    extractor.n_process = 4
+
+    entities = extractor.extract_entities(scenes("JOHN and MARY"))
+
+    assert extractor.nlp.calls == [(["JOHN and "], 2, 1)]
+    assert [e["name"] for e in entities["characters"]] == ["JOHN"]
+
+
+def test_only_ner_and_the_tok2vec_it_listens_to_stay_enabled():
+    pipeline = [
+        ("tok2vec", SimpleNamespace(listening_components=["tagger", "parser"])),
+        ("tagger", object()),
+        ("parser", object()),
+        ("ner_tok2vec", SimpleNamespace(listening_components=["ner"])),
+        ("lemmatizer", object()),
+        ("ner", object()),
+    ]
+    nlp = SimpleNamespace(pipeline=pipeline, pipe_names=[n for n, _ in pipeline])
+
+    assert _unused_components(nlp) == ["tok2vec", "tagger", "parser", "lemmatizer"]
@@ -0,0 +1,56 @@
+import re
+
+import numpy as np
+
+from ml_service.app.intent_parser import IntentParser
+
+PATTERNS = {
+    "remove_scenes": [r"remove scene[s]?\s+(\d+)(?:\s*-\s*(\d+))?"],
+    "reduce_violence": [
+        r"replace\s+.*?(fight|violence).*?with\s+(.*?)(?:\.|$|,)",
+        r"remove\s+.*?(fight|violence)",
+    ],
+}
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, sentences, convert_to_numpy=True):
+        self.calls += 1
+        return np.array([[s.count("a"), s.count("b")] for s in sentences], dtype=float)
+
+
+def test_matches_equal_a_search_per_pattern():
+    parser = IntentParser(PATTERNS, {}, CountingEmbedder())
+    requests = [
+        "remove scene 3-5, then replace the fight with talk. remove violence",
+        "first line\nremove scenes 2",
+        "nothing to do here",
+    ]
+
+    for request in requests:
+        expected = []
+        for intent, patterns in PATTERNS.items():
+            for pattern in patterns:
+                match = re.search(pattern, request, re.I | re.U)
+                if match:
+                    expected.append((intent, match.group(0), match.groups()))
+
+        found = [
+            (m["intent"], m["text"], tuple(m["groups"]))
+            for m in parser.matches(request)
+        ]
+        assert found == expected
+
+
+def test_examples_are_embedded_once():
+    embedder = CountingEmbedder()
+    parser = IntentParser(PATTERNS, {"a": ["aa", "ab"], "b": ["bbb"]}, embedder)
+    assert embedder.calls == 2
+
+    similarities = parser.similarities("a")
+
+    assert embedder.calls == 3
+    assert similarities == {"a": 1.0, "b": 0.0}
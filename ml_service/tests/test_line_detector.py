@@ -0,0 +1,61 @@
+from ml_service.app.line_detector import LineDetector
+
+SCRIPT = "\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT",
+        "",
+        "JOHN",
+        "I will kill you.",
+        "",
+        "He pulls a gun.",
+    ]
+)
+
+
+def test_detect_lines_reports_line_and_page():
+    detections = LineDetector().detect_lines(SCRIPT, context_size=1)
+
+    kill = next(d for d in detections if "kill" in d["detected_text"])
+    assert kill["line_start"] == 4
+    assert kill["page_number"] == 1
+    assert kill["character_name"] == "JOHN"
+    assert kill["context_before"] == "JOHN"
+
+
+def test_detect_lines_with_line_offset_matches_full_scan():
+    padding = "\n".join(["..."] * 120)
+    full = LineDetector().detect_lines(padding + "\n" + SCRIPT, context_size=1)
+    excerpt = LineDetector().detect_lines(SCRIPT, context_size=1, line_offset=120)
+
+    def key(d):
+        return (d["line_start"], d["category"], d["page_number"], d["detected_text"])
+
+    assert sorted(map(key, excerpt)) == sorted(map(key, full))
+    assert all(d["page_number"] == 3 for d in excerpt)
+
+
+def test_compact_detections_carry_spans_instead_of_context():
+    lines = SCRIPT.split("\n")
+    full = LineDetector().detect_lines(SCRIPT, context_size=1)
+    compact = LineDetector().detect_lines(SCRIPT, context_size=1, compact=True)
+
+    assert len(compact) == len(full)
+    for short, long in zip(compact, full):
+        assert short["context_before"] is None and short["context_after"] is None
+        patterns = short["matched_patterns"]
+        assert patterns["count"] == long["matched_patterns"]["count"]
+        raw_line = lines[short["line_start"] - 1]
+        texts = [raw_line[start:end] for start, end, _ in patterns["spans"]]
+        assert texts == [m["text"] for m in long["matched_patterns"]["matches"]]
+        assert all(
+            ref.startswith(short["category"] + ":") for _, _, ref in patterns["spans"]
+        )
+
+
+def test_iter_detections_is_lazy_and_matches_detect_lines():
+    detector = LineDetector()
+    stream = detector.iter_detections(SCRIPT, context_size=1)
+
+    first = next(stream)
+    assert first["line_start"] == 4
+    assert [first, *stream] == detector.detect_lines(SCRIPT, context_size=1)
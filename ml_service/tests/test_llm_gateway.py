@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ml_service.app.cancellation import AnalysisCancelled, CancellationToken, bind_token
+from ml_service.app.llm_gateway import LLMCall, LLMGateway, LLMTimeoutError
+from ml_service.app.rating_advisor.llm_advisor import LLMRatingAdvisor
+from ml_service.app.what_if_advanced.generators import LLMGenerator
+from ml_service.app.what_if_advanced.strategies import LLMRewriteStrategy
+
+
+class StubLLM:
+    """OpenAI and Anthropic lookalike on localhost."""
+
+    def __init__(self):
+        self.delay = 0.0
+        self.requests = []
+        self.active = 0
+        self.peak = 0
+        self.reply = lambda prompt: f"rewritten: {prompt.splitlines()[-1]}"
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(
+                    self.rfile.read(int(self.headers["Content-Length"]))
+                )
+                with stub._lock:
+                    stub.requests.append((self.path, dict(self.headers), payload))
+                    stub.active += 1
+                    stub.peak = max(stub.peak, stub.active)
+                time.sleep(stub.delay)
+                with stub._lock:
+                    stub.active -= 1
+                text = stub.reply(payload["messages"][0]["content"])
+                if self.path.endswith("/chat/completions"):
+                    body = {"choices": [{"message": {"content": text}}]}
+                else:
+                    body = {"content": [{"type": "text", "text": text}]}
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.base_urls = {
+            "openai": f"http://{host}:{port}/v1",
+            "anthropic": f"http://{host}:{port}/v1",
+        }
+
+
+@pytest.fixture
+def stub():
+    stub = StubLLM()
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def make_gateway(stub):
+    gateways = []
+
+    def make(**kwargs):
+        kwargs.setdefault("rate_per_second", 0)
+        gateway = LLMGateway(base_urls=stub.base_urls, **kwargs)
+        gateways.append(gateway)
+        return gateway
+
+    yield make
+    for gateway in gateways:
+        gateway.close()
+
+
+def call(prompt, provider="openai", **kwargs):
+    return LLMCall(provider, prompt, api_key="test-key", **kwargs)
+
+
+def test_calls_run_concurrently_up_to_the_cap(stub, make_gateway):
+    stub.delay = 0.2
+    gateway = make_gateway(max_concurrency=3)
+
+    started = time.perf_counter()
+    results = gateway.complete_many([call(f"scene {i}") for i in range(6)])
+    elapsed = time.perf_counter() - started
+
+    assert results == [f"rewritten: scene {i}" for i in range(6)]
+    assert stub.peak == 3
+    # two rounds of three, not six round trips in series
+    assert elapsed < 6 * stub.delay * 0.8
+    path, headers, payload = stub.requests[0]
+    assert path == "/v1/chat/completions"
+    assert headers["Authorization"] == "Bearer test-key"
+    assert payload["model"] == "gpt-4o-mini"
+
+
+def test_identical_prompts_share_a_request_and_the_cache(stub, make_gateway):
+    stub.delay = 0.1
+    gateway = make_gateway(cache_ttl=0.3)
+
+    first = gateway.complete_many([call("same")] * 5)
+    again = gateway.complete(call("same"))
+    other_model = gateway.complete(call("same", model="gpt-4o"))
+
+    assert first == ["rewritten: same"] * 5 and again == "rewritten: same"
+    assert other_model == "rewritten: same"
+    assert len(stub.requests) == 2
+    assert gateway.stats == {"upstream": 2, "cache_hits": 1, "coalesced": 4}
+
+    time.sleep(0.35)
+    gateway.complete(call("same"))
+    assert len(stub.requests) == 3
+
+
+def test_slow_calls_hit_their_deadline(stub, make_gateway):
+    stub.delay = 0.5
+    gateway = make_gateway(timeout=5)
+
+    fast, slow = gateway.complete_many(
+        [call("fast", timeout=2), call("slow", timeout=0.1)]
+    )
+
+    assert fast == "rewritten: fast"
+    assert isinstance(slow, LLMTimeoutError)
+    with pytest.raises(LLMTimeoutError):
+        gateway.complete(call("slower", timeout=0.1))
+
+
+def test_calls_with_other_api_keys_get_their_own_reply(stub, make_gateway):
+    stub.delay = 0.1
+    gateway = make_gateway()
+
+    gateway.complete_many(
+        [call("same"), LLMCall("openai", "same", api_key="other-key")]
+    )
+
+    keys = sorted(headers["Authorization"] for _, headers, _ in stub.requests)
+    assert keys == ["Bearer other-key", "Bearer test-key"]
+    assert gateway.stats["coalesced"] == 0
+
+
+def test_joined_callers_keep_their_own_deadline(stub, make_gateway):
+    stub.delay = 0.3
+    gateway = make_gateway()
+
+    impatient, patient = gateway.complete_many(
+        [call("shared", timeout=0.1), call("shared", timeout=2)]
+    )
+
+    assert isinstance(impatient, LLMTimeoutError)
+    assert patient == "rewritten: shared"
+    assert len(stub.requests) == 1
+
+
+def test_token_bucket_paces_calls(stub, make_gateway):
+    gateway = make_gateway(rate_per_second=20, burst=1)
+
+    started = time.perf_counter()
+    gateway.complete_many([call(f"paced {i}") for i in range(5)])
+
+    # the first goes out at once, the rest one every 50ms
+    assert time.perf_counter() - started >= 0.18
+
+
+def test_waiting_caller_stops_when_the_request_is_cancelled(stub, make_gateway):
+    stub.delay = 0.5
+    gateway = make_gateway()
+    token = CancellationToken()
+    token.cancel()
+
+    with bind_token(token), pytest.raises(AnalysisCancelled):
+        gateway.complete_many([call("abandoned")])
+
+
+def test_llm_rewrite_sends_scenes_in_scope_through_the_gateway(stub, make_gateway):
+    stub.delay = 0.1
+    gateway = make_gateway()
+    generator = LLMGenerator(provider="anthropic", api_key="test-key", gateway=gateway)
+    scenes = [{"scene_id": i, "text": f"Scene {i}", "characters": []} for i in range(4)]
+
+    modified, metadata = LLMRewriteStrategy(generator).apply(
+        scenes, {"instruction": "Soften it", "scope": [1, 2, 3]}, {}
+    )
+
+    assert metadata["scenes_rewritten"] == 3
+    assert modified[0] is scenes[0]
+    assert [s["text"] for s in modified[1:]] == ["rewritten: REWRITTEN SCENE:"] * 3
+    assert all(s["llm_rewritten"] for s in modified[1:])
+    assert stub.peak == 3
+    assert {r[0] for r in stub.requests} == {"/v1/messages"}
+    assert stub.requests[0][1]["x-api-key"] == "test-key"
+
+
+def test_rating_advisor_calls_go_through_the_gateway(stub, make_gateway, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "env-key")
+    stub.reply = lambda prompt: '```json\n[{"action": "remove_scene"}]\n```'
+    advisor = LLMRatingAdvisor(gateway=make_gateway())
+
+    recommendations = advisor.enhance_recommendations("INT. ROOM", [], "18+", "12+")
+
+    assert recommendations == [{"action": "remove_scene"}]
+    assert stub.requests[0][1]["Authorization"] == "Bearer env-key"
+    assert stub.requests[0][2]["temperature"] == 0.3
@@ -87,3 +87,45 @@ def test_get_metrics():
     metrics_output = get_metrics()
     assert isinstance(metrics_output, bytes)
     assert len(metrics_output) > 0
+
+
+def test_track_script_accumulates_stages():
+    from ml_service.app.metrics import record_stage_time, stage_span, track_script
+
+    with track_script("script_42") as spans:
+        record_stage_time("keyword_scan", 0.01)
+        record_stage_time("keyword_scan", 0.02)
+        with stage_span("parsing"):
+            pass
+
+    assert spans.totals["keyword_scan"] == pytest.approx(0.03)
+    assert "parsing" in spans.totals
+
+    output = get_metrics().decode("utf-8")
+    assert 'ml_pipeline_stage_seconds_count{stage="keyword_scan"}' in output
+
+
+def test_openmetrics_export_includes_script_exemplar():
+    from ml_service.app.metrics import get_metrics_for, record_stage_time, track_script
+
+    with track_script("exemplar_script"):
+        record_stage_time("embedding", 0.2)
+
+    content, media_type = get_metrics_for("application/openmetrics-text")
+    assert media_type.startswith("application/openmetrics-text")
+    assert 'script_id="exemplar_script"' in content.decode("utf-8")
+
+    _, plain_type = get_metrics_for("text/plain")
+    assert plain_type.startswith("text/plain")
+
+
+def test_record_cache_lookup_and_batch_size():
+    from ml_service.app.metrics import record_cache_lookup, record_embedding_batch
+
+    record_cache_lookup("scene_scores", hit=True)
+    record_cache_lookup("scene_scores", hit=False)
+    record_embedding_batch(8)
+
+    output = get_metrics().decode("utf-8")
+    assert 'ml_cache_requests_total{cache="scene_scores",result="hit"}' in output
+    assert "ml_embedding_batch_size_count" in output
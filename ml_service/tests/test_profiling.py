@@ -0,0 +1,99 @@
+import threading
+import time
+
+import json
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from ml_service.app.line_detector import LineDetector
+from ml_service.app.profiling import (
+    PatternProfiler,
+    PatternProfilerCollector,
+    SamplingProfiler,
+    active_pattern_profilers,
+    pattern_profiling,
+    profile_session,
+)
+
+
+def _busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_sampling_profiler_collapsed_output():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,))
+    worker.start()
+    try:
+        profiler = SamplingProfiler(interval=0.001, thread_ids={worker.ident})
+        profiler.start()
+        time.sleep(0.1)
+        profiler.stop()
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profiler.samples > 0
+    lines = profiler.collapsed().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert "test_profiling.py:_busy_loop" in stack.split(";")
+
+
+def test_pattern_profiler_report_sorted_by_cost():
+    profiler = PatternProfiler()
+    profiler.record("violence", r"\bcheap\b", 0.001, matches=3)
+    profiler.record("child_risk", r"\bexpensive.*\b", 0.5, matches=1, suppressed=1)
+    profiler.record("child_risk", r"\bexpensive.*\b", 0.25)
+
+    report = profiler.report()
+    assert report[0]["pattern"] == r"\bexpensive.*\b"
+    assert report[0]["lexicon"] == "child_risk"
+    assert report[0]["calls"] == 2
+    assert report[0]["matches"] == 1
+    assert report[0]["suppressed"] == 1
+    assert report[0]["total_seconds"] == 0.75
+    assert report[1]["matches"] == 3
+
+    assert json.loads(profiler.to_json(limit=1))[0]["calls"] == 2
+
+
+def test_profile_session_activates_pattern_profiler():
+    assert active_pattern_profilers() == ()
+    with profile_session(interval=0.01, thread_ids=set()) as profiler:
+        assert active_pattern_profilers() == (profiler.pattern_timings,)
+    assert active_pattern_profilers() == ()
+    assert profiler.duration > 0
+
+
+def test_line_detector_records_pattern_stats():
+    text = "He will kill them all. Kill! KILL!\nThe children face danger here."
+    with pattern_profiling() as profiler:
+        LineDetector().detect_lines(text)
+
+    stats = {(r["lexicon"], r["pattern"]): r for r in profiler.report()}
+    kill = stats[("line_detector.violence", r"\bkill\w*")]
+    assert kill["calls"] == 2
+    assert kill["matches"] == 3
+    assert kill["suppressed"] == 2
+    child = stats[
+        (
+            "line_detector.child_risk",
+            r"\bchild(ren)?\b.*\b(danger|threat|harm|abuse|violence)\b",
+        )
+    ]
+    assert child["matches"] == 1
+
+
+def test_pattern_profiler_prometheus_export():
+    profiler = PatternProfiler()
+    profiler.record("drugs", r"\bкур\w*", 0.01, matches=4, suppressed=3)
+    registry = CollectorRegistry()
+    registry.register(PatternProfilerCollector(profiler))
+
+    output = generate_latest(registry).decode("utf-8")
+    assert "ml_pattern_calls_total" in output
+    assert 'ml_pattern_suppressed_total{lexicon="drugs"' in output
+    assert "ml_pattern_seconds_total" in output
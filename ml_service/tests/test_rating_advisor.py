@@ -0,0 +1,120 @@
+import pytest
+
+from ml_service.app import pipeline as pipeline_module
+from ml_service.app.pipeline import (
+    AnalysisCache,
+    analysis_size_bytes,
+    get_analysis_cache,
+    script_hash,
+)
+from ml_service.app.rating_advisor import AnalysisNotCached, RatingAdvisor
+from ml_service.app.rating_advisor.schemas import RatingAdvisorRequest
+
+SCRIPT = """INT. WAREHOUSE - NIGHT
+
+JOHN pulls out a gun and shoots the guard. Blood everywhere.
+
+EXT. STREET - DAY
+
+MARY walks her dog past the bakery.
+"""
+
+
+@pytest.fixture
+def analyses(monkeypatch):
+    """Script texts the pipeline actually analyzed, with a clean cache."""
+    get_analysis_cache().clear()
+    analyzed = []
+    analyze = pipeline_module.analyze_script_file
+
+    def counting(path):
+        with open(path, encoding="utf-8") as f:
+            analyzed.append(f.read())
+        return analyze(path)
+
+    monkeypatch.setattr(pipeline_module, "analyze_script_file", counting)
+    yield analyzed
+    get_analysis_cache().clear()
+
+
+def request(**kwargs):
+    return RatingAdvisorRequest(target_rating="6+", **kwargs)
+
+
+def test_precomputed_scene_scores_skip_the_analysis(analyses):
+    scenes = [
+        {
+            "scene_id": 0,
+            "heading": "INT. WAREHOUSE",
+            "content": "Shots.",
+            "violence": 0.9,
+        },
+        {"scene_id": 1, "heading": "EXT. STREET", "content": "A walk."},
+    ]
+
+    response = RatingAdvisor().analyze(request(scenes=scenes))
+
+    assert analyses == []
+    assert response.current_scores["violence"] > 0.5
+    assert response.current_scores["gore"] == 0.0
+    assert [s.scene_number for s in response.problematic_scenes] == [1]
+    assert response.problematic_scenes[0].content_preview == "Shots."
+
+
+def test_sent_script_scores_are_used_as_they_are(analyses):
+    scenes = [{"scene_id": 0, "violence": 0.9}]
+    agg_scores = {"violence": 0.1, "drugs": 0.0}
+
+    response = RatingAdvisor().analyze(request(scenes=scenes, agg_scores=agg_scores))
+
+    assert analyses == []
+    assert response.current_scores == agg_scores
+
+
+def test_rated_script_is_advised_on_by_hash(analyses):
+    rated = pipeline_module.RatingPipeline().analyze_script(SCRIPT, "script-1")
+    assert rated["script_hash"] == script_hash(SCRIPT)
+
+    advisor = RatingAdvisor()
+    by_hash = advisor.analyze(request(script_hash=rated["script_hash"]))
+    by_text = advisor.analyze(request(script_text=SCRIPT))
+
+    assert analyses == [SCRIPT]
+    assert by_hash == by_text
+    assert by_hash.current_scores == rated["agg_scores"]
+
+
+def test_cache_miss_analyzes_the_script_once(analyses):
+    advisor = RatingAdvisor()
+
+    first = advisor.analyze(request(script_text=SCRIPT))
+    second = advisor.analyze(request(script_text=SCRIPT))
+
+    assert analyses == [SCRIPT]
+    assert first == second
+
+
+def test_unknown_hash_without_script_text_is_reported(analyses):
+    with pytest.raises(AnalysisNotCached):
+        RatingAdvisor().analyze(request(script_hash="00" * 16))
+    with pytest.raises(AnalysisNotCached):
+        RatingAdvisor().analyze(request(script_hash="not hex"))
+    assert analyses == []
+
+
+def test_analysis_cache_is_bounded_by_bytes():
+    def analysis(content):
+        return {"scenes": [{"content": content}]}
+
+    small, large = analysis("x" * 100), analysis("x" * 5000)
+    cache = AnalysisCache(10, 2 * analysis_size_bytes(small) + 10)
+
+    cache.put(b"a", small)
+    cache.put(b"b", small)
+    cache.put(b"c", small)
+    cache.put(b"d", large)
+
+    assert [cache.get(k) for k in (b"a", b"b", b"c")] == [None, small, small]
+    # larger than the whole cache: not kept, nothing evicted for it
+    assert cache.get(b"d") is None
+    assert cache.total_bytes == 2 * analysis_size_bytes(small)
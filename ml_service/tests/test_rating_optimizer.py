@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+
+from ml_service.app.main import app
+from ml_service.app.rating_optimizer import RATING_ORDER, optimize_rating
+from ml_service.app.repair_pipeline import parse_script_to_scenes
+from ml_service.app.what_if import REDUCTION_TABLES, get_what_if_analyzer
+
+SCRIPT = "\n\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT\nJohn shoots the guard. Blood everywhere. "
+        "He kills him with a gun.",
+        "EXT. STREET - DAY\nThey walk to the car.",
+        "INT. BAR - NIGHT\nWhat the fuck, he says, and snorts cocaine. Shit.",
+    ]
+)
+
+
+def apply_plan(text, plan):
+    scenes = parse_script_to_scenes(text)
+    removed = {e["scene_id"] for e in plan["edits"] if e["action"] == "remove_scene"}
+    kept = []
+    for scene in scenes:
+        if scene["scene_id"] in removed:
+            continue
+        reduce = {
+            e["content_type"]
+            for e in plan["edits"]
+            if e["scene_id"] == scene["scene_id"]
+        }
+        scene_text = scene["text"]
+        for content, table in REDUCTION_TABLES.items():
+            if content in reduce:
+                scene_text = table.sub(scene_text)
+        kept.append(scene_text)
+    return "\n\n".join(kept)
+
+
+def test_plans_reach_target_when_applied():
+    result = optimize_rating(SCRIPT, "6+")
+
+    assert result["current_rating"] == "18+"
+    assert result["reachable"]
+    costs = [plan["cost"] for plan in result["plans"]]
+    assert costs == sorted(costs)
+    for plan in result["plans"]:
+        analysis = get_what_if_analyzer()._analyze_script(apply_plan(SCRIPT, plan))
+        assert analysis["rating"] == plan["predicted_rating"]
+        assert RATING_ORDER.index(plan["predicted_rating"]) <= RATING_ORDER.index("6+")
+        assert analysis["scores"] == plan["predicted_scores"]
+
+
+def test_removal_can_be_disallowed():
+    result = optimize_rating(SCRIPT, "0+", allow_removal=False)
+
+    for plan in result["plans"]:
+        assert all(e["action"] == "reduce_content" for e in plan["edits"])
+
+
+def test_script_already_at_target_needs_no_edits():
+    result = optimize_rating("INT. ROOM - DAY\nThey drink tea.", "12+")
+
+    assert result["reachable"]
+    assert result["plans"][0]["edits"] == []
+
+
+def test_optimize_rating_endpoint():
+    response = TestClient(app).post(
+        "/optimize_rating",
+        json={"script_text": SCRIPT, "target_rating": "12+", "max_plans": 1},
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["target_rating"] == "12+"
+    assert len(data["plans"]) == 1
+    assert data["evaluated_candidates"] > 0
@@ -0,0 +1,105 @@
+import re
+import time
+
+import pytest
+
+from ml_service.app import line_detector
+from ml_service.app.line_detector import CATEGORY_PATTERNS, LineDetector
+from ml_service.app.profiling import pattern_profiling
+from ml_service.app.regex_guard import (
+    MAX_GAP,
+    ScanBudget,
+    bound_pattern,
+    compile_guarded,
+    is_unbounded,
+)
+
+
+@pytest.mark.parametrize(
+    "pattern,expected",
+    [
+        (r"\bkill\w*", False),
+        (r"a\.*b", False),
+        (r"[.*]+", False),
+        (r"[^].*]x", False),
+        (r"\bif\b.*\bthen\b", True),
+        (r"gonna.+kill", True),
+        (r"заменить\s+.*?(драк[уи])", True),
+    ],
+)
+def test_is_unbounded(pattern, expected):
+    assert is_unbounded(pattern) is expected
+
+
+def test_bound_pattern_rewrites_only_real_gaps():
+    assert bound_pattern(r"\bif\b.*\bthen\b") == rf"\bif\b.{{0,{MAX_GAP}}}\bthen\b"
+    assert bound_pattern(r"a.+?b", max_gap=5) == r"a.{1,5}?b"
+    assert bound_pattern(r"a\.*b[.*]c") == r"a\.*b[.*]c"
+
+
+def test_bounded_pattern_keeps_short_range_matches():
+    source = r"\bchild(ren)?\b.*\b(danger|threat|harm|abuse|violence)\b"
+    guarded = compile_guarded(source)
+    text = "The children were left alone, in obvious danger."
+    assert guarded.search(text).group(0) == re.search(source, text, re.I).group(0)
+
+
+def test_line_detector_reports_source_patterns():
+    detections = LineDetector().detect_lines("The children are in danger now")
+    child = [d for d in detections if d["category"] == "child_risk"]
+    assert child
+    assert child[0]["matched_patterns"]["matches"][0]["pattern"] in (
+        CATEGORY_PATTERNS["child_risk"]
+    )
+
+
+def test_scan_budget_exhausts():
+    budget = ScanBudget(0.0)
+    time.sleep(0.001)
+    assert budget.check() is True
+    assert ScanBudget(60).check() is False
+
+
+# Adversarial long-line regression benchmark: PDF extraction often produces
+# one huge line; with unbounded ".*" these took minutes.
+ADVERSARIAL_LINES = [
+    "children " * 5000,
+    "kids " * 5000,
+    "дети " * 5000,
+    "ребенок " * 5000,
+    ("child " * 2500) + "is in danger",
+]
+
+
+@pytest.mark.parametrize("line", ADVERSARIAL_LINES)
+def test_adversarial_long_line_is_linear(line):
+    detector = LineDetector()
+    started = time.perf_counter()
+    detector.detect_lines(line, context_size=0)
+    assert time.perf_counter() - started < 3.0
+
+
+def test_adversarial_line_still_detects_nearby_trigger():
+    line = ("children " * 3000) + "children in danger"
+    detections = LineDetector().detect_lines(line, context_size=0)
+    assert any(d["category"] == "child_risk" for d in detections)
+
+
+def test_line_budget_degrades_gracefully(monkeypatch):
+    text = "kill " * 1000 + "\nchildren in danger"
+    detector = LineDetector()
+    with pattern_profiling() as full:
+        categories = {d["category"] for d in detector.detect_lines(text)}
+    assert {"violence", "child_risk"} <= categories
+    assert full.report()
+
+    degraded = []
+    monkeypatch.setattr(line_detector, "LINE_SCAN_BUDGET", 0.0)
+    monkeypatch.setattr(line_detector, "record_scan_degraded", degraded.append)
+    with pattern_profiling() as starved:
+        detections = detector.detect_lines(text)
+
+    # every pattern comes after the budget ran out, so none of them ran
+    assert detections == []
+    assert starved.report() == []
+    assert degraded == ["line", "line"]
@@ -0,0 +1,92 @@
+from ml_service.app.rewrite_engine import compile_replacements, rewrite
+from ml_service.app.what_if_advanced.strategies.content_reduction import (
+    ContentReductionStrategy,
+)
+
+
+def test_words_match_inflections_and_regex_keys_are_kept():
+    text, count = rewrite(
+        "He KILLS the guard. Shit. Shitty day.",
+        {"kill": "confronts", r"\bshit\b": "crap"},
+    )
+
+    assert text == "He confronts the guard. crap. Shitty day."
+    assert count == 2
+
+
+def test_first_entry_wins_and_output_is_not_rewritten():
+    text, count = rewrite(
+        "blood bloody fight",
+        {"blood": "mark", "bloody": "marked", "fight": "bloodless argument"},
+    )
+
+    assert text == "mark mark bloodless argument"
+    assert count == 3
+
+
+def test_group_references_in_replacements():
+    text, count = rewrite("John punches Mike", {r"\b(\w+) punches\b": r"\1 pushes"})
+
+    assert text == "John pushes Mike"
+    assert count == 1
+
+
+def test_tables_are_cached_and_empty_tables_are_noops():
+    table = {"gun": "device"}
+
+    assert compile_replacements(table) is compile_replacements(dict(table))
+    assert rewrite("a gun", {}) == ("a gun", 0)
+
+
+def test_content_reduction_merges_custom_replacements():
+    scenes = [{"scene_id": 0, "text": "He draws a sword and kills him. Fuck."}]
+
+    modified, metadata = ContentReductionStrategy().apply(
+        scenes,
+        {
+            "content_types": ["violence", "profanity"],
+            "custom_replacements": {"sword": "stick"},
+        },
+        {},
+    )
+
+    assert modified[0]["text"] == "He draws a stick and confront him. darn."
+    assert metadata["total_replacements"] == 3
+
+
+def reduce(text, custom_replacements, content_types=("profanity",)):
+    modified, metadata = ContentReductionStrategy().apply(
+        [{"scene_id": 0, "text": text}],
+        {
+            "content_types": list(content_types),
+            "custom_replacements": custom_replacements,
+        },
+        {},
+    )
+    return modified[0]["text"], metadata
+
+
+def test_backreferences_in_keys_point_at_their_own_groups():
+    assert rewrite("the the kill", {"kill": "confront", r"\b(\w+) \1\b": r"\1"}) == (
+        "the confront",
+        2,
+    )
+
+    text, _ = reduce("It is is shit.", {r"\b(?P<w>\w+) (?P=w)\b": r"\g<w>"})
+
+    assert text == "It is crap."
+
+
+def test_inline_global_flags_in_custom_keys():
+    text, metadata = reduce("Damn it. Shit.", {r"(?i)\bdamn\b": "darn"})
+
+    assert text == "darn it. crap."
+    assert metadata["total_replacements"] == 2
+    assert metadata["skipped_replacements"] == []
+
+
+def test_invalid_custom_keys_are_skipped_and_defaults_still_apply():
+    text, metadata = reduce("Damn it. Shit.", {r"\b(damn\b": "darn", "it": "that"})
+
+    assert text == "Damn that. crap."
+    assert metadata["skipped_replacements"] == [r"\b(damn\b"]
@@ -0,0 +1,51 @@
+import pytest
+from sentence_transformers import util
+
+from ml_service.app.repair_pipeline import embedder
+from ml_service.app.what_if_advanced.analyzers import SceneClassifier
+
+TEXTS = [
+    "JOHN punches the guard and runs down the corridor.",
+    "MARY\nI never told you how much I missed you.",
+    "The city at dawn, a quiet establishing shot.",
+]
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return SceneClassifier(embedder)
+
+
+def test_batch_classification_matches_per_type_similarity(classifier):
+    vectors = embedder.encode(TEXTS, convert_to_numpy=True)
+
+    ranked = classifier.classify_embeddings(vectors, top_k=len(classifier._types))
+
+    for vector, types in zip(vectors, ranked):
+        expected = {
+            name: util.cos_sim(vector, emb)[0][0].item()
+            for name, emb in classifier.type_embeddings.items()
+        }
+        assert [t["confidence"] for t in types] == pytest.approx(
+            sorted(expected.values(), reverse=True), abs=1e-5
+        )
+        assert types[0]["type"] == max(expected, key=lambda name: expected[name])
+
+
+def test_classify_scenes_reuses_given_embeddings(classifier, monkeypatch):
+    scenes = [{"scene_id": i, "text": text} for i, text in enumerate(TEXTS)]
+    vectors = embedder.encode(TEXTS, convert_to_numpy=True)
+    expected = classifier.classify_scenes(scenes)
+
+    def no_encode(*args, **kwargs):
+        raise AssertionError("scenes were encoded again")
+
+    monkeypatch.setattr(classifier.embedder, "encode", no_encode)
+    classified = classifier.classify_scenes(scenes, vectors)
+
+    assert [s["scene_type"] for s in classified] == [s["scene_type"] for s in expected]
+    assert classified[0]["all_types"][0]["confidence"] == pytest.approx(
+        classifier.classify_embeddings(vectors[:1], top_k=1)[0][0]["confidence"]
+    )
+    assert "scene_type" not in scenes[0]
+    assert classifier.classify_scenes([]) == []
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from ml_service.app import repair_pipeline, scoring
+from ml_service.app.repair_pipeline import parse_script_to_scenes
+from ml_service.app.scoring import (
+    SCORE_KEYS,
+    SceneScoreCache,
+    aggregate_score_batch,
+    aggregate_scores,
+    get_scene_score_cache,
+    score_scenes,
+)
+
+SCRIPT = "\n\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT\nJohn shoots the guard. Blood everywhere.",
+        "EXT. STREET - DAY\nThey walk to the car.",
+        "INT. BAR - NIGHT\nWhat the fuck, he says, and snorts cocaine.",
+    ]
+)
+
+
+@pytest.fixture
+def counted_extraction(monkeypatch):
+    get_scene_score_cache().clear()
+    calls = []
+    original = scoring.extract_scene_features
+
+    def counting(text, *args):
+        calls.append(text)
+        return original(text, *args)
+
+    monkeypatch.setattr(scoring, "extract_scene_features", counting)
+    return calls
+
+
+def test_aggregate_scores_blend():
+    rows = [{k: v for k in SCORE_KEYS} for v in (0.1, 0.2, 0.9, 0.4)]
+    values = [0.1, 0.2, 0.9, 0.4]
+
+    agg = aggregate_scores(rows)
+
+    assert agg["violence"] == pytest.approx(0.9 * 0.7 + np.percentile(values, 95) * 0.3)
+    assert agg["nudity"] == pytest.approx(0.9 * 0.85 + np.percentile(values, 90) * 0.15)
+    assert agg["profanity"] == pytest.approx(np.percentile(values, 90))
+
+
+def test_only_changed_scenes_are_rescored(counted_extraction):
+    scenes = parse_script_to_scenes(SCRIPT)
+    original, rescored = score_scenes(scenes)
+    assert rescored == 3
+
+    modified = [dict(s) for s in scenes if s["scene_id"] != 1]
+    modified[-1]["text"] = modified[-1]["text"].replace("fuck", "heck")
+    counted_extraction.clear()
+
+    delta, rescored = score_scenes(modified)
+
+    assert rescored == 1
+    assert counted_extraction == [modified[-1]["text"]]
+    assert delta[0] is original[0]
+
+
+def test_uncached_scenes_are_embedded_in_one_batch(counted_extraction, monkeypatch):
+    batches = []
+    encode = repair_pipeline.embedder.encode
+
+    def counting_encode(texts, *args, **kwargs):
+        batches.append(list(texts))
+        return encode(texts, *args, **kwargs)
+
+    monkeypatch.setattr(repair_pipeline.embedder, "encode", counting_encode)
+    scenes = parse_script_to_scenes(SCRIPT)
+    scenes.append(dict(scenes[0], scene_id=3))
+
+    scores, rescored = score_scenes(scenes)
+
+    texts = [scene["text"] for scene in scenes[:3]]
+    assert rescored == 3
+    assert batches == [texts]
+    assert counted_extraction == texts
+    assert scores[3] is scores[0]
+
+    # precomputed embeddings skip the encoder altogether
+    get_scene_score_cache().clear()
+    with_vectors, _ = score_scenes(scenes, np.asarray(encode(texts + texts[:1])))
+    assert len(batches) == 1
+    assert aggregate_scores(with_vectors) == pytest.approx(aggregate_scores(scores))
+
+
+def test_delta_scores_match_full_rescore(counted_extraction):
+    scenes = parse_script_to_scenes(SCRIPT)
+    score_scenes(scenes)
+    modified = [s for s in scenes if s["scene_id"] != 0]
+    cached, _ = score_scenes(modified)
+
+    get_scene_score_cache().clear()
+    fresh, rescored = score_scenes(modified)
+
+    assert rescored == len(modified)
+    assert aggregate_scores(cached) == aggregate_scores(fresh)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SceneScoreCache(max_entries=2)
+    cache.put("a", {"v": 1})
+    cache.put("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.put("c", {"v": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"v": 1}
+    assert cache.get("c") == {"v": 3}
+
+
+def test_batch_aggregation_matches_per_script_aggregation():
+    rng = np.random.default_rng(7)
+    matrices = rng.random((6, 9, len(SCORE_KEYS)))
+    removed = rng.random((6, 9)) < 0.4
+    removed[0] = True
+
+    batch = aggregate_score_batch(matrices, removed)
+
+    for b in range(6):
+        rows = [
+            dict(zip(SCORE_KEYS, matrices[b, i])) for i in range(9) if not removed[b, i]
+        ]
+        expected = aggregate_scores(rows)
+        assert batch[b] == pytest.approx([expected[k] for k in SCORE_KEYS])
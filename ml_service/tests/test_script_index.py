@@ -0,0 +1,158 @@
+from collections import OrderedDict
+
+from ml_service.app import script_index
+from ml_service.app.pipeline import RatingPipeline
+from ml_service.app.repair_pipeline import (
+    _analyze_scene_structure,
+    parse_script_to_scenes,
+)
+from ml_service.app.scoring import get_scene_score_cache
+from ml_service.app.script_index import (
+    ACTION,
+    BLANK,
+    CHARACTER,
+    DIALOGUE,
+    HEADING,
+    PARENTHETICAL,
+    TRANSITION,
+    ScriptIndex,
+    get_script_index,
+    scene_line_ranges,
+)
+from ml_service.app.what_if_advanced.strategies.character_focused import (
+    remove_character_lines,
+)
+from ml_service.app.what_if_advanced.utils import extract_character_names
+
+SCRIPT = "\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT",
+        "",
+        "John pulls a gun.",
+        "",
+        "JOHN",
+        "(quietly)",
+        "Drop it.",
+        "Now.",
+        "",
+        "MARY (V.O.)",
+        "Don't.",
+        "",
+        "CUT TO:",
+        "",
+        "EXT. PARK - DAY",
+        "VILLAIN: You'll never take me.",
+    ]
+)
+
+
+def test_line_types_and_speakers():
+    index = ScriptIndex(SCRIPT)
+
+    assert index.types[:8] == [
+        HEADING,
+        BLANK,
+        ACTION,
+        BLANK,
+        CHARACTER,
+        PARENTHETICAL,
+        DIALOGUE,
+        DIALOGUE,
+    ]
+    assert index.types[12] == TRANSITION
+    assert [index.speaker_at(i) for i in (2, 4, 5, 6, 7, 10)] == [
+        None,
+        "JOHN",
+        "JOHN",
+        "JOHN",
+        "JOHN",
+        "MARY",
+    ]
+    assert index.speaker_at(15) == "VILLAIN"
+    assert index.characters() == ["JOHN", "MARY", "VILLAIN"]
+
+
+def test_offsets_and_scene_lookup():
+    index = ScriptIndex(SCRIPT)
+
+    offset = SCRIPT.index("Drop it.")
+    assert index.line_at(offset) == 6
+    assert index.line_at(offset + 3) == 6
+    assert [heading for _, heading in index.scenes] == [
+        "INT. WAREHOUSE - NIGHT",
+        "EXT. PARK - DAY",
+    ]
+    assert index.scene_at(6) == 0
+    assert index.scene_at(15) == 1
+    assert ScriptIndex("no heading\nhere").scene_at(1) == -1
+
+
+def test_index_is_cached_by_content():
+    assert get_script_index(SCRIPT) is get_script_index(SCRIPT)
+    assert get_script_index(SCRIPT) is not get_script_index(SCRIPT + "\n")
+
+
+def test_consumers_use_speaker_blocks():
+    assert extract_character_names(SCRIPT) == ["JOHN", "MARY", "VILLAIN"]
+
+    without_john = remove_character_lines(SCRIPT, "john")
+
+    assert "Drop it." not in without_john
+    assert "(quietly)" not in without_john
+    assert "John pulls a gun." in without_john
+    assert "Don't." in without_john
+
+
+def test_scene_ranges_match_scene_by_scene_analysis():
+    text = "  Cold open.\nJOHN\nHi.\n\n" + SCRIPT + "\nMARY\n  Bye.  \n"
+    scenes = parse_script_to_scenes(text)
+    index = ScriptIndex(text)
+
+    ranges = scene_line_ranges(index, [scene["text"] for scene in scenes])
+
+    assert all(lines is not None for lines in ranges)
+    for scene, lines in zip(scenes, ranges):
+        assert lines.script.characters(lines.first, lines.stop) == (
+            extract_character_names(scene["text"])
+        )
+        assert _analyze_scene_structure(scene["text"], lines) == (
+            _analyze_scene_structure(scene["text"])
+        )
+    # a scene cut mid-line has no line range of its own
+    assert index.span_lines(text.index("Hi."), text.index("Hi.") + 1) is None
+
+
+def test_script_is_indexed_once_per_analysis(monkeypatch):
+    built = []
+
+    class CountingIndex(ScriptIndex):
+        def __init__(self, text):
+            built.append(text)
+            super().__init__(text)
+
+    monkeypatch.setattr(script_index, "ScriptIndex", CountingIndex)
+    monkeypatch.setattr(script_index, "_cache", OrderedDict())
+    monkeypatch.setattr(script_index, "_cache_bytes", 0)
+    text = SCRIPT + "\n\nINT. KITCHEN - DAY\nMARY\nMore coffee?"
+
+    get_scene_score_cache().clear()
+    result = RatingPipeline().analyze_script(text)
+
+    assert result["total_scenes"] == 3
+    assert built == [text]
+
+
+def test_index_cache_is_bounded_by_bytes(monkeypatch):
+    monkeypatch.setattr(script_index, "_cache", OrderedDict())
+    monkeypatch.setattr(script_index, "_cache_bytes", 0)
+    size = ScriptIndex(SCRIPT + "0").size_bytes
+    monkeypatch.setattr(script_index, "INDEX_CACHE_MAX_BYTES", 2 * size)
+
+    first = get_script_index(SCRIPT + "0")
+    get_script_index(SCRIPT + "1")
+    get_script_index(SCRIPT + "2")
+
+    assert len(script_index._cache) == 2
+    assert get_script_index(SCRIPT + "0") is not first
+    # too large to keep at all
+    assert get_script_index(SCRIPT * 3) is not get_script_index(SCRIPT * 3)
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from ml_service.app.main import app
+from ml_service.app.repair_pipeline import (
+    leave_one_out_scores,
+    map_scores_to_rating,
+    map_scores_to_rating_batch,
+)
+from ml_service.app.scoring import SCORE_KEYS, aggregate_scores
+from ml_service.app.sensitivity import scene_sensitivity
+
+SCRIPT = "\n\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT\nJohn shoots the guard. Blood everywhere.",
+        "EXT. STREET - DAY\nThey walk to the car.",
+        "INT. BAR - NIGHT\nWhat the fuck, he says, and snorts cocaine.",
+    ]
+)
+
+
+def test_leave_one_out_matches_full_reaggregation():
+    rng = np.random.default_rng(7)
+    for n in (1, 2, 3, 10, 21):
+        matrix = rng.random((n, len(SCORE_KEYS))) * (rng.random((n, 1)) < 0.6)
+        matrix[0] = matrix[-1]  # ties
+
+        without = leave_one_out_scores(matrix, SCORE_KEYS)
+
+        for i in range(n):
+            rest = [dict(zip(SCORE_KEYS, row)) for row in np.delete(matrix, i, 0)]
+            expected = aggregate_scores(rest) if rest else dict.fromkeys(SCORE_KEYS, 0)
+            assert without[i].tolist() == [expected[k] for k in SCORE_KEYS]
+
+
+# every cut-off map_scores_to_rating compares a score against
+RATING_THRESHOLDS = np.array(
+    [0.05, 0.08, 0.1, 0.12, 0.15, 0.2, 0.22, 0.3, 0.35, 0.4, 0.5, 0.65, 0.7]
+    + [0.75, 0.8, 0.95]
+)
+
+
+def random_scores(rng, n, sampling):
+    if sampling == "uniform":
+        return rng.random((n, len(SCORE_KEYS))) * rng.choice([0.3, 0.7, 1.0], (n, 1))
+    # on and just around the cut-offs, where the two versions could disagree
+    scores = rng.choice(RATING_THRESHOLDS, (n, len(SCORE_KEYS)))
+    return scores + rng.choice([-1e-9, 0.0, 0.0, 1e-9], scores.shape)
+
+
+@pytest.mark.parametrize("sampling", ["uniform", "thresholds"])
+@pytest.mark.parametrize("seed", range(10))
+def test_batch_rating_matches_scalar_rules(seed, sampling):
+    scores = random_scores(np.random.default_rng(seed), 10_000, sampling)
+
+    ratings = map_scores_to_rating_batch(
+        {k: scores[:, j] for j, k in enumerate(SCORE_KEYS)}
+    )
+
+    for row, rating in zip(scores, ratings):
+        assert rating == map_scores_to_rating(dict(zip(SCORE_KEYS, row)))["rating"]
+
+
+def test_only_the_decisive_scene_changes_the_rating():
+    quiet = dict.fromkeys(SCORE_KEYS, 0.0)
+    scene_scores = [dict(quiet, violence=0.9, gore=0.8), quiet, quiet]
+
+    result = scene_sensitivity(SCRIPT, scene_scores=scene_scores)
+
+    assert result["current_rating"] == "16+"
+    assert result["rating_changing_scenes"] == [0]
+    first, *rest = result["scenes"]
+    assert first["scene_id"] == 0
+    assert first["rating_without"] == "0+"
+    assert first["score_deltas"]["violence"] < 0
+    assert all(scene["rating_drop"] == 0 for scene in rest)
+
+
+def test_sensitivity_endpoint():
+    response = TestClient(app).post(
+        "/scene_sensitivity", json={"script_text": SCRIPT, "max_scenes": 2}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_scenes"] == 3
+    assert len(body["scenes"]) == 2
@@ -0,0 +1,138 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from ml_service.app.main import app
+from ml_service.app.sessions import (
+    SessionConflict,
+    SessionStore,
+    SessionTooLarge,
+    get_session_store,
+)
+from ml_service.app.what_if import get_what_if_analyzer
+
+SCRIPT = "\n\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT\nJohn shoots the guard. Blood everywhere.",
+        "EXT. STREET - DAY\nThey walk to the car.",
+        "INT. BAR - NIGHT\nWhat the fuck, he says, and snorts cocaine.",
+    ]
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def analysis(scenes=1):
+    return {"scene_scores": [{}] * scenes}
+
+
+@pytest.fixture
+def client():
+    get_session_store().clear()
+    return TestClient(app)
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = SessionStore(ttl_seconds=60, max_sessions=10, max_bytes=10**6, clock=clock)
+    idle = store.add("idle script", analysis())
+    active = store.add("active script", analysis())
+
+    clock.now = 50
+    assert store.get(active.session_id) is active
+    clock.now = 70
+
+    assert store.get(idle.session_id) is None
+    assert store.get(active.session_id) is active
+    assert store.expires_in(active) == 60
+
+
+def test_count_and_memory_caps_evict_least_recently_used():
+    store = SessionStore(ttl_seconds=60, max_sessions=2, max_bytes=10**6)
+    first = store.add("first", analysis())
+    second = store.add("second", analysis())
+    store.get(first.session_id)
+    store.add("third", analysis())
+
+    assert store.get(second.session_id) is None
+    assert store.get(first.session_id) is first
+
+    small = SessionStore(ttl_seconds=60, max_sessions=10, max_bytes=5000)
+    old = small.add("a", analysis(scenes=1))
+    new = small.add("b", analysis(scenes=1))
+    assert len(small) == 2
+    small.add("c", analysis(scenes=1))
+
+    assert small.get(old.session_id) is None
+    assert small.get(new.session_id) is new
+    with pytest.raises(SessionTooLarge):
+        small.add("d", analysis(scenes=3))
+
+
+def test_update_rejects_stale_revision():
+    store = SessionStore(ttl_seconds=60, max_sessions=10, max_bytes=10**6)
+    session = store.add("v0", analysis())
+    store.update(session, "v1", analysis(), revision=0)
+
+    with pytest.raises(SessionConflict):
+        store.update(session, "v1 edited elsewhere", analysis(), revision=0)
+    assert session.script_text == "v1"
+    assert session.revision == 1
+
+
+def test_session_calls_reuse_cached_analysis(client, monkeypatch):
+    opened = client.post("/sessions", json={"script_text": SCRIPT})
+    assert opened.status_code == 200
+    session = opened.json()
+    assert session["revision"] == 0
+    assert session["total_scenes"] == 3
+
+    analyzer = get_what_if_analyzer()
+    analysed = []
+    original = analyzer._analyze_script
+
+    def counting(text):
+        analysed.append(text)
+        return original(text)
+
+    monkeypatch.setattr(analyzer, "_analyze_script", counting)
+    base = f"/sessions/{session['session_id']}"
+
+    suggestions = client.post(f"{base}/what_if_suggestions", json={"language": "en"})
+    assert suggestions.status_code == 200
+    assert suggestions.json()["current_rating"] == session["rating"]
+    assert analysed == []
+
+    what_if = client.post(
+        f"{base}/what_if",
+        json={"modification_request": "remove scene 0", "apply": True},
+    )
+    assert what_if.status_code == 200
+    assert what_if.json()["original_rating"] == session["rating"]
+    # only the modified script is analysed
+    assert len(analysed) == 1
+
+    revised = client.get(base).json()
+    assert revised["revision"] == 1
+    assert revised["total_scenes"] == 2
+    assert revised["scores"] == what_if.json()["modified_scores"]
+
+
+def test_closed_or_unknown_session_is_404(client):
+    session_id = client.post("/sessions", json={"script_text": SCRIPT}).json()[
+        "session_id"
+    ]
+
+    assert client.delete(f"/sessions/{session_id}").status_code == 204
+    assert client.get(f"/sessions/{session_id}").status_code == 404
+    response = client.post(
+        f"/sessions/{session_id}/what_if",
+        json={"modification_request": "remove scene 0"},
+    )
+    assert response.status_code == 404
+    assert client.delete("/sessions/unknown").status_code == 404
@@ -0,0 +1,137 @@
+import pytest
+
+from ml_service.app import scoring
+from ml_service.app.cancellation import AnalysisCancelled, CancellationToken, bind_token
+from ml_service.app.repair_pipeline import parse_script_to_scenes
+from ml_service.app.scoring import SCORE_KEYS, get_scene_score_cache
+from ml_service.app.what_if import get_what_if_analyzer
+
+SCRIPT = "\n\n".join(
+    [
+        "INT. WAREHOUSE - NIGHT\nJohn shoots the guard. Blood everywhere.",
+        "EXT. STREET - DAY\nThey walk to the car.",
+        "INT. BAR - NIGHT\nWhat the fuck, he says, and snorts cocaine.",
+    ]
+)
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    get_scene_score_cache().clear()
+    calls = []
+    original = scoring.extract_scene_features
+
+    def counting(text, *args):
+        calls.append(text)
+        return original(text, *args)
+
+    monkeypatch.setattr(scoring, "extract_scene_features", counting)
+    return calls
+
+
+def scene_texts(script):
+    return [scene["text"] for scene in parse_script_to_scenes(script)]
+
+
+def test_suggestions_score_each_scene_once(extractions):
+    result = get_what_if_analyzer().generate_smart_suggestions(SCRIPT, language="en")
+
+    # the original scenes, then only the rewritten ones the previews need
+    assert extractions[:3] == scene_texts(SCRIPT)
+    assert len(set(extractions)) == len(extractions)
+    assert result["total_scenes"] == 3
+    for suggestion in result["suggestions"]:
+        assert set(suggestion["affected_scenes"]) <= {0, 1, 2}
+
+
+def test_suggestions_use_supplied_scene_scores(extractions):
+    quiet = {k: 0.0 for k in SCORE_KEYS}
+    scene_scores = [dict(quiet, violence=0.9), quiet, dict(quiet, violence=0.8)]
+
+    result = get_what_if_analyzer().generate_smart_suggestions(
+        SCRIPT,
+        current_scores={"violence": 0.9},
+        current_rating="16+",
+        language="en",
+        scene_scores=scene_scores,
+    )
+
+    assert not set(extractions) & set(scene_texts(SCRIPT))
+    assert result["current_rating"] == "16+"
+    [suggestion] = result["suggestions"]
+    assert suggestion["category"] == "violence"
+    assert suggestion["affected_scenes"] == [0, 2]
+    assert suggestion["text"] == "remove violence in scenes 0, 2"
+
+
+def test_suggestions_preview_the_rating_after_the_edit():
+    script = "\n\n".join(
+        [
+            "INT. WAREHOUSE - NIGHT\nJohn shoots the guard and kills him. "
+            "He stabs Mike with a knife. Blood everywhere, bloody corpse, gore.",
+            "EXT. STREET - DAY\nThey walk to the car. Fuck this shit, fuck you.",
+            "INT. BAR - NIGHT\nWhat the fuck, he says, and snorts cocaine.",
+        ]
+    )
+    analyzer = get_what_if_analyzer()
+    result = analyzer.generate_smart_suggestions(script, language="en")
+
+    assert {s["category"] for s in result["suggestions"]} >= {"violence", "gore"}
+    for suggestion in result["suggestions"]:
+        simulated = analyzer.simulate_what_if(script, suggestion["text"])
+        assert suggestion["predicted_rating"] == simulated["modified_rating"]
+        for key, delta in suggestion["score_deltas"].items():
+            expected = (
+                simulated["modified_scores"][key] - simulated["original_scores"][key]
+            )
+            assert delta == pytest.approx(expected, abs=0.002)
+
+
+def test_mismatched_scene_scores_are_recomputed(extractions):
+    result = get_what_if_analyzer().generate_smart_suggestions(
+        SCRIPT, language="en", scene_scores=[{"violence": 1.0}]
+    )
+
+    assert len(extractions) == 3
+    assert result["total_scenes"] == 3
+
+
+def test_batch_shares_original_analysis_and_matches_single_runs(monkeypatch):
+    analyzer = get_what_if_analyzer()
+    requests = ["remove scene 2", "remove profanity", "remove scene 2"]
+    expected = [analyzer.simulate_what_if(SCRIPT, r) for r in requests]
+
+    analysed = []
+    original = analyzer._analyze_script
+
+    def counting(text):
+        analysed.append(text)
+        return original(text)
+
+    monkeypatch.setattr(analyzer, "_analyze_script", counting)
+
+    result = analyzer.simulate_what_if_batch(SCRIPT, requests)
+
+    # the original once, then one per distinct modification
+    assert len(analysed) == 3
+    assert result["original_rating"] == expected[0]["original_rating"]
+    for variant, single in zip(result["variants"], expected):
+        assert variant["modified_rating"] == single["modified_rating"]
+        assert variant["modified_scores"] == single["modified_scores"]
+        assert variant["score_deltas"] == {
+            k: round(v - single["original_scores"][k], 3)
+            for k, v in single["modified_scores"].items()
+        }
+    assert result["variants"][2]["modification_request"] == "remove scene 2"
+
+
+def test_batch_variants_observe_cancellation():
+    analyzer = get_what_if_analyzer()
+    original = analyzer._analyze_script(SCRIPT)
+    token = CancellationToken()
+    token.cancel()
+
+    with bind_token(token), pytest.raises(AnalysisCancelled):
+        analyzer.simulate_what_if_batch(
+            SCRIPT, ["remove profanity", "remove scene 0"], original
+        )
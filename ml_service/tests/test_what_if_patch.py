@@ -0,0 +1,185 @@
+import shutil
+import subprocess
+
+import pytest
+
+from ml_service.app.repair_pipeline import parse_script_to_scenes
+from ml_service.app.what_if_advanced import (
+    StructuredWhatIfRequest,
+    get_advanced_analyzer,
+)
+from ml_service.app.what_if_advanced.patch import (
+    apply_scene_patches,
+    build_scene_patches,
+    scene_spans,
+    unified_diff,
+)
+from ml_service.app.what_if_advanced.plan import ExecutionPlan, PlanResult
+from ml_service.app.what_if_advanced.schemas import ModificationConfig
+from ml_service.app.what_if_advanced.strategies import (
+    CharacterFocusedStrategy,
+    ContentReductionStrategy,
+    SceneRemovalStrategy,
+)
+from ml_service.app.what_if_advanced.strategies.base import StrategyRegistry
+
+SCRIPT = """  INT. WAREHOUSE - NIGHT
+JOHN shoots the guard.
+Blood on the floor.
+
+
+EXT. STREET - DAY
+MARY walks home.
+
+INT. BAR - NIGHT
+JOHN
+What the fuck.
+He leaves.
+"""
+
+
+def patched(tmp_path, text, diff):
+    """``text`` after GNU patch applies ``diff`` to it."""
+    target = tmp_path / "script"
+    target.write_bytes(text.encode())
+    subprocess.run(
+        ["patch", "-p1", "--batch", "--silent"],
+        input=diff.encode(),
+        cwd=tmp_path,
+        check=True,
+    )
+    return target.read_bytes().decode()
+
+
+needs_patch = pytest.mark.skipif(
+    shutil.which("patch") is None, reason="needs GNU patch"
+)
+
+
+def plan(*modifications, script=SCRIPT):
+    registry = StrategyRegistry()
+    for strategy in (
+        SceneRemovalStrategy(),
+        ContentReductionStrategy(),
+        CharacterFocusedStrategy(),
+    ):
+        registry.register(strategy)
+    configs = [ModificationConfig(type=t, params=p) for t, p in modifications]
+    return ExecutionPlan(configs, registry, {}).run(parse_script_to_scenes(script))
+
+
+def test_scene_spans_point_at_the_parsed_scenes():
+    scenes = parse_script_to_scenes(SCRIPT)
+
+    spans = scene_spans(SCRIPT, scenes)
+
+    assert [SCRIPT[start:end] for start, end in spans] == [s["text"] for s in scenes]
+
+
+def test_patches_rebuild_the_modified_script():
+    applied = plan(
+        ("remove_scenes", {"scene_ids": [1]}),
+        ("reduce_content", {"content_types": ["violence", "profanity"]}),
+    )
+
+    patches = build_scene_patches(SCRIPT, applied)
+
+    assert [(p["op"], p["scene_id"]) for p in patches] == [
+        ("replace", 0),
+        ("delete", 1),
+        ("replace", 2),
+    ]
+    rebuilt = apply_scene_patches(SCRIPT, patches)
+    assert [s["text"] for s in parse_script_to_scenes(rebuilt)] == [
+        s["text"] for s in applied.scenes
+    ]
+    # spacing around the scenes is the original's
+    assert rebuilt.startswith("  INT. WAREHOUSE") and rebuilt.endswith("leaves.\n")
+
+
+def test_inserted_scenes_follow_the_last_kept_scene():
+    scenes = parse_script_to_scenes(SCRIPT)
+    extra = {"scene_id": 9, "text": "EXT. ROOF - NIGHT\nStars."}
+    applied = PlanResult(
+        scenes, [scenes[0], extra, scenes[2]], [0, None, 2], [1], [], {}, 1
+    )
+
+    patches = build_scene_patches(SCRIPT, applied)
+
+    assert [p["op"] for p in patches] == ["insert", "delete"]
+    rebuilt = apply_scene_patches(SCRIPT, patches)
+    assert [s["text"] for s in parse_script_to_scenes(rebuilt)] == [
+        scenes[0]["text"],
+        extra["text"],
+        scenes[2]["text"],
+    ]
+
+
+@needs_patch
+def test_unified_diff_applies_to_the_original_script(tmp_path):
+    applied = plan(
+        ("remove_scenes", {"scene_ids": [1]}),
+        ("reduce_content", {"content_types": ["violence", "profanity"]}),
+    )
+    patches = build_scene_patches(SCRIPT, applied)
+
+    diff = unified_diff(SCRIPT, patches)
+
+    assert diff.startswith("--- a/script\n+++ b/script\n@@ -1,")
+    assert "-What the fuck." in diff and "+What the darn." in diff
+    assert patched(tmp_path, SCRIPT, diff) == apply_scene_patches(SCRIPT, patches)
+    assert unified_diff(SCRIPT, []) == ""
+
+
+@needs_patch
+@pytest.mark.parametrize(
+    "modification",
+    [
+        ("reduce_content", {"content_types": ["profanity"]}),
+        ("remove_scenes", {"scene_ids": [2]}),
+        ("remove_scenes", {"scene_ids": [1]}),
+    ],
+    ids=["replace last", "delete last", "delete middle"],
+)
+@pytest.mark.parametrize(
+    "script", [SCRIPT, SCRIPT.rstrip("\n")], ids=["newline", "no newline"]
+)
+def test_unified_diff_keeps_a_missing_final_newline(tmp_path, script, modification):
+    patches = build_scene_patches(script, plan(modification, script=script))
+
+    diff = unified_diff(script, patches)
+
+    assert ("No newline at end of file" in diff) == (
+        not script.endswith("\n") and patches[-1]["end"] == len(script)
+    )
+    assert patched(tmp_path, script, diff) == apply_scene_patches(script, patches)
+
+
+@needs_patch
+def test_response_carries_patches_and_the_script_only_on_request(tmp_path):
+    analyzer = get_advanced_analyzer()
+    modifications = [
+        ModificationConfig(
+            type="reduce_content", params={"content_types": ["profanity"]}
+        )
+    ]
+
+    compact = analyzer.analyze_structured(
+        StructuredWhatIfRequest(script_text=SCRIPT, modifications=modifications)
+    )
+    diff = analyzer.analyze_structured(
+        StructuredWhatIfRequest(
+            script_text=SCRIPT,
+            modifications=modifications,
+            diff_format="unified",
+            include_modified_script=True,
+        )
+    )
+
+    assert compact.modified_script is None and compact.unified_diff is None
+    assert [(p.op, p.scene_id) for p in compact.scene_patches] == [("replace", 2)]
+    assert diff.scene_patches == []
+    assert patched(tmp_path, SCRIPT, diff.unified_diff) == apply_scene_patches(
+        SCRIPT, [p.model_dump() for p in compact.scene_patches]
+    )
+    assert "What the darn." in diff.modified_script
@@ -0,0 +1,173 @@
+import copy
+
+import pytest
+
+from ml_service.app.what_if_advanced.plan import ExecutionPlan
+from ml_service.app.what_if_advanced.schemas import ModificationConfig
+from ml_service.app.what_if_advanced.strategies import (
+    CharacterFocusedStrategy,
+    ContentReductionStrategy,
+    SceneRemovalStrategy,
+)
+from ml_service.app.what_if_advanced.strategies.base import (
+    ModificationStrategy,
+    SceneOperation,
+    StrategyRegistry,
+)
+
+
+def make_scenes():
+    texts = [
+        "JOHN shoots the guard.",
+        "MARY reads a book.",
+        "JOHN\nWhat the fuck.",
+        "Quiet street.",
+    ]
+    return [
+        {"scene_id": i, "text": text, "characters": ["JOHN"] if "JOHN" in text else []}
+        for i, text in enumerate(texts)
+    ]
+
+
+def registry(*extra):
+    registry = StrategyRegistry()
+    for strategy in (
+        SceneRemovalStrategy(),
+        ContentReductionStrategy(),
+        CharacterFocusedStrategy(),
+        *extra,
+    ):
+        registry.register(strategy)
+    return registry
+
+
+def mods(*items):
+    return [ModificationConfig(type=t, params=p) for t, p in items]
+
+
+MODIFICATIONS = mods(
+    ("remove_scenes", {"scene_ids": [1]}),
+    # scene ids after the removal above
+    ("reduce_content", {"content_types": ["violence"], "scope": [0]}),
+    ("reduce_content", {"content_types": ["profanity"]}),
+    (
+        "rename_character",
+        {"action": "rename", "character_name": "JOHN", "new_name": "BOB"},
+    ),
+)
+
+
+def test_fused_plan_matches_sequential_strategies():
+    scenes = make_scenes()
+    expected = copy.deepcopy(scenes)
+    expected_metadata = []
+    for config in MODIFICATIONS:
+        strategy = registry().get_strategy(config.type)
+        expected, metadata = strategy.apply(expected, config.params, {})
+        expected_metadata.append(metadata)
+
+    result = ExecutionPlan(MODIFICATIONS, registry(), {}).run(scenes)
+
+    assert result.passes == 1
+    assert result.scenes == expected
+    assert [a["metadata"] for a in result.applied] == expected_metadata
+    assert [s["text"] for s in result.scenes] == [
+        "BOB point at the guard.",
+        "BOB\nWhat the darn.",
+        "Quiet street.",
+    ]
+    assert result.origins == [0, 2, 3]
+    assert result.changed_positions() == [0, 1]
+    assert result.removed_origins() == [1]
+
+
+def test_change_sets_are_recorded_per_modification():
+    result = ExecutionPlan(MODIFICATIONS, registry(), {}).run(make_scenes())
+
+    removal, violence, profanity, rename = (result.changes[i] for i in range(4))
+    assert removal.removed == [1] and not removal.modified
+    # "shoots" -> "point at"
+    assert violence.modified == {0: 2}
+    # "fuck" -> "darn"
+    assert profanity.summary() == {
+        "modified_scene_ids": [1],
+        "removed_scene_ids": [],
+        "scenes_modified": 1,
+        "scenes_removed": 0,
+        "bytes_delta": 0,
+    }
+    assert rename.modified == {0: -1, 1: -1}
+    assert result.applied[2]["changes"] == profanity.summary()
+    assert result.applied[2]["metadata"]["scenes_modified"] == 1
+
+
+def test_input_scenes_are_not_mutated_and_untouched_scenes_not_copied():
+    scenes = make_scenes()
+    snapshot = copy.deepcopy(scenes)
+
+    result = ExecutionPlan(MODIFICATIONS, registry(), {}).run(scenes)
+
+    assert scenes == snapshot
+    # only renumbered, text untouched: a copy with the new id
+    assert result.scenes[2] == dict(scenes[3], scene_id=2)
+    untouched = ExecutionPlan(
+        mods(("reduce_content", {"content_types": ["drugs"]})), registry(), {}
+    ).run(scenes)
+    assert all(a is b for a, b in zip(untouched.scenes, scenes))
+
+
+class FailingOperation(SceneOperation):
+    def apply_to(self, scene):
+        if scene["scene_id"] == 2:
+            raise RuntimeError("boom")
+        return dict(scene, text=scene["text"].upper())
+
+    def metadata(self, changes):
+        return {}
+
+
+class FailingStrategy(ContentReductionStrategy):
+    def can_handle(self, modification_type):
+        return modification_type == "explode"
+
+    def compile(self, params, entities):
+        return FailingOperation()
+
+
+def test_failed_operation_is_reported_and_skipped():
+    plan = ExecutionPlan(
+        mods(
+            ("reduce_content", {"content_types": ["violence"]}),
+            ("explode", {}),
+            ("unknown", {}),
+            ("reduce_content", {"content_types": ["profanity"]}),
+        ),
+        registry(FailingStrategy()),
+        {},
+    )
+
+    result = plan.run(make_scenes())
+
+    assert [a.get("error") for a in result.applied] == [
+        None,
+        "boom",
+        "No strategy found for modification type: unknown",
+        None,
+    ]
+    assert result.scenes[0]["text"] == "JOHN point at the guard."
+    assert result.scenes[2]["text"] == "JOHN\nWhat the darn."
+
+
+def test_strategy_without_compile_cannot_be_created():
+    class ApplyOnly(ModificationStrategy):
+        def can_handle(self, modification_type):
+            return modification_type == "apply_only"
+
+        def apply(self, scenes, params, entities, **kwargs):
+            return scenes, {}
+
+        def validate_params(self, params):
+            return True
+
+    with pytest.raises(TypeError, match="compile"):
+        ApplyOnly()